@@ -3,19 +3,127 @@ import pandas as pd
 import plotly.graph_objects as go
 import os
 import csv
+import json
+import hashlib
+from datetime import datetime
 from plotly.subplots import make_subplots
 
-# 新增辅助函数（移动到文件顶部）
-def _has_separator(file_path):
-    """ 检测CSV文件是否包含分隔线 """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
+# 缓存以Arrow IPC(feather)格式保存，读取时不会执行代码；未安装pyarrow时不使用缓存
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+# 汇总CSV的列类型，未列出的列由pandas推断
+SUMMARY_STR_COLUMNS = ['PRODUCT', 'HHGRACE_PRODUCT', 'FAB1_LOTID', 'FAB2_LOTID', 'FAB7_LOTID', 'WAFER_ID']
+SUMMARY_NUMERIC_COLUMNS = ['GOOD_DIE', 'GROSS_DIE', 'YIELD(%)']
+
+# MEASURE_TIME的固定格式，例如 2/13/2025 18:52 和 2025-03-03 00:05:16，每个文件按首个值选定一种
+MEASURE_TIME_FORMATS = ['%m/%d/%Y %H:%M', '%Y-%m-%d %H:%M:%S']
+
+# 解析结果缓存目录（位于数据目录下），读取逻辑变化时修改版本号使旧缓存失效
+SUMMARY_CACHE_DIR = '.summary_cache'
+SUMMARY_CACHE_VERSION = 2
+
+def _sniff_csv(file_path):
+    """ 一次读取文件开头，识别表头、分隔符以及第二行是否为分隔线 """
+    with open(file_path, 'r', encoding='utf-8', newline='') as f:
+        sample = f.read(64 * 1024)
+
+    try:
+        delimiter = csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+    except csv.Error:
+        delimiter = ','
+
+    rows = csv.reader(sample.splitlines()[:2], delimiter=delimiter)
+    header = next(rows, [])
+    second_line = next(rows, None)
+
+    # 分隔线特征：第二行不含数字
+    has_separator = second_line is not None and all(not re.search(r'\d', cell) for cell in second_line)
+
+    return header, delimiter, has_separator
+
+def _parse_measure_time(values):
+    """ 按首个非空值选定MEASURE_TIME的格式，再以该固定格式解析整列 """
+    first = values.dropna()
+    if first.empty:
+        return pd.to_datetime(values, errors='coerce')
+
+    for time_format in MEASURE_TIME_FORMATS:
+        try:
+            datetime.strptime(str(first.iloc[0]).strip(), time_format)
+        except ValueError:
+            continue
+        return pd.to_datetime(values, format=time_format, errors='coerce')
+
+    # 未知格式保留原始字符串
+    return values
+
+def load_summary_csv(data_file):
+    """ 读取汇总CSV，解析结果按文件指纹（路径、大小、修改时间）缓存 """
+    data_file = os.path.abspath(data_file)
+    stat = os.stat(data_file)
+    fingerprint = json.dumps([SUMMARY_CACHE_VERSION, stat.st_size, stat.st_mtime_ns]).encode('utf-8')
+
+    cache_dir = os.path.join(os.path.dirname(data_file), SUMMARY_CACHE_DIR)
+    cache_file = os.path.join(cache_dir, hashlib.sha256(data_file.encode('utf-8')).hexdigest()[:16] + '.feather')
+
+    # 文件未变化时直接使用缓存，指纹保存在表的元数据中
+    if pa is not None:
         try:
-            next(reader)  # 跳过标题行
-            second_line = next(reader)
-            return all(not re.search(r'\d', cell) for cell in second_line)
-        except StopIteration:
-            return False
+            table = feather.read_table(cache_file, memory_map=False)
+            if (table.schema.metadata or {}).get(b'summary_fingerprint') == fingerprint:
+                return table.to_pandas()
+        except Exception:
+            pass
+
+    header, delimiter, has_separator = _sniff_csv(data_file)
+
+    # 按去除空白后的列名指定类型，表头中的列名可能带空格
+    columns = {name.strip(): name for name in header}
+    dtype = {columns[name]: str for name in SUMMARY_STR_COLUMNS if name in columns}
+    numeric_dtype = {columns[name]: 'float64' for name in SUMMARY_NUMERIC_COLUMNS if name in columns}
+
+    read_options = dict(
+        sep=delimiter,
+        skipinitialspace=True,
+        engine='c',
+        skip_blank_lines=True,
+        header=0,
+        # 数据行末尾多出分隔符时不把第一列当作索引
+        index_col=False,
+        skiprows=[1] if has_separator else None
+    )
+
+    try:
+        df = pd.read_csv(data_file, dtype={**dtype, **numeric_dtype}, **read_options)
+    except ValueError:
+        # 数值列中有无法解析的值时按字符串读取，后续由pd.to_numeric剔除
+        df = pd.read_csv(data_file, dtype={**dtype, **{name: str for name in numeric_dtype}}, **read_options)
+
+    df.columns = df.columns.str.strip()
+
+    if 'MEASURE_TIME' in df.columns:
+        df['MEASURE_TIME'] = _parse_measure_time(df['MEASURE_TIME'])
+
+    # 缓存写入失败不影响本次读取
+    if pa is not None:
+        tmp_file = f'{cache_file}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), b'summary_fingerprint': fingerprint})
+            feather.write_feather(table, tmp_file)
+            os.replace(tmp_file, cache_file)
+        except (OSError, pa.ArrowException) as e:
+            print(f"写入缓存失败: {str(e)}")
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
+
+    return df
+
 def plot_yield_chart_html(data_file, output_html=None):
     # 如果没有指定输出路径，则在数据文件所在目录下创建HTML文件
     if output_html is None:
@@ -27,20 +135,10 @@ def plot_yield_chart_html(data_file, output_html=None):
     # 读取数据文件（支持CSV和Excel格式）
     file_ext = os.path.splitext(data_file)[1].lower()
     if file_ext == '.csv':
-        # 修改skiprows参数为动态判断
-        df = pd.read_csv(
-            data_file,
-            dtype={'WAFER_ID': str},
-            skipinitialspace=True,
-            parse_dates=False,
-            engine='python',
-            skip_blank_lines=True,
-            header=0,
-            skiprows=lambda x: x == 1 if _has_separator(data_file) else False  # 新增判断逻辑
-        )
+        # 只识别一次分隔符和分隔线，使用C引擎和固定的列类型读取，结果按文件指纹缓存
+        df = load_summary_csv(data_file)
         
-        # 新增列名清洗逻辑
-        df.columns = df.columns.str.strip()
+        # 列名已去除空白
         print("\n清洗后列名:", list(df.columns))
         
         # 新增数据格式验证（移动到单次读取后）
@@ -265,17 +363,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
-
-# 新增辅助函数（添加到文件末尾）
-def _has_separator(file_path):
-    """ 检测CSV文件是否包含分隔线 """
-    with open(file_path, 'r', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        try:
-            next(reader)  # 跳过标题行
-            second_line = next(reader)
-            # 检测分隔线特征：包含非字母数字字符且无数字
-            return all(not re.search(r'\d', cell) for cell in second_line)
-        except StopIteration:
-            return False
\ No newline at end of file
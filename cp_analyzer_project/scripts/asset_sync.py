@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试报告静态资源同步模块
+按内容哈希增量复制CSS/JS文件，并生成带哈希的文件名
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+# 需要同步的静态资源子目录
+ASSET_DIRS = ('css', 'js')
+
+# 输出目录中记录已同步资源的清单文件
+MANIFEST_FILE = 'asset_manifest.json'
+
+# plotly.js在资源表中的名称，文件名带版本号，内容随版本固定
+PLOTLYJS_ASSET = 'js/plotly.min.js'
+
+# 本进程已同步过的 (静态资源目录, 输出目录)
+_synced = {}
+
+def _file_digest(path):
+    """
+    计算文件内容的SHA-256哈希
+    
+    Args:
+        path (str): 文件路径
+        
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha256()
+    
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+            
+    return digest.hexdigest()
+
+def _hashed_name(name, digest):
+    """
+    生成带内容哈希的文件名，如 css/style.1a2b3c4d5e6f.css
+    
+    Args:
+        name (str): 资源名称
+        digest (str): 内容哈希
+        
+    Returns:
+        str: 带哈希的文件名
+    """
+    root, ext = os.path.splitext(name)
+    return f"{root}.{digest[:12]}{ext}"
+
+def _load_manifest(manifest_path):
+    """
+    读取资源清单，清单不存在或损坏时返回空清单
+    
+    Args:
+        manifest_path (str): 清单文件路径
+        
+    Returns:
+        dict: 资源清单
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_manifest(manifest_path, manifest):
+    """
+    写入资源清单，先写临时文件再替换
+    
+    Args:
+        manifest_path (str): 清单文件路径
+        manifest (dict): 资源清单
+    """
+    tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        
+    os.replace(tmp_path, manifest_path)
+
+def _prune_assets(output_static_dir, manifest):
+    """
+    删除清单不再引用的已同步文件，如内容变化前的CSS副本或旧版本的plotly.js
+    
+    Args:
+        output_static_dir (str): 输出目录的static目录
+        manifest (dict): 资源清单
+    """
+    referenced = {record['file'] for record in manifest.values()}
+    
+    for subdir in ASSET_DIRS:
+        dir_path = os.path.join(output_static_dir, subdir)
+        if not os.path.isdir(dir_path):
+            continue
+            
+        for file_name in os.listdir(dir_path):
+            path = os.path.join(dir_path, file_name)
+            
+            if f"{subdir}/{file_name}" not in referenced and os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+def sync_assets(static_dir, output_dir):
+    """
+    将静态资源同步到输出目录的static目录，只复制内容变化的文件
+    
+    源文件的大小和修改时间与清单一致时不重新计算哈希，因此对已同步的
+    输出目录只需读取清单和stat源文件。每个输出目录在每个进程中只同步一次。
+    清单不再引用的副本（包括已删除源文件的副本）会被删除。
+    
+    Args:
+        static_dir (str): 静态资源源目录
+        output_dir (str): 报告输出目录
+        
+    Returns:
+        dict: 资源名称到页面引用路径的映射，如 {'css/style.css': 'static/css/style.1a2b3c4d5e6f.css'}
+    """
+    key = (os.path.abspath(static_dir), os.path.abspath(output_dir))
+    if key in _synced:
+        return _synced[key]
+        
+    output_static_dir = os.path.join(key[1], 'static')
+    manifest_path = os.path.join(output_static_dir, MANIFEST_FILE)
+    manifest = _load_manifest(manifest_path)
+    changed = False
+    sources = {PLOTLYJS_ASSET}
+    
+    for subdir in ASSET_DIRS:
+        src_dir = os.path.join(key[0], subdir)
+        if not os.path.isdir(src_dir):
+            continue
+            
+        for file_name in sorted(os.listdir(src_dir)):
+            src = os.path.join(src_dir, file_name)
+            if not os.path.isfile(src):
+                continue
+                
+            name = f"{subdir}/{file_name}"
+            sources.add(name)
+            stat = os.stat(src)
+            record = manifest.get(name)
+            
+            # 大小和修改时间未变且输出文件存在时跳过
+            if (record is not None
+                    and record.get('size') == stat.st_size
+                    and record.get('mtime_ns') == stat.st_mtime_ns
+                    and os.path.exists(os.path.join(output_static_dir, record['file']))):
+                continue
+                
+            digest = _file_digest(src)
+            record = {
+                'file': _hashed_name(name, digest),
+                'sha256': digest,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            }
+            
+            dst = os.path.join(output_static_dir, record['file'])
+            if not os.path.exists(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+                
+            manifest[name] = record
+            changed = True
+            
+    # plotly.js由plotly包提供，版本号即可确定内容
+    plotlyjs_version = get_plotlyjs_version()
+    record = manifest.get(PLOTLYJS_ASSET)
+    
+    if (record is None
+            or record.get('version') != plotlyjs_version
+            or not os.path.exists(os.path.join(output_static_dir, record['file']))):
+        record = {
+            'file': f"js/plotly-{plotlyjs_version}.min.js",
+            'version': plotlyjs_version
+        }
+        
+        dst = os.path.join(output_static_dir, record['file'])
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+            
+        manifest[PLOTLYJS_ASSET] = record
+        changed = True
+        
+    # 移除源文件已删除的资源
+    for name in set(manifest) - sources:
+        del manifest[name]
+        changed = True
+        
+    if changed:
+        _save_manifest(manifest_path, manifest)
+        
+    _prune_assets(output_static_dir, manifest)
+    
+    assets = {name: f"static/{record['file']}" for name, record in manifest.items()}
+    _synced[key] = assets
+    
+    return assets
@@ -5,9 +5,14 @@
 晶圆厂CP测试数据图表生成模块
 """
 
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
+import downsampling
+import figure_builder
+from downsampling import sample_group_indices
+from figure_builder import FigureSpec, encode_array
+from figure_cache import source_fingerprint
+from run_timer import timed
+from run_trace import get_tracer, traced, span
 
 class CPChartGenerator:
     """
@@ -16,16 +21,26 @@ class CPChartGenerator:
     用于生成各种数据可视化图表
     """
     
-    def __init__(self, analyzer=None):
+    def __init__(self, analyzer=None, webgl_threshold=200000, points_per_group=5000, cache=None):
         """
         初始化图表生成器
         
         Args:
             analyzer (CPDataAnalyzer): 数据分析器对象
+            webgl_threshold (int): 数据点数超过该值时散点降采样并使用WebGL绘制
+            points_per_group (int): 大数据模式下每个晶圆片绘制的散点数
+            cache (FigureCache): 图表磁盘缓存
         """
         self.analyzer = analyzer
         self.charts = {}
+        self.cache = cache
+        # 可选的运行计时器，记录图表生成和序列化耗时
+        self.timer = None
+        self.tracer = get_tracer()
+        self.webgl_threshold = webgl_threshold
+        self.points_per_group = points_per_group
     
+    @traced('chart.build', 'param')
     def generate_boxplot_with_scatter(self, param):
         """
         生成箱型图和散点图的组合图表
@@ -34,7 +49,7 @@ class CPChartGenerator:
             param (str): 参数名称
             
         Returns:
-            Figure: Plotly图表对象
+            FigureSpec: 图表对象
         """
         # 获取参数信息
         param_info = self.analyzer.get_parameter_info(param)
@@ -73,8 +88,8 @@ class CPChartGenerator:
         if limits.get('lower') is not None:
             y_min = min(y_min, limits['lower'] * 0.9)
         
-        # 创建图表
-        fig = go.Figure()
+        # 创建图表，布局模板预先生成
+        fig = FigureSpec('boxplot_with_scatter')
         
         # 创建蓝色标题背景
         fig.add_shape(
@@ -103,12 +118,16 @@ class CPChartGenerator:
             xanchor="left"
         )
         
+        # 数据量大时箱型图不再绘制全部点，改为降采样的WebGL散点
+        large = len(boxplot_data['y']) > self.webgl_threshold
+        
         # 添加箱型图
-        fig.add_trace(go.Box(
+        fig.add_trace(
+            'box',
             x=boxplot_data['x'],
-            y=boxplot_data['y'],
+            y=encode_array(boxplot_data['y']),
             name='VALUE',
-            boxpoints='all',  # 显示所有点
+            boxpoints=False if large else 'all',  # 显示所有点
             jitter=0.3,  # 点的抖动程度
             pointpos=0,  # 点的位置
             marker=dict(
@@ -124,7 +143,10 @@ class CPChartGenerator:
             whiskerwidth=0.6,
             boxmean=True,  # 显示均值
             showlegend=False
-        ))
+        )
+        
+        if large:
+            self._add_sampled_points(fig, boxplot_data, limits)
         
         # 计算每个晶圆片的平均值，用于添加平均值标记
         wafer_means = {}
@@ -143,9 +165,10 @@ class CPChartGenerator:
                 avg_x.append(wafer)
                 avg_y.append(wafer_means[wafer])
         
-        fig.add_trace(go.Scatter(
+        fig.add_trace(
+            'scatter',
             x=avg_x,
-            y=avg_y,
+            y=encode_array(avg_y),
             mode='markers',
             name='Average',
             marker=dict(
@@ -158,54 +181,13 @@ class CPChartGenerator:
                 )
             ),
             showlegend=False
-        ))
-        
-        # 设置图表布局
-        fig.update_layout(
-            title=dict(
-                text=f"Box Plot<br>VALUE<br>PARAMETER:3.BVDSS",
-                x=0.5,
-                y=0.95,
-                xanchor='center',
-                yanchor='top',
-                font=dict(size=14)
-            ),
-            xaxis=dict(
-                title='',  # 不显示X轴标题
-                tickmode='array',
-                tickvals=list(range(len(wafers))),
-                ticktext=wafers,
-                gridcolor='rgba(200, 200, 200, 0.2)',  # 淡色网格
-                showgrid=True,
-                zeroline=False
-            ),
-            yaxis=dict(
-                title='VALUE',
-                zeroline=False,
-                range=[y_min, y_max],  # 设置Y轴范围
-                gridcolor='rgba(200, 200, 200, 0.2)',  # 淡色网格
-                showgrid=True
-            ),
-            legend=dict(
-                orientation='h',
-                yanchor='bottom',
-                y=-0.35,
-                xanchor='center',
-                x=0.5
-            ),
-            margin=dict(
-                l=50,
-                r=50,
-                t=100,
-                b=150
-            ),
-            height=800,
-            width=1200,
-            hovermode='closest',
-            template='plotly_white',
-            plot_bgcolor='rgba(240, 250, 255, 0.5)'  # 浅蓝色背景
         )
         
+        # 设置随数据变化的布局属性
+        fig.layout['xaxis']['tickvals'] = list(range(len(wafers)))
+        fig.layout['xaxis']['ticktext'] = wafers
+        fig.layout['yaxis']['range'] = [y_min, y_max]  # 设置Y轴范围
+        
         # 如果有限制，则添加水平线
         if limits.get('lower') is not None:
             fig.add_shape(
@@ -245,12 +227,104 @@ class CPChartGenerator:
         
         return fig
     
+    @traced('chart.figure', 'param', result=lambda fig_json: {'bytes': len(fig_json) if fig_json else 0})
+    def get_boxplot_with_scatter_json(self, param):
+        """
+        获取箱型图和散点图组合图表的JSON，优先从图表缓存读取
+        
+        Args:
+            param (str): 参数名称
+            
+        Returns:
+            str: 图表JSON，无法生成图表时返回None
+        """
+        key = None
+        df_clean = self.analyzer.df_clean
+        
+        if self.cache is not None and df_clean is not None and param in df_clean.columns:
+            columns = [col for col in ['Lot', 'Wafer', param] if col in df_clean.columns]
+            
+            with timed(self.timer, 'figure_cache', param):
+                key = self.cache.make_key(
+                    df_clean[columns],
+                    chart='boxplot_with_scatter',
+                    param=param,
+                    limits=self.analyzer.get_parameter_info(param)['limits'],
+                    webgl_threshold=self.webgl_threshold,
+                    points_per_group=self.points_per_group,
+                    code=_CODE_VERSION
+                )
+                
+                fig_json = self.cache.get(key)
+                
+            if fig_json is not None:
+                return fig_json
+                
+        with timed(self.timer, 'chart_build', param):
+            fig = self.generate_boxplot_with_scatter(param)
+            
+        if fig is None:
+            return None
+            
+        with timed(self.timer, 'serialize', param), span(self.tracer, 'chart.serialize', param=param):
+            fig_json = fig.to_json()
+            
+        if key is not None:
+            with timed(self.timer, 'figure_cache', param):
+                self.cache.put(key, fig_json)
+            
+        return fig_json
+    
+    def _add_sampled_points(self, fig, boxplot_data, limits):
+        """
+        向图表添加降采样后的WebGL散点，超限点和离群点全部保留
+        
+        Args:
+            fig (FigureSpec): 图表对象
+            boxplot_data (dict): 箱型图数据字典
+            limits (dict): 参数限制字典
+        """
+        x = np.asarray(boxplot_data['x'])
+        y = np.asarray(boxplot_data['y'], dtype=float)
+        
+        keep = sample_group_indices(x, y, self.points_per_group, limits.get('lower'), limits.get('upper'))
+        
+        fig.add_trace(
+            'scattergl',
+            x=x[keep].tolist(),
+            y=encode_array(y[keep]),
+            mode='markers',
+            name='VALUE',
+            marker=dict(
+                color='brown',
+                size=3,
+                opacity=0.6
+            ),
+            showlegend=False
+        )
+        
+        # 标注实际数据点数
+        fig.add_annotation(
+            x=1.0,
+            y=1.0,
+            xref="paper",
+            yref="paper",
+            xanchor="right",
+            yanchor="bottom",
+            text=f"Showing {len(keep):,} of {len(y):,} dies (out-of-limit and outlier dies kept)",
+            showarrow=False,
+            font=dict(
+                color="gray",
+                size=10
+            )
+        )
+    
     def _add_stats_table(self, fig, param, stats):
         """
         向图表添加统计信息表格
         
         Args:
-            fig (Figure): Plotly图表对象
+            fig (FigureSpec): 图表对象
             param (str): 参数名称
             stats (dict): 统计信息字典
         """
@@ -280,30 +354,31 @@ class CPChartGenerator:
             table_data.append(["下限", f"{overall_stats['lower_limit']:.6f}"])
         
         # 添加表格到图表
-        fig.add_trace(go.Table(
+        fig.add_trace(
+            'table',
             domain=dict(x=[0.7, 1.0], y=[0.5, 1.0]),
             header=dict(
                 values=["<b>统计指标</b>", "<b>数值</b>"],
-                line_color='darkslategray',
-                fill_color='lightgrey',
+                line=dict(color='darkslategray'),
+                fill=dict(color='lightgrey'),
                 align='center',
                 font=dict(color='black', size=12)
             ),
             cells=dict(
-                values=list(zip(*table_data))[1:],
-                line_color='darkslategray',
-                fill_color='white',
+                values=[list(column) for column in zip(*table_data)][1:],
+                line=dict(color='darkslategray'),
+                fill=dict(color='white'),
                 align='left',
                 font=dict(color='black', size=11)
             )
-        ))
+        )
     
     def _add_wafer_stats_table(self, fig, param, stats):
         """
         向图表添加Wafer统计信息表格
         
         Args:
-            fig (Figure): Plotly图表对象
+            fig (FigureSpec): 图表对象
             param (str): 参数名称
             stats (dict): 统计信息字典
         """
@@ -334,24 +409,25 @@ class CPChartGenerator:
         ]
         
         # 添加表格到图表
-        fig.add_trace(go.Table(
+        fig.add_trace(
+            'table',
             domain=dict(x=[0.0, 1.0], y=[0.0, 0.12]),
             header=dict(
                 values=[""] * (len(wafers) + 1),  # 空白表头
-                line_color='white',
-                fill_color='white',
+                line=dict(color='white'),
+                fill=dict(color='white'),
                 height=0
             ),
             cells=dict(
                 values=table_rows,
-                line_color='darkslategray',
-                fill_color=[
+                line=dict(color='darkslategray'),
+                fill=dict(color=[
                     'white',  # 第一列颜色
                     ['white'] + ['white'] * len(wafers),  # 平均值那一行
                     ['white'] + ['white'] * len(wafers),  # 标准差那一行
                     ['white'] + ['white'] * len(wafers),  # WAFER那一行
                     ['white'] + ['white'] * len(wafers)   # LOT那一行
-                ],
+                ]),
                 align=['center'] * (len(wafers) + 1),
                 font=dict(
                     color=[
@@ -365,7 +441,7 @@ class CPChartGenerator:
                 ),
                 height=25
             )
-        ))
+        )
         
         # 添加批次信息在表格下方居中
         fig.add_annotation(
@@ -440,4 +516,7 @@ class CPChartGenerator:
             showarrow=False,
             font=dict(color="black", size=10),
             align="left"
-        )
\ No newline at end of file
+        )
+
+# 图表代码变化时重新生成缓存的图表
+_CODE_VERSION = source_fingerprint(__file__, downsampling.__file__, figure_builder.__file__)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试图表数据压缩模块
+将图表JSON打包为压缩的二进制数据，写入报告的图表数据文件
+
+压缩格式为 {"encoding": "deflate", "data": <base64>}，data解压后依次为：
+4字节小端序的头部长度、UTF-8编码的JSON头部 {"figure": ..., "arrays": [...]}、数组数据。
+图表中的类型化数组和较长的重复字符串数组被替换为 {"$array": 序号}，
+数组按小端序存储并按字节位置重排（先存所有数值的第1个字节，再存第2个字节，以此类推），
+重复字符串数组存储为指向categories列表的整数编码。
+浏览器端由script.js使用内置的DecompressionStream解压。
+
+numpy在使用处导入，main.py读取PAYLOAD_FORMATS构建命令行时无需加载numpy
+"""
+
+import json
+import zlib
+import base64
+import struct
+
+# 报告图表数据文件的可选格式
+PAYLOAD_FORMATS = ('typed', 'compressed')
+
+# 长度达到该值的字符串数组按分类编码存储
+CATEGORY_MIN_LENGTH = 64
+
+def _shuffle_bytes(array):
+    """
+    按数值内的字节位置重排数组字节，提高压缩率
+    
+    Args:
+        array (numpy.ndarray): 小端序数组
+        
+    Returns:
+        bytes: 重排后的数组字节
+    """
+    import numpy as np
+    
+    return array.view(np.uint8).reshape(-1, array.itemsize).T.tobytes()
+
+class _ArrayPacker:
+    """
+    将图表中的数组收集为一个二进制数据块
+    """
+    def __init__(self, float32=True):
+        """
+        初始化数组打包器
+        
+        Args:
+            float32 (bool): 浮点数组是否存储为float32
+        """
+        self.float32 = float32
+        self.arrays = []
+        self.chunks = []
+        self.offset = 0
+        
+    def add(self, array, **details):
+        """
+        向数据块添加数组
+        
+        Args:
+            array (numpy.ndarray): 数组
+            **details: 数组描述的附加字段，例如categories
+            
+        Returns:
+            dict: 在图表中代替该数组的引用
+        """
+        import numpy as np
+        
+        if self.float32 and array.dtype.kind == 'f':
+            array = array.astype('<f4')
+            
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        data = _shuffle_bytes(array)
+        
+        self.arrays.append(dict(dtype=array.dtype.str[1:], offset=self.offset, length=len(array), **details))
+        self.chunks.append(data)
+        self.offset += len(data)
+        
+        return {'$array': len(self.arrays) - 1}
+        
+    def pack(self, value):
+        """
+        将图表中的类型化数组和重复字符串数组替换为引用
+        
+        Args:
+            value: 图表或图表的一部分
+            
+        Returns:
+            替换数组后的图表
+        """
+        import numpy as np
+        
+        if isinstance(value, dict):
+            if 'bdata' in value and 'dtype' in value and 'shape' not in value:
+                return self.add(np.frombuffer(base64.b64decode(value['bdata']), dtype='<' + value['dtype']))
+                
+            return {key: self.pack(item) for key, item in value.items()}
+            
+        if isinstance(value, list):
+            if len(value) >= CATEGORY_MIN_LENGTH and all(isinstance(item, str) for item in value):
+                categories, codes = np.unique(value, return_inverse=True)
+                
+                if len(categories) <= len(value) // 4:
+                    dtype = '<u1' if len(categories) <= 256 else '<u2' if len(categories) <= 65536 else '<u4'
+                    return self.add(codes.astype(dtype), categories=categories.tolist())
+                    
+            return [self.pack(item) for item in value]
+            
+        return value
+
+def compress_figure_json(fig_json, float32=True, level=9):
+    """
+    将图表JSON打包为压缩的二进制数据
+    
+    float32约有7位有效数字，高于测试机日志记录的精度，因此默认用于测试值
+    
+    Args:
+        fig_json (str): 图表JSON
+        float32 (bool): 浮点数组是否存储为float32
+        level (int): deflate压缩级别
+        
+    Returns:
+        str: 压缩数据JSON
+    """
+    packer = _ArrayPacker(float32)
+    figure = packer.pack(json.loads(fig_json))
+    
+    header = json.dumps({'figure': figure, 'arrays': packer.arrays}, separators=(',', ':')).encode('utf-8')
+    data = zlib.compress(b''.join([struct.pack('<I', len(header)), header] + packer.chunks), level)
+    
+    return json.dumps({'encoding': 'deflate', 'data': base64.b64encode(data).decode('ascii')})
+
+def encode_payload(fig_json, payload='typed'):
+    """
+    按指定格式编码图表数据
+    
+    Args:
+        fig_json (str): 图表JSON
+        payload (str): 'typed'保留使用Plotly类型化数组的图表JSON，
+            'compressed'使用compress_figure_json()打包压缩
+            
+    Returns:
+        str: 图表数据JSON
+    """
+    if payload == 'compressed':
+        return compress_figure_json(fig_json)
+        
+    return fig_json
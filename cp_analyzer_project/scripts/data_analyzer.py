@@ -7,6 +7,7 @@
 
 import pandas as pd
 import numpy as np
+from run_trace import get_tracer, traced
 
 class CPDataAnalyzer:
     """
@@ -28,7 +29,9 @@ class CPDataAnalyzer:
         self.df_clean = None
         self.target_params = target_params or []
         self.limits = limits or {}
+        self.tracer = get_tracer()
     
+    @traced('analyzer.clean', result=lambda df_clean: {'rows': len(df_clean) if df_clean is not None else 0})
     def clean_data(self):
         """
         数据清洗
@@ -173,6 +176,7 @@ class CPDataAnalyzer:
         
         return data
     
+    @traced('analyzer.stats', 'param')
     def calculate_statistics(self, param):
         """
         计算参数的统计信息
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试数据散点降采样模块
+"""
+
+import numpy as np
+
+def find_keep_mask(values, lower=None, upper=None):
+    """
+    找出必须绘制的数据点
+    
+    包括超出上下限的点和超出1.5倍四分位距箱线范围的离群点
+    
+    Args:
+        values (ndarray): 参数值
+        lower (float): 下限值
+        upper (float): 上限值
+        
+    Returns:
+        ndarray: 需要保留的数据点布尔掩码
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    keep = np.zeros(len(values), dtype=bool)
+    
+    if not finite.any():
+        return keep
+        
+    q1, q3 = np.percentile(values[finite], [25, 75])
+    fence = 1.5 * (q3 - q1)
+    
+    with np.errstate(invalid='ignore'):
+        keep |= (values < q1 - fence) | (values > q3 + fence)
+        
+        if lower is not None:
+            keep |= values < lower
+            
+        if upper is not None:
+            keep |= values > upper
+            
+    return keep
+
+def sample_indices(values, budget, lower=None, upper=None, seed=0):
+    """
+    从一组数据中挑选约budget个点用于绘制
+    
+    超限点和离群点始终保留，剩余名额从其他点中均匀随机抽取；
+    随机种子固定，相同数据生成相同图表
+    
+    Args:
+        values (ndarray): 一组参数值
+        budget (int): 绘制点数
+        lower (float): 下限值
+        upper (float): 上限值
+        seed (int): 随机种子
+        
+    Returns:
+        ndarray: 排序后的绘制点索引
+    """
+    values = np.asarray(values, dtype=float)
+    
+    if len(values) <= budget:
+        return np.arange(len(values))
+        
+    keep = find_keep_mask(values, lower, upper)
+    rest = np.flatnonzero(~keep & np.isfinite(values))
+    n_rest = min(max(budget - int(keep.sum()), 0), len(rest))
+    
+    rng = np.random.default_rng(seed)
+    sampled = rng.choice(rest, size=n_rest, replace=False)
+    
+    return np.sort(np.concatenate([np.flatnonzero(keep), sampled]))
+
+def sample_group_indices(groups, values, budget, lower=None, upper=None, seed=0):
+    """
+    按分组分别挑选绘制点，每组独立计算点数预算
+    
+    Args:
+        groups (ndarray): 每个点所属的分组
+        values (ndarray): 参数值
+        budget (int): 每组绘制点数
+        lower (float): 下限值
+        upper (float): 上限值
+        seed (int): 随机种子
+        
+    Returns:
+        ndarray: 排序后的绘制点索引
+    """
+    values = np.asarray(values, dtype=float)
+    _, codes = np.unique(np.asarray(groups), return_inverse=True)
+    
+    order = np.argsort(codes, kind='stable')
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    
+    selected = [
+        members[sample_indices(values[members], budget, lower, upper, seed)]
+        for members in np.split(order, bounds)
+    ]
+    
+    return np.sort(np.concatenate(selected)) if selected else np.arange(0)
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试数据图表快速构建模块
+直接生成Plotly图表JSON，跳过graph_objects的逐属性校验
+"""
+
+import copy
+import json
+import base64
+import numpy as np
+import plotly.io as pio
+
+# NumPy类型与Plotly类型化数组类型的对应关系
+_TYPED_ARRAY_DTYPES = {
+    'float64': 'f8',
+    'float32': 'f4',
+    'int32': 'i4',
+    'int16': 'i2',
+    'int8': 'i1',
+    'uint32': 'u4',
+    'uint16': 'u2',
+    'uint8': 'u1'
+}
+
+# 各图表类型预先生成的布局模板
+_LAYOUT_TEMPLATES = {}
+
+def encode_array(values, dtype='float64'):
+    """
+    将数组编码为Plotly类型化数组（base64二进制）
+    
+    Args:
+        values (array-like): 数值数组
+        dtype (str): NumPy数据类型
+        
+    Returns:
+        dict: Plotly类型化数组 {'dtype': ..., 'bdata': ...}
+    """
+    array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder('<'))
+    
+    return {
+        'dtype': _TYPED_ARRAY_DTYPES[np.dtype(dtype).name],
+        'bdata': base64.b64encode(array.tobytes()).decode('ascii')
+    }
+
+def _to_json_default(value):
+    """
+    JSON序列化时转换NumPy标量和数组
+    
+    Args:
+        value: 无法直接序列化的对象
+        
+    Returns:
+        可序列化的Python对象
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"无法序列化类型 {type(value).__name__}")
+
+def _boxplot_with_scatter_layout():
+    """
+    生成箱型图和散点图组合图表的布局模板
+    
+    Returns:
+        dict: 布局模板
+    """
+    return {
+        'template': pio.templates['plotly_white'].to_plotly_json(),
+        'shapes': [],
+        'annotations': [],
+        'title': {
+            'font': {'size': 14},
+            'text': 'Box Plot<br>VALUE<br>PARAMETER:3.BVDSS',
+            'x': 0.5,
+            'y': 0.95,
+            'xanchor': 'center',
+            'yanchor': 'top'
+        },
+        'xaxis': {
+            'title': {'text': ''},  # 不显示X轴标题
+            'tickmode': 'array',
+            'gridcolor': 'rgba(200, 200, 200, 0.2)',  # 淡色网格
+            'showgrid': True,
+            'zeroline': False
+        },
+        'yaxis': {
+            'title': {'text': 'VALUE'},
+            'zeroline': False,
+            'gridcolor': 'rgba(200, 200, 200, 0.2)',  # 淡色网格
+            'showgrid': True
+        },
+        'legend': {
+            'orientation': 'h',
+            'yanchor': 'bottom',
+            'y': -0.35,
+            'xanchor': 'center',
+            'x': 0.5
+        },
+        'margin': {'l': 50, 'r': 50, 't': 100, 'b': 150},
+        'height': 800,
+        'width': 1200,
+        'hovermode': 'closest',
+        'plot_bgcolor': 'rgba(240, 250, 255, 0.5)'  # 浅蓝色背景
+    }
+
+_LAYOUT_BUILDERS = {
+    'boxplot_with_scatter': _boxplot_with_scatter_layout
+}
+
+def get_layout_template(chart_type):
+    """
+    获取图表类型的布局模板副本，模板每个进程只生成一次
+    
+    Args:
+        chart_type (str): 图表类型
+        
+    Returns:
+        dict: 布局模板副本
+    """
+    if chart_type not in _LAYOUT_TEMPLATES:
+        _LAYOUT_TEMPLATES[chart_type] = _LAYOUT_BUILDERS[chart_type]()
+        
+    return copy.deepcopy(_LAYOUT_TEMPLATES[chart_type])
+
+class FigureSpec:
+    """
+    以普通字典表示的Plotly图表
+    
+    接口与go.Figure的常用方法一致，但不做属性校验
+    """
+    
+    def __init__(self, chart_type=None):
+        """
+        初始化图表
+        
+        Args:
+            chart_type (str): 图表类型，用于加载预生成的布局模板
+        """
+        self.data = []
+        self.layout = get_layout_template(chart_type) if chart_type else {}
+        
+    def add_trace(self, trace_type, **trace):
+        """
+        添加数据轨迹
+        
+        Args:
+            trace_type (str): 轨迹类型，如 'box'、'scatter'、'table'
+            **trace: 轨迹属性
+        """
+        trace['type'] = trace_type
+        self.data.append(trace)
+        
+    def add_shape(self, **shape):
+        """
+        添加形状
+        
+        Args:
+            **shape: 形状属性
+        """
+        self.layout.setdefault('shapes', []).append(shape)
+        
+    def add_annotation(self, **annotation):
+        """
+        添加注释
+        
+        Args:
+            **annotation: 注释属性
+        """
+        self.layout.setdefault('annotations', []).append(annotation)
+        
+    def to_plotly_json(self):
+        """
+        获取图表字典
+        
+        Returns:
+            dict: {'data': ..., 'layout': ...}
+        """
+        return {'data': self.data, 'layout': self.layout}
+        
+    def to_json(self):
+        """
+        序列化为图表JSON
+        
+        Returns:
+            str: 图表JSON
+        """
+        return json.dumps(self.to_plotly_json(), separators=(',', ':'), default=_to_json_default)
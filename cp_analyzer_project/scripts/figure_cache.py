@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试数据图表缓存模块
+按输入数据指纹将序列化后的图表缓存到磁盘
+"""
+
+import os
+import json
+import hashlib
+import pandas as pd
+import plotly
+
+def source_fingerprint(*paths):
+    """
+    计算生成图表的源代码文件指纹
+    
+    Args:
+        *paths: 影响图表的源代码文件路径
+        
+    Returns:
+        str: 源代码文件的十六进制摘要
+    """
+    digest = hashlib.sha256()
+    
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+            
+    return digest.hexdigest()
+
+class FigureCache:
+    """
+    有容量上限的图表JSON磁盘缓存
+    """
+    
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        """
+        初始化图表缓存
+        
+        Args:
+            cache_dir (str): 缓存目录
+            max_bytes (int): 缓存总大小上限，默认256MB
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+    def make_key(self, frame, **options):
+        """
+        根据输入数据和图表选项生成缓存键
+        
+        Args:
+            frame (DataFrame): 生成图表所用的数据列
+            **options: 上下限、分组等图表选项
+            
+        Returns:
+            str: 缓存键
+        """
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        digest.update('|'.join(map(str, frame.columns)).encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(plotly.__version__.encode('utf-8'))
+        
+        return digest.hexdigest()
+        
+    def _path(self, key):
+        """
+        获取缓存条目的文件路径
+        
+        Args:
+            key (str): 缓存键
+            
+        Returns:
+            str: 缓存图表JSON文件路径
+        """
+        return os.path.join(self.cache_dir, f'{key}.json')
+        
+    def get(self, key):
+        """
+        读取缓存的图表
+        
+        Args:
+            key (str): 缓存键
+            
+        Returns:
+            str: 图表JSON，未命中时返回None
+        """
+        path = self._path(key)
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                fig_json = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+            
+        # 更新访问时间，淘汰时优先删除最久未使用的图表
+        os.utime(path)
+        self.hits += 1
+        
+        return fig_json
+        
+    def put(self, key, fig_json):
+        """
+        写入图表缓存
+        
+        Args:
+            key (str): 缓存键
+            fig_json (str): 图表JSON
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(fig_json)
+            
+        os.replace(tmp_path, path)
+        
+        self._evict()
+        
+    def _evict(self):
+        """
+        删除最久未使用的条目，直到缓存大小不超过上限
+        """
+        entries = []
+        
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    
+        total = sum(size for _, size, _ in entries)
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+                
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+                
+            total -= size
+            
+    def summary(self):
+        """
+        获取用于运行日志的命中统计
+        
+        Returns:
+            str: 命中与未命中次数
+        """
+        return f"图表缓存: 命中 {self.hits} 次, 未命中 {self.misses} 次 ({self.cache_dir})"
@@ -7,24 +7,267 @@
 """
 
 import os
-import shutil
+import json
+import math
+import hashlib
 import jinja2
-import plotly.io as pio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from asset_sync import sync_assets
+from chart_payload import encode_payload
+from run_timer import timed
+from run_trace import get_tracer, traced, span
+
+# 索引页面模板，模板目录中存在index_template.html时优先使用该文件
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>晶圆厂CP测试数据分析报告</title>
+    <link rel="stylesheet" href="{{ assets['css/style.css'] }}">
+</head>
+<body>
+    <div class="container">
+        <h1>晶圆厂CP测试数据分析报告</h1>
+        
+        <h2>参数列表</h2>
+        
+        <ul class="param-list">
+            {% for file in report_files %}
+            <li><a href="{{ file }}">{{ file|replace('_report.html', '') }}</a></li>
+            {% endfor %}
+        </ul>
+        
+        <div class="footer">
+            <p>生成时间：{{ timestamp }}</p>
+            <p>晶圆厂CP测试数据分析工具</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# 流式写入报告文件时的写缓冲大小
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+# 各模板目录的Jinja环境，每个模板在每个进程中只编译一次
+_template_envs = {}
+
+def get_template_env(template_dir):
+    """
+    获取模板目录对应的Jinja环境
+    
+    编译后的模板字节码缓存在磁盘上，重复运行时跳过模板编译
+    
+    Args:
+        template_dir (str): 模板目录
+        
+    Returns:
+        Environment: Jinja环境
+    """
+    if template_dir not in _template_envs:
+        _template_envs[template_dir] = jinja2.Environment(
+            loader=jinja2.ChoiceLoader([
+                jinja2.FileSystemLoader(template_dir),
+                jinja2.DictLoader({'index_template.html': INDEX_TEMPLATE})
+            ]),
+            bytecode_cache=jinja2.FileSystemBytecodeCache()
+        )
+        
+    return _template_envs[template_dir]
+
+def stream_template(template, output_path, **context):
+    """
+    将模板逐块渲染并写入文件，不在内存中拼接整个页面
+    
+    Args:
+        template (jinja2.Template): 已编译的模板
+        output_path (str): 输出文件路径
+        **context: 模板变量
+        
+    Returns:
+        str: 输出文件路径
+    """
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    
+    # 先写入临时文件再替换，避免中断时留下半个页面
+    with open(tmp_path, 'w', encoding='utf-8', buffering=STREAM_BUFFER_SIZE) as f:
+        template.stream(**context).dump(f)
+        
+    os.replace(tmp_path, output_path)
+    
+    return output_path
+
+def write_chart_data(fig_json, div_id, output_dir):
+    """
+    将图表JSON写入输出目录下的附属数据文件
+    
+    数据文件以脚本形式保存，通过file://打开报告时也能加载。
+    引用路径带有内容摘要，重新生成后浏览器不会将新页面与缓存的旧图表数据搭配
+    
+    Args:
+        fig_json (str): 图表JSON
+        div_id (str): 图表div的ID
+        output_dir (str): 输出目录
+        
+    Returns:
+        str: 数据文件相对于报告页面的引用路径，如 charts/chart-BVDSS1.js?v=1a2b3c4d5e6f
+    """
+    charts_dir = os.path.join(output_dir, 'charts')
+    if not os.path.exists(charts_dir):
+        os.makedirs(charts_dir)
+        
+    content = f'cpChartLoaded("{div_id}", {fig_json});\n'
+    
+    with open(os.path.join(charts_dir, f"{div_id}.js"), 'w', encoding='utf-8') as f:
+        f.write(content)
+        
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    
+    return f"charts/{div_id}.js?v={digest}"
+
+def chart_div(div_id, data_src):
+    """
+    生成延迟绘制的图表占位div，滚动到可见区域时由script.js加载数据并绘图
+    
+    Args:
+        div_id (str): 图表div的ID
+        data_src (str): 图表数据文件路径
+        
+    Returns:
+        str: 图表占位div
+    """
+    return f'<div id="{div_id}" class="plotly-graph-div lazy-chart" data-src="{data_src}"></div>'
+
+# 统计表格的列：(标题, 统计量, 小数位数, 样式类)
+STATS_COLUMNS = [
+    ('平均值', 'mean', 4, 'blue-text'),
+    ('标准差', 'std', 4, 'brown-text'),
+    ('中位数', 'median', 4, None),
+    ('最小值', 'min', 4, None),
+    ('最大值', 'max', 4, None),
+    ('数据点数', 'count', None, None)
+]
+
+def _json(value):
+    """
+    将数据编码为可以放在script标签中的紧凑JSON
+    
+    Args:
+        value: 需要编码的数据
+        
+    Returns:
+        str: JSON文本
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+def _stats_row(name, stat):
+    """
+    将一组统计信息编码为表格行的JSON数组
+    
+    Args:
+        name (str): 分组名称
+        stat (dict): 统计信息
+        
+    Returns:
+        str: 表格行JSON
+    """
+    cells = [_json(str(name))]
+    
+    for _, key, decimals, _ in STATS_COLUMNS:
+        value = stat[key]
+        if decimals is None:
+            cells.append(str(value))
+        elif math.isfinite(value):
+            cells.append(f"{value:.{decimals}f}")
+        else:
+            cells.append('null')
+            
+    return '[' + ','.join(cells) + ']'
+
+def stats_table_data(stats, chunk_rows=1000):
+    """
+    生成统计表格的紧凑JSON，由script.js中的虚拟滚动表格只绘制可见的行，
+    分组数量再多页面加载时间也保持不变
+    
+    Args:
+        stats (dict): 参数统计信息
+        chunk_rows (int): 每个片段包含的行数
+        
+    Yields:
+        str: 表格JSON片段，可直接流式写入报告
+    """
+    columns = [{'title': '批次'}]
+    for title, _, decimals, class_name in STATS_COLUMNS:
+        column = {'title': title}
+        if decimals is not None:
+            column['decimals'] = decimals
+        if class_name:
+            column['className'] = class_name
+        columns.append(column)
+        
+    header = _json({'classes': 'stats-table', 'columns': columns})
+    yield f"{header[:-1]},\"footer\":[{_stats_row('总体', stats['overall'])}],\"rows\":["
+    
+    rows = [_stats_row(lot, stat) for lot, stat in stats['by_lot'].items()]
+    for start in range(0, len(rows), chunk_rows):
+        yield (',' if start else '') + ','.join(rows[start:start + chunk_rows])
+        
+    yield ']}'
+
+# 并行生成报告时，子进程通过fork继承的报告生成器（含只读的清洗后数据）
+_worker_report = None
+
+def _generate_report_worker(param):
+    """
+    在子进程中生成单个参数的HTML报告
+    
+    Args:
+        param (str): 参数名称
+        
+    Returns:
+        tuple: (报告文件路径, 图表缓存命中次数, 图表缓存未命中次数, 子进程中的计时记录)
+    """
+    cache = _worker_report.chart_generator.cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    
+    # 子进程继承的计时器中已有父进程的记录，只返回本次新增的记录
+    timer = _worker_report.timer
+    first_record = len(timer.records) if timer is not None else 0
+    
+    report_path = _worker_report.generate_report(param)
+    
+    records = timer.records[first_record:] if timer is not None else []
+    
+    # 子进程的跟踪区间写入各自的分片文件，由主进程合并
+    if _worker_report.tracer is not None:
+        _worker_report.tracer.flush()
+    
+    if cache is None:
+        return report_path, 0, 0, records
+        
+    return report_path, cache.hits - hits, cache.misses - misses, records
 
 class CPHTMLReport:
     """
     CP测试数据HTML报告生成类
     """
-    def __init__(self, chart_generator):
+    def __init__(self, chart_generator, payload='typed'):
         """
         初始化HTML报告生成器
         
         Args:
             chart_generator (CPChartGenerator): 图表生成器对象
+            payload (str): 图表数据文件格式，'typed'或'compressed'（见chart_payload）
         """
         self.chart_generator = chart_generator
+        self.payload = payload
         self.analyzer = chart_generator.analyzer
+        # 可选的运行计时器，记录统计、图表数据编码和模板渲染耗时
+        self.timer = None
+        self.tracer = get_tracer()
         # 默认输出目录
         self.output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
         self.template_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
@@ -48,49 +291,12 @@ class CPHTMLReport:
         if not os.path.exists(js_dir):
             os.makedirs(js_dir)
             
-        # 确保输出目录存在
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
-            
-        # 复制静态资源文件到输出目录
-        self._copy_static_files()
+        # 最近一次generate_all_reports生成的报告 {参数: 报告文件路径}
+        self.generated_reports = {}
         
-    def _copy_static_files(self):
-        """
-        复制静态资源文件到输出目录
-        """
-        # 创建输出目录中的静态资源目录
-        output_static_dir = os.path.join(self.output_dir, 'static')
-        if not os.path.exists(output_static_dir):
-            os.makedirs(output_static_dir)
-            
-        # 创建输出目录中的CSS目录
-        output_css_dir = os.path.join(output_static_dir, 'css')
-        if not os.path.exists(output_css_dir):
-            os.makedirs(output_css_dir)
-            
-        # 创建输出目录中的JS目录
-        output_js_dir = os.path.join(output_static_dir, 'js')
-        if not os.path.exists(output_js_dir):
-            os.makedirs(output_js_dir)
-            
-        # 复制CSS文件
-        css_files = [f for f in os.listdir(os.path.join(self.static_dir, 'css')) if f.endswith('.css')]
-        for css_file in css_files:
-            src = os.path.join(self.static_dir, 'css', css_file)
-            dst = os.path.join(output_css_dir, css_file)
-            shutil.copy2(src, dst)
-            
-        # 复制JS文件
-        js_files = [f for f in os.listdir(os.path.join(self.static_dir, 'js')) if f.endswith('.js')]
-        for js_file in js_files:
-            src = os.path.join(self.static_dir, 'js', js_file)
-            dst = os.path.join(output_js_dir, js_file)
-            shutil.copy2(src, dst)
-            
     def create_template(self):
         """
-        创建HTML模板
+        创建默认HTML模板，模板文件已存在时不覆盖
         
         Returns:
             str: 模板文件路径
@@ -98,6 +304,9 @@ class CPHTMLReport:
         # 创建模板文件路径
         template_path = os.path.join(self.template_dir, 'report_template.html')
         
+        if os.path.exists(template_path):
+            return template_path
+            
         # 创建模板内容
         template_content = """<!DOCTYPE html>
 <html lang="zh-CN">
@@ -105,9 +314,9 @@ class CPHTMLReport:
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>晶圆厂CP测试数据分析报告 - {{ param }}</title>
-    <link rel="stylesheet" href="static/css/style.css">
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-    <script src="static/js/script.js"></script>
+    <link rel="stylesheet" href="{{ assets['css/style.css'] }}">
+    <script src="{{ assets['js/plotly.min.js'] }}"></script>
+    <script src="{{ assets['js/script.js'] }}"></script>
 </head>
 <body>
     <div class="container">
@@ -130,37 +339,7 @@ class CPHTMLReport:
         
         <div class="stats-container">
             <h3>统计信息</h3>
-            <table class="stats-table">
-                <tr>
-                    <th>批次</th>
-                    <th>平均值</th>
-                    <th>标准差</th>
-                    <th>中位数</th>
-                    <th>最小值</th>
-                    <th>最大值</th>
-                    <th>数据点数</th>
-                </tr>
-                {% for lot, stat in stats.by_lot.items() %}
-                <tr>
-                    <td>{{ lot }}</td>
-                    <td class="blue-text">{{ "%.4f"|format(stat.mean) }}</td>
-                    <td class="brown-text">{{ "%.4f"|format(stat.std) }}</td>
-                    <td>{{ "%.4f"|format(stat.median) }}</td>
-                    <td>{{ "%.4f"|format(stat.min) }}</td>
-                    <td>{{ "%.4f"|format(stat.max) }}</td>
-                    <td>{{ stat.count }}</td>
-                </tr>
-                {% endfor %}
-                <tr>
-                    <td><strong>总体</strong></td>
-                    <td class="blue-text"><strong>{{ "%.4f"|format(stats.overall.mean) }}</strong></td>
-                    <td class="brown-text"><strong>{{ "%.4f"|format(stats.overall.std) }}</strong></td>
-                    <td><strong>{{ "%.4f"|format(stats.overall.median) }}</strong></td>
-                    <td><strong>{{ "%.4f"|format(stats.overall.min) }}</strong></td>
-                    <td><strong>{{ "%.4f"|format(stats.overall.max) }}</strong></td>
-                    <td><strong>{{ stats.overall.count }}</strong></td>
-                </tr>
-            </table>
+            <script type="application/json" class="table-data">{% for fragment in stats_table %}{{ fragment|safe }}{% endfor %}</script>
         </div>
         
         <div class="footer">
@@ -171,13 +350,17 @@ class CPHTMLReport:
 </body>
 </html>
 """
-        
-        # 写入模板文件
-        with open(template_path, 'w', encoding='utf-8') as f:
+
+        # 写入模板文件，先写临时文件再替换，避免其他进程读到写了一半的模板
+        tmp_path = f"{template_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
             f.write(template_content)
             
+        os.replace(tmp_path, template_path)
+        
         return template_path
-    
+        
+    @traced('report.parameter_report', 'param')
     def generate_report(self, param):
         """
         生成HTML报告
@@ -191,17 +374,25 @@ class CPHTMLReport:
         # 创建模板
         template_path = self.create_template()
         
-        # 生成图表
-        fig = self.chart_generator.generate_boxplot_with_scatter(param)
-        if fig is None:
+        # 同步静态资源文件到输出目录
+        assets = sync_assets(self.static_dir, self.output_dir)
+        
+        # 生成图表（优先使用图表缓存）
+        fig_json = self.chart_generator.get_boxplot_with_scatter_json(param)
+        if fig_json is None:
             print(f"错误: 无法生成参数 {param} 的图表")
             return None
             
         # 获取图表HTML
-        chart_html = pio.to_html(fig, include_plotlyjs=False, full_html=False)
-        
+        div_id = f"chart-{param}"
+        with timed(self.timer, 'payload', param), span(self.tracer, 'report.chart_data', param=param):
+            chart_data = encode_payload(fig_json, self.payload)
+            chart_html = chart_div(div_id, write_chart_data(chart_data, div_id, self.output_dir))
+            
         # 获取统计信息
-        stats = self.analyzer.calculate_statistics(param)
+        with timed(self.timer, 'analysis', param):
+            stats = self.analyzer.calculate_statistics(param)
+            
         if stats is None:
             print(f"错误: 无法获取参数 {param} 的统计信息")
             return None
@@ -209,30 +400,31 @@ class CPHTMLReport:
         # 获取所有参数
         params = [p for p in self.analyzer.target_params if p in self.analyzer.df.columns]
         
-        # 创建模板环境
-        env = jinja2.Environment(loader=jinja2.FileSystemLoader(self.template_dir))
-        template = env.get_template('report_template.html')
-        
-        # 渲染模板
-        html_content = template.render(
-            param=param,
-            params=params,
-            chart_html=chart_html,
-            stats=stats,
-            timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        )
+        # 获取已编译的模板
+        template = get_template_env(self.template_dir).get_template('report_template.html')
         
         # 创建HTML报告文件路径
         report_path = os.path.join(self.output_dir, f"{param}_report.html")
         
-        # 写入HTML报告文件
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
+        # 渲染模板并流式写入HTML报告文件
+        with timed(self.timer, 'render', param), span(self.tracer, 'report.render', param=param):
+            stream_template(
+                template,
+                report_path,
+                param=param,
+                params=params,
+                chart_html=chart_html,
+                stats=stats,
+                stats_table=stats_table_data(stats),
+                assets=assets,
+                timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            )
             
         print(f"HTML报告已生成: {report_path}")
         
         return report_path
-    
+        
+    @traced('report.index')
     def generate_index(self, report_files):
         """
         生成索引页面
@@ -246,79 +438,118 @@ class CPHTMLReport:
         # 创建索引页面文件路径
         index_path = os.path.join(self.output_dir, "index.html")
         
-        # 创建索引页面内容
-        index_content = """<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>晶圆厂CP测试数据分析报告</title>
-    <link rel="stylesheet" href="static/css/style.css">
-</head>
-<body>
-    <div class="container">
-        <h1>晶圆厂CP测试数据分析报告</h1>
-        
-        <h2>参数列表</h2>
-        
-        <ul class="param-list">
-            {% for file in report_files %}
-            <li><a href="{{ file }}">{{ file|replace('_report.html', '') }}</a></li>
-            {% endfor %}
-        </ul>
-        
-        <div class="footer">
-            <p>生成时间：{{ timestamp }}</p>
-            <p>晶圆厂CP测试数据分析工具</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-        
-        # 创建模板环境
-        env = jinja2.Environment(loader=jinja2.BaseLoader())
-        template = env.from_string(index_content)
+        # 获取已编译的模板
+        template = get_template_env(self.template_dir).get_template('index_template.html')
         
         # 获取报告文件名
         report_file_names = [os.path.basename(f) for f in report_files]
         
-        # 渲染模板
-        html_content = template.render(
+        # 渲染模板并流式写入索引页面文件
+        stream_template(
+            template,
+            index_path,
             report_files=report_file_names,
+            assets=sync_assets(self.static_dir, self.output_dir),
             timestamp=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         )
         
-        # 写入索引页面文件
-        with open(index_path, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-            
         print(f"索引页面已生成: {index_path}")
         
         return index_path
-    
-    def generate_all_reports(self):
+        
+    def generate_all_reports(self, jobs=1, params=None):
         """
         生成所有参数的HTML报告
         
+        Args:
+            jobs (int): 并行生成报告的进程数，1表示串行生成
+            params (list): 需要重新生成报告的参数，默认为全部参数；
+                其余参数沿用输出目录中已有的报告
+                
         Returns:
             str: 索引页面文件路径
         """
-        # 创建报告文件路径列表
-        report_files = []
-        
-        # 遍历目标参数
-        for param in self.analyzer.target_params:
-            if param in self.analyzer.df.columns:
+        # 获取需要生成报告的参数
+        all_params = [param for param in self.analyzer.target_params if param in self.analyzer.df.columns]
+        params = all_params if params is None else [param for param in all_params if param in params]
+        
+        # 子进程启动前准备好模板和静态资源，避免多个进程同时写入
+        self.create_template()
+        sync_assets(self.static_dir, self.output_dir)
+        
+        # 子进程需要通过fork共享清洗后的数据，不支持fork的平台串行生成
+        if jobs > 1 and len(params) > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+            print("警告: 当前平台不支持fork，改为串行生成报告")
+            jobs = 1
+            
+        if jobs > 1 and len(params) > 1:
+            report_paths = self._generate_reports_parallel(params, jobs)
+        else:
+            report_paths = []
+            for param in params:
                 print(f"正在生成参数 {param} 的HTML报告...")
                 
                 # 生成HTML报告
-                report_path = self.generate_report(param)
+                report_paths.append(self.generate_report(param))
+                
+        # 本次生成成功的报告
+        self.generated_reports = {
+            param: report_path for param, report_path in zip(params, report_paths) if report_path is not None
+        }
+        
+        # 按参数顺序汇总报告，未重新生成的参数使用已有的报告文件
+        report_files = []
+        for param in all_params:
+            report_path = self.generated_reports.get(param)
+            
+            if report_path is None and param not in params:
+                existing_path = os.path.join(self.output_dir, f"{param}_report.html")
+                report_path = existing_path if os.path.exists(existing_path) else None
+                
+            if report_path is not None:
+                report_files.append(report_path)
                 
-                if report_path is not None:
-                    report_files.append(report_path)
-                    
         # 生成索引页面
         index_path = self.generate_index(report_files)
         
-        return index_path
\ No newline at end of file
+        return index_path
+        
+    def _generate_reports_parallel(self, params, jobs):
+        """
+        使用进程池并行生成各参数的HTML报告
+        
+        Args:
+            params (list): 参数列表
+            jobs (int): 进程数
+            
+        Returns:
+            list: 与参数顺序一致的报告文件路径列表
+        """
+        global _worker_report
+        
+        print(f"正在使用 {min(jobs, len(params))} 个进程生成 {len(params)} 个参数的HTML报告...")
+        
+        # 子进程fork时继承报告生成器，数据不经过pickle传递
+        _worker_report = self
+        
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(jobs, len(params)),
+                mp_context=multiprocessing.get_context('fork')
+            ) as executor:
+                results = list(executor.map(_generate_report_worker, params))
+        finally:
+            _worker_report = None
+            
+        # 汇总子进程中的图表缓存命中情况
+        cache = self.chart_generator.cache
+        if cache is not None:
+            cache.hits += sum(hits for _, hits, _, _ in results)
+            cache.misses += sum(misses for _, _, misses, _ in results)
+            
+        # 汇总子进程中的计时记录
+        if self.timer is not None:
+            for _, _, _, records in results:
+                self.timer.records.extend(records)
+                
+        return [report_path for report_path, _, _, _ in results]
\ No newline at end of file
@@ -2,6 +2,27 @@ import re
 import os
 import pandas as pd
 import glob
+from run_timer import timed
+from run_trace import get_tracer, traced
+
+def _records_attributes(result):
+    """
+    获取单个文件解析结果的区间属性
+    
+    Args:
+        result (tuple): (数据记录列表, 参数限制字典)
+        
+    Returns:
+        dict: 记录数以及批次号和晶圆片号
+    """
+    records = result[0]
+    attributes = {'rows': len(records)}
+    
+    if records:
+        attributes['lot'] = records[0].get('Lot')
+        attributes['wafer'] = records[0].get('Wafer')
+        
+    return attributes
 
 # 调整类定义顺序，将函数放入类内部
 class CPLogParser:
@@ -14,6 +35,9 @@ class CPLogParser:
         """
         self.data_dir = data_dir
         self.target_params = ["BVDSS1"]
+        # 可选的运行计时器，记录每个文件的解析耗时
+        self.timer = None
+        self.tracer = get_tracer()
 
     def _parse_limit_value(self, limit_str):
         """
@@ -52,6 +76,7 @@ class CPLogParser:
             print(f"解析限制值错误: {limit_str} - {str(e)}")
             return None
 
+    @traced('parser.parse_file', 'file_path', result=_records_attributes)
     def _parse_file(self, file_path):
         """
         解析单个CP测试文件
@@ -160,6 +185,17 @@ class CPLogParser:
             print(f"解析文件 {file_path} 出错: {str(e)}")
             return [], {}
             
+    def get_data_files(self):
+        """
+        获取数据目录中的所有CP测试文件
+        
+        Returns:
+            list: 文件路径列表
+        """
+        file_pattern = os.path.join(self.data_dir, "*.TXT")
+        return glob.glob(file_pattern)
+        
+    @traced('parser.parse_files', result=lambda result: {'rows': len(result[0]) if result[0] is not None else 0})
     def parse_all_files(self):
         """
         解析所有CP测试文件
@@ -168,9 +204,9 @@ class CPLogParser:
             tuple: (DataFrame, limits_dict)
         """
         # 获取所有txt文件
-        file_pattern = os.path.join(self.data_dir, "*.TXT")
-        file_paths = glob.glob(file_pattern)
-        
+        with timed(self.timer, 'discover'):
+            file_paths = self.get_data_files()
+            
         if not file_paths:
             print(f"错误: 在目录 {self.data_dir} 中未找到.TXT文件")
             return None, None
@@ -179,7 +215,9 @@ class CPLogParser:
         all_limits = {}
         
         for file_path in file_paths:
-            records, limits = self._parse_file(file_path)
+            with timed(self.timer, 'parse_file', os.path.basename(file_path)):
+                records, limits = self._parse_file(file_path)
+                
             all_records.extend(records)
             
             # 合并参数限制
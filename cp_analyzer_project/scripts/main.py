@@ -4,15 +4,25 @@
 """
 基于提示词"rawdata提示词.md"生成的代码逻辑
 晶圆厂CP测试数据分析工具主程序
+
+启动时只导入标准库和轻量的选项模块：pandas在开始解析时导入，
+plotly和jinja2在确认有需要重新生成的报告后才导入，
+因此--help和报告均为最新的运行不加载绘图相关的库，由startup_benchmark.py检查
 """
 
 import os
 import sys
 import argparse
-from log_parser import CPLogParser
-from data_analyzer import CPDataAnalyzer
-from chart_generator import CPChartGenerator
-from html_report import CPHTMLReport
+from run_manifest import RunManifest, code_fingerprint, make_signature
+from chart_payload import PAYLOAD_FORMATS
+from run_timer import StageTimer, timed
+from run_trace import start_trace, get_tracer, span
+
+# --profile写入输出目录的cProfile统计文件
+PROFILE_FILE = 'profile.pstats'
+
+# --trace未指定文件时写入输出目录的跟踪文件
+TRACE_FILE = 'trace.json'
 
 def parse_args():
     """
@@ -52,14 +62,53 @@ def parse_args():
                         default=["BVDSS1"],
                         help='要分析的参数列表 (默认: BVDSS1)')
     
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='并行生成报告的进程数 (默认: 1，串行生成)')
+    
+    parser.add_argument('--force', action='store_true',
+                        help='输入、参数和代码均未变化时也重新生成所有报告')
+    
+    parser.add_argument('--payload', type=str, default='typed', choices=PAYLOAD_FORMATS,
+                        help='图表数据文件格式：typed为类型化数组，compressed为float32数组打包后deflate压缩 (默认: typed)')
+    
+    parser.add_argument('--webgl-threshold', type=int, default=200000,
+                        help='数据点数超过该值时散点降采样并使用WebGL绘制 (默认: 200000)')
+    
+    parser.add_argument('--points-per-group', type=int, default=5000,
+                        help='大数据模式下每个晶圆片绘制的散点数，超出限值的点和离群点始终保留 (默认: 5000)')
+    
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='图表缓存目录 (默认: 输出目录下的.figure_cache)')
+    
+    parser.add_argument('--cache-size', type=int, default=256,
+                        help='图表缓存大小上限，单位MB (默认: 256)')
+    
+    parser.add_argument('--no-cache', action='store_true',
+                        help='不使用图表缓存')
+    
+    parser.add_argument('--timings', action='store_true',
+                        help='将各阶段的墙钟时间、CPU时间、峰值内存以及最慢的文件和参数写入输出目录的timings.json和timings.csv')
+    
+    parser.add_argument('--profile', action='store_true',
+                        help=f'将整个运行的cProfile统计写入输出目录的{PROFILE_FILE}（-j大于1时不含子进程）')
+    
+    parser.add_argument('--trace', type=str, nargs='?', const='', metavar='FILE',
+                        help=f'将运行跟踪写入FILE，可用chrome://tracing或Perfetto查看，包含子进程 (默认: 输出目录下的{TRACE_FILE})')
+    
     return parser.parse_args()
 
-def main():
+def run(args, timer=None):
     """
-    主函数
+    解析数据并生成报告
+    
+    Args:
+        args (Namespace): 命令行参数
+        timer (StageTimer): 运行计时器
+        
+    Returns:
+        int: 退出码
     """
-    # 解析命令行参数
-    args = parse_args()
+    from log_parser import CPLogParser
     
     # 获取数据目录的绝对路径
     data_dir = os.path.abspath(args.input_dir)
@@ -79,10 +128,59 @@ def main():
     print("\n步骤1: 解析CP测试数据文件...")
     parser = CPLogParser(data_dir)
     parser.target_params = args.params
+    parser.timer = timer
     
-    # 解析所有文件
-    df, limits = parser.parse_all_files()
+    # 根据运行清单找出输入、参数或代码发生变化的报告
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    project_dir = os.path.dirname(scripts_dir)
+    
+    manifest = RunManifest(output_dir)
+    inputs = manifest.fingerprint_inputs(parser.get_data_files())
+    code_version = code_fingerprint(
+        scripts_dir,
+        os.path.join(project_dir, 'templates'),
+        os.path.join(project_dir, 'static', 'css'),
+        os.path.join(project_dir, 'static', 'js')
+    )
+    
+    # 报告页面包含参数选择器，因此签名也包含完整的参数列表
+    signatures = {
+        param: make_signature(
+            inputs=inputs,
+            param=param,
+            params=args.params,
+            payload=args.payload,
+            webgl_threshold=args.webgl_threshold,
+            points_per_group=args.points_per_group,
+            code=code_version
+        )
+        for param in args.params
+    }
+    
+    stale_params = [
+        param for param in args.params
+        if args.force or not manifest.is_current(f"{param}_report.html", signatures[param])
+    ]
+    
+    index_path = os.path.join(output_dir, "index.html")
     
+    if not stale_params and os.path.exists(index_path):
+        print("所有报告均为最新，无需重新生成 (使用 --force 强制重新生成)")
+        print(f"file://{index_path}")
+        return 0
+        
+    if len(stale_params) < len(args.params):
+        print(f"跳过 {len(args.params) - len(stale_params)} 个未变化的参数报告")
+        
+    from data_analyzer import CPDataAnalyzer
+    from chart_generator import CPChartGenerator
+    from html_report import CPHTMLReport
+    from figure_cache import FigureCache
+    
+    # 解析所有文件
+    with timed(timer, 'parse'):
+        df, limits = parser.parse_all_files()
+        
     if df is None or limits is None:
         print("错误: 未能成功解析CP测试数据文件")
         return 1
@@ -94,8 +192,9 @@ def main():
     analyzer = CPDataAnalyzer(df, args.params, limits)
     
     # 数据清洗
-    df_clean = analyzer.clean_data()
-    
+    with timed(timer, 'analysis'):
+        df_clean = analyzer.clean_data()
+        
     if df_clean is None:
         print("错误: 数据清洗失败")
         return 1
@@ -104,11 +203,21 @@ def main():
     
     # 初始化图表生成器
     print("\n步骤3: 生成图表...")
-    chart_generator = CPChartGenerator(analyzer)
+    chart_generator = CPChartGenerator(
+        analyzer,
+        webgl_threshold=args.webgl_threshold,
+        points_per_group=args.points_per_group
+    )
+    chart_generator.timer = timer
+    
+    if not args.no_cache:
+        cache_dir = args.cache_dir or os.path.join(output_dir, '.figure_cache')
+        chart_generator.cache = FigureCache(cache_dir, args.cache_size * 1024 * 1024)
     
     # 初始化HTML报告生成器
     print("\n步骤4: 生成HTML报告...")
-    report_generator = CPHTMLReport(chart_generator)
+    report_generator = CPHTMLReport(chart_generator, payload=args.payload)
+    report_generator.timer = timer
     report_generator.output_dir = output_dir
     report_generator.template_dir = os.path.abspath(os.path.join(
         os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
@@ -116,12 +225,27 @@ def main():
     ))
     
     # 生成所有报告
-    index_path = report_generator.generate_all_reports()
+    index_path = report_generator.generate_all_reports(jobs=args.jobs, params=stale_params)
     
     if index_path is None:
         print("错误: 生成HTML报告失败")
         return 1
         
+    # 记录本次生成的报告，供下次运行判断是否需要重新生成
+    for param, report_path in report_generator.generated_reports.items():
+        manifest.record(
+            os.path.basename(report_path),
+            signatures[param],
+            [os.path.basename(report_path), f"charts/chart-{param}.js"],
+            param=param,
+            limits=limits.get(param)
+        )
+        
+    manifest.save()
+    
+    if chart_generator.cache is not None:
+        print(chart_generator.cache.summary())
+        
     print(f"\n分析完成! HTML报告已生成: {index_path}")
     print(f"请在浏览器中打开以下链接查看报告:")
     print(f"file://{index_path}")
@@ -135,5 +259,47 @@ def main():
     
     return 0
 
+def main():
+    """
+    主函数
+    """
+    # 解析命令行参数
+    args = parse_args()
+    
+    timer = StageTimer() if args.timings else None
+    
+    if args.trace is not None:
+        start_trace(args.trace or os.path.join(os.path.abspath(args.output_dir), TRACE_FILE))
+        
+    profiler = None
+    
+    if args.profile:
+        import cProfile
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        
+    try:
+        with timed(timer, 'total'), span(get_tracer(), 'main.run', input_dir=args.input_dir):
+            return run(args, timer)
+    finally:
+        if profiler is not None:
+            import pstats
+            
+            profiler.disable()
+            
+            profile_path = os.path.join(os.path.abspath(args.output_dir), PROFILE_FILE)
+            profiler.dump_stats(profile_path)
+            
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+            print(f"性能分析结果已保存: {profile_path} (可用 python -m pstats 查看)")
+            
+        if timer is not None:
+            print(f"各阶段耗时:\n{timer.summary()}")
+            print(f"计时报告已保存: {timer.save(os.path.abspath(args.output_dir))}")
+            
+        if get_tracer() is not None:
+            print(f"跟踪文件已保存: {get_tracer().save()}")
+
 if __name__ == '__main__':
     sys.exit(main())
\ No newline at end of file
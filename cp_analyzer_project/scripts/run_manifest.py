@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试数据运行清单模块
+记录每次运行的输入和输出，输入、参数和代码均未变化的报告下次运行时跳过
+"""
+
+import os
+import json
+import hashlib
+
+# 输出目录中的运行清单文件
+MANIFEST_FILE = 'run_manifest.json'
+
+def file_fingerprint(path, previous=None):
+    """
+    计算输入文件的指纹，文件大小和修改时间未变时沿用上次的内容哈希
+    
+    Args:
+        path (str): 文件路径
+        previous (dict): 上次记录的文件指纹
+        
+    Returns:
+        dict: 文件大小、修改时间和SHA-256哈希
+    """
+    stat = os.stat(path)
+    
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous
+        
+    digest = hashlib.sha256()
+    
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+            
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+def code_fingerprint(*dirs):
+    """
+    计算影响输出的代码、模板和静态资源的指纹
+    
+    Args:
+        *dirs: 需要计算指纹的目录，不包含子目录
+        
+    Returns:
+        str: 目录中所有文件的十六进制哈希
+    """
+    digest = hashlib.sha256()
+    
+    for directory in dirs:
+        for file_name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, file_name)
+            
+            if file_name.startswith('.') or not os.path.isfile(path):
+                continue
+                
+            digest.update(file_name.encode('utf-8'))
+            
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+                
+    return digest.hexdigest()
+
+def make_signature(**parts):
+    """
+    根据输出依赖的所有内容生成签名
+    
+    Args:
+        **parts: 输入指纹、参数、限制、选项和代码版本
+        
+    Returns:
+        str: 签名
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class RunManifest:
+    """
+    运行清单类
+    
+    记录历次运行的输入文件指纹和生成的输出文件
+    """
+    
+    def __init__(self, output_dir):
+        """
+        读取输出目录中的运行清单
+        
+        Args:
+            output_dir (str): 输出目录
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILE)
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+            
+        self.data.setdefault('inputs', {})
+        self.data.setdefault('outputs', {})
+        
+    def fingerprint_inputs(self, paths):
+        """
+        计算一组输入文件的指纹
+        
+        Args:
+            paths (list): 输入文件路径列表
+            
+        Returns:
+            str: 所有输入文件的组合哈希
+        """
+        digest = hashlib.sha256()
+        
+        for path in sorted(os.path.abspath(p) for p in paths):
+            fingerprint = file_fingerprint(path, self.data['inputs'].get(path))
+            self.data['inputs'][path] = fingerprint
+            
+            digest.update(path.encode('utf-8'))
+            digest.update(fingerprint['sha256'].encode('utf-8'))
+            
+        return digest.hexdigest()
+        
+    def is_current(self, name, signature):
+        """
+        检查输出是否为最新
+        
+        Args:
+            name (str): 输出名称
+            signature (str): 输出当前依赖内容的签名
+            
+        Returns:
+            bool: 签名与记录一致且输出文件都存在时返回True
+        """
+        record = self.data['outputs'].get(name)
+        
+        if record is None or record.get('signature') != signature:
+            return False
+            
+        return all(os.path.exists(os.path.join(self.output_dir, path)) for path in record.get('files', []))
+        
+    def record(self, name, signature, files, **details):
+        """
+        记录本次运行生成的输出
+        
+        Args:
+            name (str): 输出名称
+            signature (str): 输出依赖内容的签名
+            files (list): 输出文件列表，相对于输出目录
+            **details: 参数、限制等需要一并记录的信息
+        """
+        self.data['outputs'][name] = dict(details, signature=signature, files=list(files))
+        
+    def save(self):
+        """
+        写入运行清单，先写临时文件再替换
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True, default=str)
+            
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试运行计时模块
+记录运行各阶段的墙钟时间、CPU时间和峰值内存，并写入输出目录的计时报告
+
+各组件通过可选的timer属性计时，使用timed(self.timer, 阶段, 对象)包裹各阶段，
+未设置计时器时不做任何事
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    # Windows不支持resource模块，不记录峰值内存
+    resource = None
+
+# 写入输出目录的计时报告文件
+TIMINGS_FILE = 'timings.json'
+TIMINGS_CSV_FILE = 'timings.csv'
+
+# 按参数计时的阶段，汇总后得到最慢的参数
+PARAMETER_STAGES = ('analysis', 'figure_cache', 'chart_build', 'serialize', 'payload', 'render')
+
+def peak_rss_mb():
+    """
+    获取进程目前为止的峰值常驻内存
+    
+    Returns:
+        float: 峰值常驻内存(MB)，无法获取时返回None
+    """
+    if resource is None:
+        return None
+        
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    # macOS上ru_maxrss的单位为字节，其他系统为KB
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def timed(timer, stage, item=None):
+    """
+    设置了计时器时记录一个阶段的耗时
+    
+    Args:
+        timer (StageTimer): 运行计时器，为None时不计时
+        stage (str): 阶段名称
+        item (str): 该阶段处理的文件或参数
+        
+    Returns:
+        计时的上下文管理器
+    """
+    if timer is None:
+        return nullcontext()
+        
+    return timer.stage(stage, item)
+
+class StageTimer:
+    """
+    记录运行各阶段墙钟时间、CPU时间和峰值内存的计时器
+    """
+    
+    def __init__(self):
+        """
+        初始化计时器
+        """
+        self.records = []
+        
+    @contextmanager
+    def stage(self, stage, item=None):
+        """
+        记录一个阶段的耗时
+        
+        Args:
+            stage (str): 阶段名称
+            item (str): 该阶段处理的文件或参数
+        """
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        
+        try:
+            yield
+        finally:
+            self.records.append({
+                'stage': stage,
+                'item': item,
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': time.process_time() - cpu,
+                'peak_rss_mb': peak_rss_mb()
+            })
+            
+    def get_stage_summary(self):
+        """
+        按阶段首次运行的顺序汇总各阶段的耗时
+        
+        Returns:
+            list: 各阶段的名称、次数、墙钟时间、CPU时间和峰值内存
+        """
+        stages = {}
+        
+        for record in self.records:
+            summary = stages.setdefault(record['stage'], {
+                'stage': record['stage'], 'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None
+            })
+            
+            summary['count'] += 1
+            summary['wall_s'] += record['wall_s']
+            summary['cpu_s'] += record['cpu_s']
+            
+            if record['peak_rss_mb'] is not None:
+                summary['peak_rss_mb'] = max(summary['peak_rss_mb'] or 0.0, record['peak_rss_mb'])
+                
+        return list(stages.values())
+        
+    def get_slowest(self, stages, top=10):
+        """
+        获取指定阶段中墙钟时间最长的文件或参数
+        
+        Args:
+            stages (tuple): 按对象汇总的阶段名称
+            top (int): 返回的数量
+            
+        Returns:
+            list: 对象、墙钟时间和CPU时间，按墙钟时间从长到短排列
+        """
+        items = {}
+        
+        for record in self.records:
+            if record['stage'] not in stages or record['item'] is None:
+                continue
+                
+            totals = items.setdefault(record['item'], {'item': record['item'], 'wall_s': 0.0, 'cpu_s': 0.0})
+            totals['wall_s'] += record['wall_s']
+            totals['cpu_s'] += record['cpu_s']
+            
+        return sorted(items.values(), key=lambda totals: totals['wall_s'], reverse=True)[:top]
+        
+    def save(self, output_dir):
+        """
+        将计时报告写入JSON文件，各条计时记录写入CSV文件
+        
+        Args:
+            output_dir (str): 输出目录
+            
+        Returns:
+            str: JSON计时报告文件路径
+        """
+        json_path = os.path.join(output_dir, TIMINGS_FILE)
+        csv_path = os.path.join(output_dir, TIMINGS_CSV_FILE)
+        
+        report = {
+            'stages': self.get_stage_summary(),
+            'slowest_files': self.get_slowest(('parse_file',)),
+            'slowest_parameters': self.get_slowest(PARAMETER_STAGES),
+            'records': self.records
+        }
+        
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['stage', 'item', 'wall_s', 'cpu_s', 'peak_rss_mb'])
+            writer.writeheader()
+            writer.writerows(self.records)
+            
+        return json_path
+        
+    def summary(self):
+        """
+        获取各阶段耗时汇总，用于运行日志
+        
+        Returns:
+            str: 每行一个阶段的墙钟时间和CPU时间
+        """
+        return '\n'.join(
+            f"  {stage['stage']:<14} {stage['count']:>5}次  墙钟 {stage['wall_s']:8.3f} 秒  CPU {stage['cpu_s']:8.3f} 秒"
+            for stage in self.get_stage_summary()
+        )
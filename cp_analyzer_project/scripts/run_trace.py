@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试运行跟踪模块
+记录运行中的各个区间（span）及其属性（文件、批次、晶圆片、参数、行数等），
+写入Chrome trace event格式的跟踪文件，可用chrome://tracing、Perfetto等跟踪查看器打开
+
+仅当环境变量CP_TRACE_FILE指定了跟踪文件时开启跟踪，main.py的--trace会设置该变量。
+各组件通过get_tracer()获取本进程的跟踪器，使用span(self.tracer, 名称, **属性)包裹各步骤，
+整个方法使用traced()装饰器跟踪，未开启跟踪时不做任何事
+
+子进程继承环境变量，同样会记录跟踪。每个进程通过flush()将区间追加到各自的分片文件，
+主进程的save()将所有分片文件合并为跟踪文件。子进程的任务函数应在每个任务结束时调用flush()
+"""
+
+import os
+import glob
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+
+# 指定跟踪文件的环境变量，未设置时不开启跟踪
+TRACE_ENV = 'CP_TRACE_FILE'
+
+# 本进程的跟踪器
+_tracer = None
+
+def _json_value(value):
+    """
+    转换json无法编码的区间属性
+    
+    Args:
+        value: 属性值，例如numpy标量
+        
+    Returns:
+        可编码为JSON的值
+    """
+    return value.item() if hasattr(value, 'item') else str(value)
+
+class Tracer:
+    """
+    收集本进程的区间，用于生成Chrome trace event文件
+    """
+    
+    def __init__(self, path):
+        """
+        初始化跟踪器
+        
+        Args:
+            path (str): 跟踪文件路径
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        
+    def _check_process(self):
+        """
+        在fork出的子进程中丢弃从父进程继承的区间
+        """
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.events = []
+            
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        记录一个区间
+        
+        Args:
+            name (str): 区间名称，格式为'组件.操作'，例如'parser.parse_file'
+            **attributes: 区间属性，区间结束前可继续向返回的字典中添加属性
+            
+        Yields:
+            dict: 区间属性
+        """
+        self._check_process()
+        start = time.perf_counter_ns()
+        
+        try:
+            yield attributes
+        finally:
+            self.events.append({
+                'name': name,
+                'cat': name.split('.')[0],
+                'ph': 'X',
+                'ts': start / 1000,
+                'dur': (time.perf_counter_ns() - start) / 1000,
+                'pid': self.pid,
+                'tid': threading.get_ident(),
+                'args': attributes
+            })
+            
+    def flush(self):
+        """
+        将本进程记录的区间追加到本进程的分片文件
+        """
+        self._check_process()
+        
+        if not self.events:
+            return
+            
+        with open(f'{self.path}.{self.pid}.part', 'a', encoding='utf-8') as f:
+            for event in self.events:
+                f.write(json.dumps(event, default=_json_value) + '\n')
+                
+        self.events = []
+        
+    def save(self):
+        """
+        将所有进程的分片文件合并为跟踪文件
+        
+        Returns:
+            str: 跟踪文件路径
+        """
+        self.flush()
+        
+        events = []
+        
+        for part_file in glob.glob(glob.escape(self.path) + '.*.part'):
+            pid = int(part_file.rsplit('.', 2)[1])
+            name = '主进程' if pid == self.pid else f'子进程 {pid}'
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}})
+            
+            with open(part_file, 'r', encoding='utf-8') as f:
+                events.extend(json.loads(line) for line in f if line.strip())
+                
+            os.remove(part_file)
+            
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+            
+        return self.path
+
+def start_trace(path):
+    """
+    为本进程及其启动的子进程开启跟踪，并删除之前使用同一跟踪文件的运行遗留的分片文件
+    
+    Args:
+        path (str): 跟踪文件路径
+        
+    Returns:
+        Tracer: 本进程的跟踪器
+    """
+    global _tracer
+    
+    path = os.path.abspath(path)
+    
+    for part_file in glob.glob(glob.escape(path) + '.*.part'):
+        os.remove(part_file)
+        
+    os.environ[TRACE_ENV] = path
+    _tracer = Tracer(path)
+    
+    return _tracer
+
+def get_tracer():
+    """
+    获取本进程的跟踪器
+    
+    Returns:
+        Tracer: 跟踪器，未开启跟踪时返回None
+    """
+    global _tracer
+    
+    if _tracer is None and os.environ.get(TRACE_ENV):
+        _tracer = Tracer(os.environ[TRACE_ENV])
+        
+    return _tracer
+
+def span(tracer, name, **attributes):
+    """
+    开启跟踪时记录一个区间
+    
+    Args:
+        tracer (Tracer): 进程跟踪器，未开启跟踪时为None
+        name (str): 区间名称，格式为'组件.操作'
+        **attributes: 区间属性
+        
+    Returns:
+        返回区间属性字典的上下文管理器
+    """
+    if tracer is None:
+        return nullcontext(attributes)
+        
+    return tracer.span(name, **attributes)
+
+def traced(name, *argument_names, result=None):
+    """
+    方法装饰器，对象设置了跟踪器时为每次调用记录一个区间
+    
+    Args:
+        name (str): 区间名称，格式为'组件.操作'
+        *argument_names: 记录为区间属性的方法参数
+        result (callable): 从返回值获取区间属性的函数，例如获取行数
+        
+    Returns:
+        方法装饰器
+    """
+    def decorator(method):
+        import inspect
+        
+        signature = inspect.signature(method)
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.tracer is None:
+                return method(self, *args, **kwargs)
+                
+            arguments = signature.bind(self, *args, **kwargs).arguments
+            attributes = {arg: arguments.get(arg) for arg in argument_names}
+            
+            with self.tracer.span(name, **attributes) as attributes:
+                value = method(self, *args, **kwargs)
+                
+                if result is not None:
+                    attributes.update(result(value))
+                    
+                return value
+                
+        return wrapper
+        
+    return decorator
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+晶圆厂CP测试启动性能基准
+使用python -X importtime测量main.py的冷启动，启动变慢时以退出码1结束，可用于发布前检查或CI
+
+每个用例在新的解释器中多次运行main.py，导入了该用例禁止的模块，
+或导入总耗时的中位数超出预算时判定为失败。禁止导入的模块是可靠的检查项，
+耗时预算留有余量，机器负载较高时也不会误报
+
+用例:
+    help: main.py --help，不导入pandas、numpy和绘图相关的库
+    current: 报告均为最新时的运行，不导入plotly和jinja2。
+             先在临时输出目录中完整生成一次-i目录的报告，该次运行不计入结果
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+# 各用例中main.py不应导入的模块
+BLOCKED_MODULES = {
+    'help': ('pandas', 'numpy', 'plotly', 'jinja2'),
+    'current': ('plotly', 'jinja2')
+}
+
+# 各用例导入总耗时中位数的默认预算(毫秒)
+IMPORT_BUDGETS_MS = {
+    'help': 150,
+    'current': 1500
+}
+
+def parse_importtime(stderr):
+    """
+    解析python -X importtime的输出
+
+    Args:
+        stderr (str): 解释器的标准错误输出
+
+    Returns:
+        tuple: 导入总耗时(毫秒)和导入的顶层包名集合
+    """
+    total_us = 0
+    packages = set()
+
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+
+        fields = line.split('|')
+
+        # 跳过表头
+        if not fields[1].strip().isdigit():
+            continue
+
+        name = fields[2].rstrip()
+        packages.add(name.strip().split('.')[0])
+
+        # 脚本直接导入的模块只缩进一个空格
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(fields[1])
+
+    return total_us / 1000, packages
+
+def run_main(main_args, importtime=True):
+    """
+    在新的解释器中运行main.py
+
+    Args:
+        main_args (list): main.py的参数
+        importtime (bool): 是否使用-X importtime
+
+    Returns:
+        CompletedProcess: 运行结果，标准错误输出已捕获
+    """
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    options = ['-X', 'importtime'] if importtime else []
+
+    # 不为生成的报告打开浏览器
+    env = dict(os.environ, BROWSER=f'"{sys.executable}" -c pass')
+
+    return subprocess.run(
+        [sys.executable] + options + [main_path] + main_args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, env=env
+    )
+
+def check_case(case, main_args, runs, budget_ms):
+    """
+    多次运行一个用例并输出结果
+
+    Args:
+        case (str): 用例名称
+        main_args (list): main.py的参数
+        runs (int): 运行次数
+        budget_ms (float): 导入总耗时中位数的预算(毫秒)
+
+    Returns:
+        bool: 用例是否通过
+    """
+    times = []
+    packages = set()
+
+    for _ in range(runs):
+        result = run_main(main_args)
+
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            print(f"{case}: 失败，main.py运行出错")
+            return False
+
+        import_ms, run_packages = parse_importtime(result.stderr)
+        times.append(import_ms)
+        packages |= run_packages
+
+    import_ms = statistics.median(times)
+    blocked = sorted(set(BLOCKED_MODULES[case]) & packages)
+    passed = not blocked and import_ms <= budget_ms
+
+    print(f"{case}: {'通过' if passed else '失败'}，导入耗时中位数 {import_ms:.1f} 毫秒 (预算 {budget_ms:.0f} 毫秒)")
+
+    if blocked:
+        print(f"  导入了 {', '.join(blocked)}")
+
+    return passed
+
+def main():
+    """
+    运行启动性能基准
+
+    Returns:
+        int: 退出码，有用例失败时为1
+    """
+    parser = argparse.ArgumentParser(description='检查main.py的冷启动是否变慢')
+
+    parser.add_argument('-i', '--input-dir', type=str, default=None,
+                        help='current用例使用的数据目录 (未指定时跳过该用例)')
+
+    parser.add_argument('-p', '--params', type=str, nargs='+', default=['BVDSS1'],
+                        help='current用例生成报告的参数列表 (默认: BVDSS1)')
+
+    parser.add_argument('-n', '--runs', type=int, default=5,
+                        help='每个用例的运行次数 (默认: 5)')
+
+    parser.add_argument('--help-budget', type=float, default=IMPORT_BUDGETS_MS['help'],
+                        help=f"help用例的导入耗时预算，单位毫秒 (默认: {IMPORT_BUDGETS_MS['help']})")
+
+    parser.add_argument('--current-budget', type=float, default=IMPORT_BUDGETS_MS['current'],
+                        help=f"current用例的导入耗时预算，单位毫秒 (默认: {IMPORT_BUDGETS_MS['current']})")
+
+    args = parser.parse_args()
+
+    passed = check_case('help', ['--help'], args.runs, args.help_budget)
+
+    if args.input_dir:
+        with tempfile.TemporaryDirectory() as output_dir:
+            current_args = ['-i', args.input_dir, '-o', output_dir, '-p'] + args.params
+
+            # 先生成一次报告，之后的运行均为最新
+            setup = run_main(current_args + ['--no-cache'], importtime=False)
+
+            if setup.returncode != 0:
+                print(setup.stderr[-2000:])
+                print("current: 失败，生成报告出错")
+                return 1
+
+            passed = check_case('current', current_args, args.runs, args.current_budget) and passed
+    else:
+        print("current: 未指定数据目录，跳过")
+
+    return 0 if passed else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
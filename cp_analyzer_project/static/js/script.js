@@ -18,6 +18,12 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // 图表滚动到可见区域时再加载数据并绘制
+    hydrateCharts();
+    
+    // 根据JSON数据生成表格
+    renderDataTables();
+    
     // 添加表格行悬停效果
     const tableRows = document.querySelectorAll('.stats-table tr');
     tableRows.forEach(row => {
@@ -59,4 +65,350 @@ function formatValue(value, unit) {
     } else {
         return value.toFixed(2) + ' ' + unit;
     }
-}
\ No newline at end of file
+}
+
+// 图表压缩数据中各数据类型对应的类型化数组
+const PAYLOAD_ARRAY_TYPES = {
+    f8: Float64Array,
+    f4: Float32Array,
+    i4: Int32Array,
+    i2: Int16Array,
+    i1: Int8Array,
+    u4: Uint32Array,
+    u2: Uint16Array,
+    u1: Uint8Array
+};
+
+/**
+ * 图表数据文件加载完成后绘制图表
+ * @param {string} divId - 图表div的ID
+ * @param {Object} figure - 图表数据和布局，或压缩后的图表数据
+ */
+function cpChartLoaded(divId, figure) {
+    if (figure.encoding === 'deflate') {
+        decodeChartPayload(figure)
+            .then(decoded => cpChartLoaded(divId, decoded))
+            .catch(error => console.error(`无法解压图表 ${divId} 的数据:`, error));
+        return;
+    }
+    
+    Plotly.newPlot(divId, figure.data, figure.layout, {responsive: true});
+}
+
+/**
+ * 还原压缩图表数据中的一个数组
+ * @param {Uint8Array} bytes - 压缩数据中的数组数据块
+ * @param {Object} spec - 数组描述
+ * @returns {Array|TypedArray} 数组
+ */
+function decodePayloadArray(bytes, spec) {
+    const ArrayType = PAYLOAD_ARRAY_TYPES[spec.dtype];
+    const size = ArrayType.BYTES_PER_ELEMENT;
+    const shuffled = bytes.subarray(spec.offset, spec.offset + spec.length * size);
+    
+    // 还原按字节位置重排的数据
+    const values = new Uint8Array(spec.length * size);
+    for (let b = 0; b < size; b++) {
+        const plane = b * spec.length;
+        for (let i = 0; i < spec.length; i++) {
+            values[i * size + b] = shuffled[plane + i];
+        }
+    }
+    
+    const array = new ArrayType(values.buffer);
+    return spec.categories ? Array.from(array, code => spec.categories[code]) : array;
+}
+
+/**
+ * 解压图表数据，得到图表数据和布局
+ * @param {Object} payload - 压缩后的图表数据
+ * @returns {Promise<Object>} 图表数据和布局
+ */
+async function decodeChartPayload(payload) {
+    const compressed = Uint8Array.from(atob(payload.data), c => c.charCodeAt(0));
+    const stream = new Blob([compressed]).stream().pipeThrough(new DecompressionStream('deflate'));
+    const buffer = await new Response(stream).arrayBuffer();
+    
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const bytes = new Uint8Array(buffer, 4 + headerLength);
+    const arrays = header.arrays.map(spec => decodePayloadArray(bytes, spec));
+    
+    // 用数组替换图表中的引用
+    const restore = value => {
+        if (Array.isArray(value)) {
+            return value.map(restore);
+        }
+        if (value !== null && typeof value === 'object') {
+            if ('$array' in value) {
+                return arrays[value.$array];
+            }
+            Object.keys(value).forEach(key => {
+                value[key] = restore(value[key]);
+            });
+        }
+        return value;
+    };
+    
+    return restore(header.figure);
+}
+
+/**
+ * 加载图表的数据文件
+ * @param {Element} chart - 图表占位div
+ */
+function loadChartData(chart) {
+    const script = document.createElement('script');
+    script.src = chart.dataset.src;
+    document.head.appendChild(script);
+}
+
+/**
+ * 监听图表占位div，进入可见区域时加载数据
+ */
+function hydrateCharts() {
+    const charts = document.querySelectorAll('.lazy-chart[data-src]');
+    
+    // 浏览器不支持IntersectionObserver时直接加载全部图表
+    if (!('IntersectionObserver' in window)) {
+        charts.forEach(loadChartData);
+        return;
+    }
+    
+    const observer = new IntersectionObserver(function(entries) {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                loadChartData(entry.target);
+            }
+        });
+    }, {rootMargin: '200px'});
+    
+    charts.forEach(chart => observer.observe(chart));
+}
+
+// 未能测量实际行高前使用的默认行高
+const TABLE_ROW_HEIGHT = 41;
+
+// 表格可见区域显示的行数，以及在其上下额外绘制的行数
+const TABLE_VIEW_ROWS = 20;
+const TABLE_OVERSCAN_ROWS = 10;
+
+/**
+ * 格式化表格单元格
+ * @param {*} value - 单元格的值
+ * @param {Object} column - 列定义
+ * @returns {string} 格式化后的字符串
+ */
+function formatCell(value, column) {
+    if (value === null) {
+        return 'nan';
+    }
+    if (typeof value === 'number' && column.decimals !== undefined) {
+        return value.toFixed(column.decimals);
+    }
+    return String(value);
+}
+
+/**
+ * 比较两个单元格的值，用于排序，空值排在最后
+ * @param {*} a - 第一个值
+ * @param {*} b - 第二个值
+ * @returns {number} 排序顺序
+ */
+function compareCells(a, b) {
+    if (a === b) {
+        return 0;
+    }
+    if (a === null) {
+        return 1;
+    }
+    if (b === null) {
+        return -1;
+    }
+    if (typeof a === 'number' && typeof b === 'number') {
+        return a - b;
+    }
+    return String(a).localeCompare(String(b), undefined, {numeric: true});
+}
+
+/**
+ * 生成表格行
+ * @param {Array} values - 行数据
+ * @param {Array} columns - 列定义
+ * @returns {Element} 表格行
+ */
+function createTableRow(values, columns) {
+    const tr = document.createElement('tr');
+    values.forEach((value, index) => {
+        const td = document.createElement('td');
+        td.textContent = formatCell(value, columns[index]);
+        if (columns[index].className) {
+            td.className = columns[index].className;
+        }
+        tr.appendChild(td);
+    });
+    return tr;
+}
+
+/**
+ * 生成占位行，代替未绘制的行撑开滚动高度
+ * @param {number} columnCount - 表格列数
+ * @returns {Element} 占位行
+ */
+function createSpacerRow(columnCount) {
+    const row = document.createElement('tr');
+    row.className = 'spacer-row';
+    const cell = document.createElement('td');
+    cell.colSpan = columnCount;
+    row.appendChild(cell);
+    return row;
+}
+
+/**
+ * 将表格JSON替换为只绘制可见行、可排序和筛选的表格
+ * @param {Element} source - 保存表格JSON的script元素
+ */
+function createDataTable(source) {
+    const data = JSON.parse(source.textContent);
+    const columns = data.columns;
+    
+    let rows = data.rows;
+    let searchText = null;
+    let sortColumn = -1;
+    let sortAscending = true;
+    let rowHeight = 0;
+    let pending = false;
+    
+    const container = document.createElement('div');
+    container.className = 'data-table';
+    
+    const toolbar = document.createElement('div');
+    toolbar.className = 'data-table-toolbar';
+    const filter = document.createElement('input');
+    filter.type = 'search';
+    filter.placeholder = '筛选...';
+    const status = document.createElement('span');
+    status.className = 'data-table-status';
+    toolbar.appendChild(filter);
+    toolbar.appendChild(status);
+    
+    const viewport = document.createElement('div');
+    viewport.className = 'data-table-viewport';
+    viewport.style.maxHeight = (TABLE_ROW_HEIGHT * (TABLE_VIEW_ROWS + 1)) + 'px';
+    
+    const table = document.createElement('table');
+    table.className = data.classes || '';
+    
+    const head = document.createElement('thead');
+    const headRow = document.createElement('tr');
+    const headers = columns.map((column, index) => {
+        const th = document.createElement('th');
+        th.textContent = column.title;
+        th.className = 'sortable';
+        th.addEventListener('click', function() {
+            sortAscending = sortColumn === index ? !sortAscending : true;
+            sortColumn = index;
+            headers.forEach(header => header.classList.remove('sort-asc', 'sort-desc'));
+            th.classList.add(sortAscending ? 'sort-asc' : 'sort-desc');
+            update();
+        });
+        headRow.appendChild(th);
+        return th;
+    });
+    head.appendChild(headRow);
+    
+    const body = document.createElement('tbody');
+    const topSpacer = createSpacerRow(columns.length);
+    const bottomSpacer = createSpacerRow(columns.length);
+    
+    table.appendChild(head);
+    table.appendChild(body);
+    
+    // 总体统计行固定显示在表格底部，不参与排序和筛选
+    if (data.footer) {
+        const foot = document.createElement('tfoot');
+        data.footer.forEach(values => foot.appendChild(createTableRow(values, columns)));
+        table.appendChild(foot);
+    }
+    
+    viewport.appendChild(table);
+    container.appendChild(toolbar);
+    container.appendChild(viewport);
+    source.parentNode.insertBefore(container, source);
+    
+    // 只绘制可见区域内的行以及上下额外的行
+    function render() {
+        pending = false;
+        
+        const height = rowHeight || TABLE_ROW_HEIGHT;
+        const first = Math.max(0, Math.floor(viewport.scrollTop / height) - TABLE_OVERSCAN_ROWS);
+        const last = Math.min(rows.length, first + TABLE_VIEW_ROWS + 2 * TABLE_OVERSCAN_ROWS);
+        
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(topSpacer);
+        
+        for (let i = first; i < last; i++) {
+            const tr = createTableRow(rows[i], columns);
+            if (i % 2 === 1) {
+                tr.classList.add('striped');
+            }
+            fragment.appendChild(tr);
+        }
+        
+        fragment.appendChild(bottomSpacer);
+        
+        topSpacer.firstChild.style.height = (first * height) + 'px';
+        bottomSpacer.firstChild.style.height = ((rows.length - last) * height) + 'px';
+        
+        body.textContent = '';
+        body.appendChild(fragment);
+        
+        // 表格可见后测量实际行高
+        if (!rowHeight && last > first && topSpacer.nextSibling.offsetHeight) {
+            rowHeight = topSpacer.nextSibling.offsetHeight;
+            render();
+        }
+    }
+    
+    // 应用筛选和排序，并从第一行开始重新绘制
+    function update() {
+        const query = filter.value.trim().toLowerCase();
+        
+        if (query) {
+            if (searchText === null) {
+                searchText = data.rows.map(row => row.map((value, index) => formatCell(value, columns[index])).join('\u0000').toLowerCase());
+            }
+            rows = data.rows.filter((row, index) => searchText[index].includes(query));
+        } else {
+            rows = data.rows.slice();
+        }
+        
+        if (sortColumn >= 0) {
+            rows.sort((a, b) => compareCells(a[sortColumn], b[sortColumn]) * (sortAscending ? 1 : -1));
+        }
+        
+        status.textContent = rows.length === data.rows.length ?
+            `共 ${rows.length} 行` : `${rows.length} / ${data.rows.length} 行`;
+        
+        viewport.scrollTop = 0;
+        render();
+    }
+    
+    viewport.addEventListener('scroll', function() {
+        if (!pending) {
+            pending = true;
+            window.requestAnimationFrame(render);
+        }
+    });
+    filter.addEventListener('input', update);
+    
+    update();
+}
+
+/**
+ * 生成所有以JSON数据提供的表格
+ */
+function renderDataTables() {
+    document.querySelectorAll('script.table-data').forEach(createDataTable);
+}
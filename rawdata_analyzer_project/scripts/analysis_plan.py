@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Analysis Plan
+-------------------
+This module computes the statistics and yield of many parameters in one
+grouped pass over the data, so a multi-parameter run can hand the same
+results to the CSV, Excel and HTML writers.
+"""
+
+import pandas as pd
+
+from run_trace import traced
+
+
+class CPAnalysisPlan:
+    """Shared grouped aggregates for a multi-parameter run."""
+    
+    def __init__(self, analyzer, parameters, limits=None, group_by=None):
+        """
+        Initialize the analysis plan.
+        
+        Args:
+            analyzer (CPDataAnalyzer): Data analyzer.
+            parameters (list): Parameters to analyze.
+            limits (dict, optional): Upper and lower limits by parameter.
+            group_by (str, optional): Column to group by. Defaults to None.
+        """
+        self.analyzer = analyzer
+        self.tracer = analyzer.tracer
+        self.limits = limits or {}
+        self.group_by = group_by
+        self._stats = None
+        self._yield = None
+        
+        data = analyzer.data
+        self.parameters = [p for p in parameters if data is not None and p in data.columns]
+        
+    def _passed(self, values, limits):
+        """
+        Get the pass/fail flag of each die for a parameter.
+        
+        Args:
+            values (pandas.Series): Parameter values.
+            limits (dict): Dictionary containing upper and lower limits, or None.
+            
+        Returns:
+            pandas.Series: True for dies within the limits.
+        """
+        lower = limits.get('lower') if limits else None
+        upper = limits.get('upper') if limits else None
+        
+        passed = pd.Series(True, index=values.index)
+        
+        if lower is not None:
+            passed &= values >= lower
+        if upper is not None:
+            passed &= values <= upper
+            
+        return passed
+        
+    @traced('analyzer.plan', result=lambda plan: {'parameters': len(plan.parameters), 'group_by': plan.group_by})
+    def compute(self):
+        """
+        Compute the statistics and yield of every parameter.
+        
+        All parameters share one grouping of the data, and each aggregate is
+        computed for all parameter columns at once. The results match
+        CPDataAnalyzer.get_parameter_stats() and calculate_yield().
+        
+        Returns:
+            CPAnalysisPlan: This plan.
+        """
+        if self._stats is not None:
+            return self
+            
+        data = self.analyzer.data
+        # Copy into consolidated blocks so each reduction covers all columns in one call
+        values = data[self.parameters].copy()
+        passed = pd.DataFrame(
+            {param: self._passed(values[param], self.limits.get(param)) for param in self.parameters},
+            index=data.index
+        )
+        
+        self._stats = {}
+        self._yield = {}
+        
+        if self.group_by is not None and self.group_by in data.columns:
+            keys = data[self.group_by]
+            
+            # Each reduction runs over all parameter columns in one call
+            groups = values.groupby(keys)
+            size = groups.size()
+            aggregates = {
+                'count': groups.count(),
+                'mean': groups.mean(),
+                'std': groups.std(),
+                'min': groups.min(),
+                'max': groups.max()
+            }
+            passed_counts = passed.groupby(keys).sum()
+            
+            for param in self.parameters:
+                stats = pd.DataFrame({name: aggregate[param] for name, aggregate in aggregates.items()})
+                stats['std'] = stats['std'].where(size > 1, 0)
+                self._stats[param] = stats.reset_index()
+                
+                yield_data = pd.DataFrame({'total': size, 'passed': passed_counts[param]})
+                yield_data['failed'] = yield_data['total'] - yield_data['passed']
+                yield_data['yield_pct'] = yield_data['passed'] / yield_data['total'] * 100
+                self._yield[param] = yield_data.reset_index()
+                
+            return self
+            
+        # Without a grouping column every parameter has a single overall row
+        total = len(data)
+        passed_counts = passed.sum()
+        
+        for param in self.parameters:
+            column = values[param]
+            
+            stats = pd.DataFrame({
+                'count': [total],
+                'mean': [column.mean()],
+                'std': [column.std() if total > 1 else 0],
+                'min': [column.min()],
+                'max': [column.max()]
+            })
+            
+            yield_data = pd.DataFrame({
+                'total': [total],
+                'passed': [passed_counts[param]],
+                'failed': [total - passed_counts[param]],
+                'yield_pct': [passed_counts[param] / total * 100 if total > 0 else 0]
+            })
+            
+            if self.group_by is not None:
+                stats[self.group_by] = ['All']
+                yield_data[self.group_by] = ['All']
+                
+            self._stats[param] = stats
+            self._yield[param] = yield_data
+            
+        return self
+        
+    def get_parameter_stats(self, parameter):
+        """
+        Get statistics for a parameter of the plan.
+        
+        Args:
+            parameter (str): Parameter name.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing statistics.
+        """
+        if self._stats is None:
+            self.compute()
+            
+        return self._stats.get(parameter, pd.DataFrame())
+        
+    def calculate_yield(self, parameter):
+        """
+        Get yield statistics for a parameter of the plan.
+        
+        Args:
+            parameter (str): Parameter name.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing yield statistics.
+        """
+        if self._stats is None:
+            self.compute()
+            
+        return self._yield.get(parameter, pd.DataFrame())
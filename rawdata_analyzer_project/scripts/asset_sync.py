@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Report Asset Sync
+-------------------
+This module copies the report CSS/JS files into an output directory
+under content-hashed names, only when their content changed.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+
+# Static asset subdirectories to sync
+ASSET_DIRS = ('css', 'js')
+
+# Manifest of synced assets kept in the output directory
+MANIFEST_FILE = 'asset_manifest.json'
+
+# Asset name of plotly.js; its file name carries the version, which fixes its content
+PLOTLYJS_ASSET = 'js/plotly.min.js'
+
+# (static dir, output dir) pairs already synced by this process
+_synced = {}
+
+
+def _file_digest(path):
+    """
+    Hash the content of a file.
+    
+    Args:
+        path (str): File path.
+        
+    Returns:
+        str: SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+            
+    return digest.hexdigest()
+
+
+def _hashed_name(name, digest):
+    """
+    Build a content-hashed file name, e.g. css/style.1a2b3c4d5e6f.css.
+    
+    Args:
+        name (str): Asset name.
+        digest (str): Content digest.
+        
+    Returns:
+        str: Hashed file name.
+    """
+    root, ext = os.path.splitext(name)
+    return f'{root}.{digest[:12]}{ext}'
+
+
+def _load_manifest(manifest_path):
+    """
+    Load the asset manifest.
+    
+    Args:
+        manifest_path (str): Path of the manifest file.
+        
+    Returns:
+        dict: Asset manifest, empty if missing or unreadable.
+    """
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest_path, manifest):
+    """
+    Write the asset manifest through a temporary file.
+    
+    Args:
+        manifest_path (str): Path of the manifest file.
+        manifest (dict): Asset manifest.
+    """
+    tmp_path = f'{manifest_path}.{os.getpid()}.tmp'
+    
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        
+    os.replace(tmp_path, manifest_path)
+
+
+def _prune_assets(output_static_dir, manifest):
+    """
+    Delete synced asset files that no manifest entry references any more,
+    e.g. the previous hashed copy of a changed CSS file or an old plotly.js.
+    
+    Args:
+        output_static_dir (str): Static folder of the output directory.
+        manifest (dict): Asset manifest.
+    """
+    referenced = {record['file'] for record in manifest.values()}
+    
+    for subdir in ASSET_DIRS:
+        dir_path = os.path.join(output_static_dir, subdir)
+        if not os.path.isdir(dir_path):
+            continue
+            
+        for file_name in os.listdir(dir_path):
+            path = os.path.join(dir_path, file_name)
+            
+            if f'{subdir}/{file_name}' not in referenced and os.path.isfile(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def sync_assets(static_dir, output_dir):
+    """
+    Sync the static assets into the output directory's static folder,
+    copying only files whose content changed.
+    
+    Sources whose size and modification time match the manifest are not
+    re-hashed, so an up-to-date output directory only costs a manifest read
+    and a stat per source file. Each output directory is synced once per process.
+    Copies the manifest no longer references, including those of deleted
+    sources, are removed.
+    
+    Args:
+        static_dir (str): Source directory of the static assets.
+        output_dir (str): Report output directory.
+        
+    Returns:
+        dict: Asset name to page URL, e.g. {'css/style.css': 'static/css/style.1a2b3c4d5e6f.css'}.
+    """
+    key = (os.path.abspath(static_dir), os.path.abspath(output_dir))
+    if key in _synced:
+        return _synced[key]
+        
+    output_static_dir = os.path.join(key[1], 'static')
+    manifest_path = os.path.join(output_static_dir, MANIFEST_FILE)
+    manifest = _load_manifest(manifest_path)
+    changed = False
+    sources = {PLOTLYJS_ASSET}
+    
+    for subdir in ASSET_DIRS:
+        src_dir = os.path.join(key[0], subdir)
+        if not os.path.isdir(src_dir):
+            continue
+            
+        for file_name in sorted(os.listdir(src_dir)):
+            src = os.path.join(src_dir, file_name)
+            if not os.path.isfile(src):
+                continue
+                
+            name = f'{subdir}/{file_name}'
+            sources.add(name)
+            stat = os.stat(src)
+            record = manifest.get(name)
+            
+            # Skip sources whose size and mtime are unchanged and whose copy exists
+            if (record is not None
+                    and record.get('size') == stat.st_size
+                    and record.get('mtime_ns') == stat.st_mtime_ns
+                    and os.path.exists(os.path.join(output_static_dir, record['file']))):
+                continue
+                
+            digest = _file_digest(src)
+            record = {
+                'file': _hashed_name(name, digest),
+                'sha256': digest,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns
+            }
+            
+            dst = os.path.join(output_static_dir, record['file'])
+            if not os.path.exists(dst):
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                shutil.copy2(src, dst)
+                
+            manifest[name] = record
+            changed = True
+            
+    # plotly.js comes from the plotly package, so its version identifies its content
+    plotlyjs_version = get_plotlyjs_version()
+    record = manifest.get(PLOTLYJS_ASSET)
+    
+    if (record is None
+            or record.get('version') != plotlyjs_version
+            or not os.path.exists(os.path.join(output_static_dir, record['file']))):
+        record = {
+            'file': f'js/plotly-{plotlyjs_version}.min.js',
+            'version': plotlyjs_version
+        }
+        
+        dst = os.path.join(output_static_dir, record['file'])
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        with open(dst, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+            
+        manifest[PLOTLYJS_ASSET] = record
+        changed = True
+        
+    # Forget the assets whose source was deleted
+    for name in set(manifest) - sources:
+        del manifest[name]
+        changed = True
+        
+    if changed:
+        _save_manifest(manifest_path, manifest)
+        
+    _prune_assets(output_static_dir, manifest)
+    
+    assets = {name: f"static/{record['file']}" for name, record in manifest.items()}
+    _synced[key] = assets
+    
+    return assets
@@ -0,0 +1,442 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Batch Runner
+-------------------
+This module runs the analyzer over every rawdata directory under a root,
+started with "main.py batch -r ROOT -o OUTPUT [main.py options]".
+
+Each rawdata directory is a lot. Lots are analyzed by main.py in their own
+process, a bounded number at a time, newest lot first, into
+OUTPUT/<path of the lot under ROOT>. Options the batch runner does not know,
+e.g. --params all -f html csv, are passed on to main.py for every lot. A
+failed lot is queued again after the other lots until it has used its
+retries.
+
+A run manifest in OUTPUT records each finished lot with the signature of
+its log and summary files, the main.py options and the code. Lots whose
+signature is unchanged and whose outputs exist are skipped without
+starting a process, so an interrupted or repeated batch only runs the lots
+that are new, changed or failed. OUTPUT/index.html links the reports of
+all lots.
+
+The report CSS/JS assets, plotly.js among them, are synced once into
+OUTPUT/static and the reports of every lot point there, instead of each
+lot keeping its own copy.
+"""
+
+import os
+import sys
+import html
+import time
+import argparse
+import datetime
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from run_manifest import RunManifest, code_fingerprint, make_signature
+
+# Name of the directories that hold the log files of a lot
+RAWDATA_DIR = 'rawdata'
+
+# Log of the main.py runs of a lot, kept in its output directory
+LOT_LOG_FILE = 'batch.log'
+
+# Cross-lot index page written to the output root
+INDEX_FILE = 'index.html'
+
+
+def _log_files(lot_dir):
+    """
+    Get the CP test log files of a lot.
+    
+    Args:
+        lot_dir (str): Lot directory.
+        
+    Returns:
+        list: Log file paths.
+    """
+    return [
+        os.path.join(lot_dir, file_name) for file_name in os.listdir(lot_dir)
+        if file_name.endswith('.TXT') and os.path.isfile(os.path.join(lot_dir, file_name))
+    ]
+
+
+def _summary_files(lot_dir):
+    """
+    Get the fab summary CSV files main.py reads for a lot.
+    
+    Args:
+        lot_dir (str): Lot directory.
+        
+    Returns:
+        list: Summary file paths from the sibling summary directory.
+    """
+    summary_dir = os.path.join(os.path.dirname(lot_dir), 'summary')
+    
+    if not os.path.isdir(summary_dir):
+        return []
+        
+    return [
+        os.path.join(summary_dir, file_name) for file_name in os.listdir(summary_dir)
+        if file_name.lower().endswith('.csv') and os.path.isfile(os.path.join(summary_dir, file_name))
+    ]
+
+
+def discover_lots(root_dir):
+    """
+    Find the rawdata directories under a root, newest lot first.
+    
+    A lot is as new as its most recently modified log file.
+    
+    Args:
+        root_dir (str): Root directory to search.
+        
+    Returns:
+        list: Lot name, lot directory and newest log time of each lot.
+    """
+    root_dir = os.path.abspath(root_dir)
+    lots = []
+    
+    for dir_path, dir_names, file_names in os.walk(root_dir):
+        dir_names.sort()
+        
+        if os.path.basename(dir_path) != RAWDATA_DIR:
+            continue
+            
+        log_files = _log_files(dir_path)
+        
+        if not log_files:
+            continue
+            
+        # Name the lot by its path under the root, e.g. data1 for data1/rawdata
+        name = os.path.relpath(os.path.dirname(dir_path), root_dir)
+        name = os.path.basename(root_dir) if name == os.curdir else name.replace(os.sep, '/')
+        
+        lots.append({
+            'name': name,
+            'lot_dir': dir_path,
+            'newest': max(os.path.getmtime(path) for path in log_files)
+        })
+        
+    return sorted(lots, key=lambda lot: (-lot['newest'], lot['name']))
+
+
+def run_lot(lot, output_dir, main_args, attempt, timeout=None):
+    """
+    Analyze a lot with main.py in its own process.
+    
+    Args:
+        lot (dict): Lot from discover_lots().
+        output_dir (str): Output directory of the lot.
+        main_args (list): Extra main.py arguments.
+        attempt (int): Attempt number, starting at 1.
+        timeout (float, optional): Seconds before the run is stopped.
+        
+    Returns:
+        tuple: Exit code (None on timeout) and run time in seconds.
+    """
+    main_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    command = [sys.executable, main_file, '-i', lot['lot_dir'], '-o', output_dir] + main_args
+    
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    
+    with open(os.path.join(output_dir, LOT_LOG_FILE), 'w' if attempt == 1 else 'a', encoding='utf-8') as log:
+        log.write(f"=== Attempt {attempt}: {' '.join(command)}\n")
+        log.flush()
+        
+        try:
+            returncode = subprocess.run(command, stdout=log, stderr=subprocess.STDOUT, timeout=timeout).returncode
+        except subprocess.TimeoutExpired:
+            log.write(f"=== Stopped after {timeout} s\n")
+            returncode = None
+            
+    return returncode, time.perf_counter() - start
+
+
+class CPBatchRunner:
+    """Runs main.py over the lots under a root directory."""
+    
+    def __init__(self, root_dir, output_dir, main_args=None, jobs=2, retries=1, timeout=None, force=False):
+        """
+        Initialize the batch runner.
+        
+        Args:
+            root_dir (str): Root directory with the rawdata directories.
+            output_dir (str): Output root; each lot is written to a subdirectory.
+            main_args (list, optional): Extra main.py arguments for every lot.
+            jobs (int, optional): Lots analyzed at a time. Defaults to 2.
+            retries (int, optional): Extra attempts for a failed lot. Defaults to 1.
+            timeout (float, optional): Seconds before a lot run is stopped.
+            force (bool, optional): Run finished lots again. Defaults to False.
+        """
+        self.root_dir = os.path.abspath(root_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.main_args = list(main_args or [])
+        self.jobs = max(1, jobs)
+        self.retries = max(0, retries)
+        self.timeout = timeout
+        self.force = force
+        self.manifest = RunManifest(self.output_dir)
+        self.lock = threading.Lock()
+        self.results = {}
+        
+    def lot_output_dir(self, lot):
+        """
+        Get the output directory of a lot.
+        
+        Args:
+            lot (dict): Lot from discover_lots().
+            
+        Returns:
+            str: Output directory.
+        """
+        return os.path.join(self.output_dir, *lot['name'].split('/'))
+        
+    def _lot_files(self, lot):
+        """
+        Get the outputs main.py recorded for a lot.
+        
+        Args:
+            lot (dict): Lot from discover_lots().
+            
+        Returns:
+            list: Output files relative to the output root.
+        """
+        lot_output_dir = self.lot_output_dir(lot)
+        files = []
+        
+        for record in RunManifest(lot_output_dir).data['outputs'].values():
+            files += [os.path.relpath(os.path.join(lot_output_dir, path), self.output_dir) for path in record.get('files', [])]
+            
+        return sorted(set(files))
+        
+    def _finish(self, lot, signature, attempts, seconds):
+        """
+        Record a lot that main.py analyzed, so a re-run skips it.
+        
+        Args:
+            lot (dict): Lot from discover_lots().
+            signature (str): Signature of the lot's inputs, options and code.
+            attempts (int): Attempts it took.
+            seconds (float): Run time of the last attempt.
+        """
+        with self.lock:
+            self.manifest.record(
+                lot['name'],
+                signature,
+                self._lot_files(lot),
+                lot_dir=lot['lot_dir'],
+                attempts=attempts,
+                seconds=round(seconds, 3),
+                finished=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            )
+            self.manifest.save()
+            
+    def run(self):
+        """
+        Analyze every lot that is new, changed or failed.
+        
+        Returns:
+            dict: Status of each lot: 'current', 'done' or 'failed'.
+        """
+        lots = discover_lots(self.root_dir)
+        
+        print(f"Found {len(lots)} lots under {self.root_dir}")
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        scripts_dir = os.path.dirname(os.path.abspath(__file__))
+        code = code_fingerprint(
+            scripts_dir,
+            os.path.join(scripts_dir, '../templates'),
+            os.path.join(scripts_dir, '../static/css'),
+            os.path.join(scripts_dir, '../static/js')
+        )
+        
+        # The reports of all lots share the assets in OUTPUT/static
+        lot_args = self.main_args + ['--static-root', self.output_dir]
+        
+        pending = []
+        signatures = {}
+        
+        for lot in lots:
+            signatures[lot['name']] = make_signature(
+                inputs=self.manifest.fingerprint_inputs(_log_files(lot['lot_dir']) + _summary_files(lot['lot_dir'])),
+                main_args=lot_args,
+                code=code
+            )
+            
+            if not self.force and self.manifest.is_current(lot['name'], signatures[lot['name']]):
+                self.results[lot['name']] = 'current'
+            else:
+                pending.append(lot)
+                
+        # Keep the input fingerprints even if no lot finishes
+        self.manifest.save()
+        
+        if len(pending) < len(lots):
+            print(f"Skipping {len(lots) - len(pending)} lots that are up to date (use --force to run them again)")
+            
+        # Sync the assets before the lots start, so their runs only read them
+        if pending:
+            from asset_sync import sync_assets
+            sync_assets(os.path.join(scripts_dir, '../static'), self.output_dir)
+            
+        attempts = {}
+        
+        # main.py skips outputs it has recorded as current, so a forced batch forces each lot run.
+        # The signatures leave --force out, so the next batch without it still skips these lots
+        main_args = lot_args + ['--force'] if self.force and '--force' not in lot_args else lot_args
+        
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            def submit(lot):
+                attempts[lot['name']] = attempts.get(lot['name'], 0) + 1
+                return executor.submit(
+                    run_lot, lot, self.lot_output_dir(lot), main_args, attempts[lot['name']], self.timeout
+                )
+                
+            # The pool runs the lots in submission order, newest first
+            running = {submit(lot): lot for lot in pending}
+            
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                
+                for future in finished:
+                    lot = running.pop(future)
+                    
+                    try:
+                        returncode, seconds = future.result()
+                    except OSError as e:
+                        print(f"Error starting {lot['name']}: {str(e)}")
+                        returncode, seconds = None, 0.0
+                        
+                    if returncode == 0:
+                        self._finish(lot, signatures[lot['name']], attempts[lot['name']], seconds)
+                        self.results[lot['name']] = 'done'
+                        print(f"Finished {lot['name']} in {seconds:.1f} s")
+                        
+                    elif attempts[lot['name']] <= self.retries:
+                        # Queue the lot again behind the lots still waiting
+                        print(f"Lot {lot['name']} failed (attempt {attempts[lot['name']]}), retrying")
+                        running[submit(lot)] = lot
+                        
+                    else:
+                        self.results[lot['name']] = 'failed'
+                        log_file = os.path.join(self.lot_output_dir(lot), LOT_LOG_FILE)
+                        print(f"Lot {lot['name']} failed after {attempts[lot['name']]} attempts, see {log_file}")
+                        
+        self.write_index(lots)
+        
+        return self.results
+        
+    def write_index(self, lots):
+        """
+        Write the index page linking the reports of all lots.
+        
+        Args:
+            lots (list): Lots from discover_lots(), in the order to list them.
+            
+        Returns:
+            str: Index file path.
+        """
+        rows = []
+        
+        for lot in lots:
+            record = self.manifest.data['outputs'].get(lot['name'], {})
+            reports = [path for path in record.get('files', []) if path.endswith('.html')]
+            
+            links = ' '.join(
+                f'<a href="{html.escape(path.replace(os.sep, "/"))}">{html.escape(os.path.basename(path))}</a>'
+                for path in reports
+            )
+            
+            if self.results.get(lot['name']) == 'failed':
+                log_path = os.path.relpath(os.path.join(self.lot_output_dir(lot), LOT_LOG_FILE), self.output_dir)
+                links = f'<a href="{html.escape(log_path.replace(os.sep, "/"))}">failed, see log</a>'
+                
+            rows.append(
+                f'<tr><td>{html.escape(lot["name"])}</td>'
+                f'<td>{datetime.datetime.fromtimestamp(lot["newest"]).strftime("%Y-%m-%d %H:%M")}</td>'
+                f'<td>{html.escape(record.get("finished", ""))}</td>'
+                f'<td>{links}</td></tr>'
+            )
+            
+        index_file = os.path.join(self.output_dir, INDEX_FILE)
+        
+        with open(index_file, 'w', encoding='utf-8') as f:
+            f.write(
+                '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+                '<title>CP Test Lots</title>\n</head>\n<body>\n<h1>CP Test Lots</h1>\n'
+                f'<p>{html.escape(self.root_dir)}, {len(lots)} lots, newest first</p>\n'
+                '<table>\n<tr><th>Lot</th><th>Newest log</th><th>Analyzed</th><th>Reports</th></tr>\n'
+                + '\n'.join(rows) +
+                '\n</table>\n</body>\n</html>\n'
+            )
+            
+        return index_file
+
+
+def parse_arguments(argv=None):
+    """
+    Parse the command-line arguments of the batch runner.
+    
+    Args:
+        argv (list, optional): Arguments, defaults to the command line.
+        
+    Returns:
+        tuple: Parsed arguments and the arguments passed on to main.py.
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py batch',
+        description='Analyze every rawdata directory under a root. Other options are passed on to main.py.'
+    )
+    
+    parser.add_argument('-r', '--root', dest='root_dir', required=True,
+                        help=f'Root directory searched for {RAWDATA_DIR} directories')
+    parser.add_argument('-o', '--output', dest='output_dir', default='./output',
+                        help='Output root, each lot is written to a subdirectory (default: ./output)')
+    parser.add_argument('-j', '--jobs', type=int, default=2,
+                        help='Lots analyzed at a time (default: 2)')
+    parser.add_argument('--retries', type=int, default=1,
+                        help='Extra attempts for a failed lot (default: 1)')
+    parser.add_argument('--timeout', type=float,
+                        help='Seconds before a lot run is stopped and counted as failed')
+    parser.add_argument('--force', action='store_true',
+                        help='Run lots again even if their inputs, options and code are unchanged')
+                        
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    """
+    Run the batch runner.
+    
+    Args:
+        argv (list, optional): Arguments, defaults to the command line.
+        
+    Returns:
+        int: Exit code, 1 if any lot failed.
+    """
+    args, main_args = parse_arguments(argv)
+    
+    if not os.path.isdir(args.root_dir):
+        print(f"Root directory not found: {args.root_dir}")
+        return 1
+        
+    runner = CPBatchRunner(args.root_dir, args.output_dir, main_args, args.jobs, args.retries, args.timeout, args.force)
+    results = runner.run()
+    
+    counts = {status: list(results.values()).count(status) for status in ('done', 'current', 'failed')}
+    
+    print(f"Lots analyzed: {counts['done']}, up to date: {counts['current']}, failed: {counts['failed']}")
+    print(f"Index written to {os.path.join(runner.output_dir, INDEX_FILE)}")
+    
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
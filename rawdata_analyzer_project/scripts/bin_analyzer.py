@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Bin Analyzer
+-------------------
+This module summarizes the soft bin results of CP test data.
+"""
+
+import pandas as pd
+import numpy as np
+
+from wafer_keys import wafer_sort_key
+
+
+class CPBinAnalyzer:
+    """Analyzer for CP test bin results."""
+    
+    def __init__(self, data=None, wafer_keys=None, good_bins=(1,)):
+        """
+        Initialize the bin analyzer with the specified data.
+        
+        Args:
+            data (pandas.DataFrame, optional): CP test data with a 'Bin' column.
+            wafer_keys (list, optional): Columns identifying a wafer.
+            good_bins (tuple, optional): Soft bins counted as good dies. Defaults to (1,).
+        """
+        self.data = data
+        self.wafer_keys = wafer_keys or []
+        self.good_bins = tuple(good_bins)
+        self._wafers = None
+        self._bins = None
+        self._counts = None
+        
+    def set_data(self, data, wafer_keys=None):
+        """
+        Set the data to analyze.
+        
+        Args:
+            data (pandas.DataFrame): CP test data with a 'Bin' column.
+            wafer_keys (list, optional): Columns identifying a wafer.
+        """
+        self.data = data
+        
+        if wafer_keys is not None:
+            self.wafer_keys = wafer_keys
+            
+        self._counts = None
+        
+    def _count_bins(self):
+        """
+        Count dies per wafer and bin in a single vectorized pass.
+        
+        Returns:
+            bool: True if bin counts are available.
+        """
+        if self._counts is not None:
+            return True
+            
+        if self.data is None or 'Bin' not in self.data.columns or self.data.empty:
+            return False
+            
+        bins = pd.to_numeric(self.data['Bin'], errors='coerce').to_numpy(dtype=float)
+        valid = ~np.isnan(bins) & (bins >= 0)
+        bins = bins[valid].astype(np.int64)
+        
+        if self.wafer_keys:
+            groups = self.data.groupby(self.wafer_keys, sort=True, dropna=False)
+            wafer_codes = groups.ngroup().to_numpy()[valid]
+            self._wafers = groups.size().index.to_frame(index=False)
+        else:
+            wafer_codes = np.zeros(len(bins), dtype=np.int64)
+            self._wafers = pd.DataFrame(index=[0])
+            
+        n_wafers = len(self._wafers)
+        n_bins = int(bins.max()) + 1 if len(bins) else 1
+        
+        counts = np.bincount(wafer_codes * n_bins + bins, minlength=n_wafers * n_bins)
+        counts = counts.reshape(n_wafers, n_bins)
+        
+        # Wafer numbers are strings in the logs, order the wafers numerically
+        if self.wafer_keys:
+            order = self._wafers.sort_values(self.wafer_keys, kind='stable', key=wafer_sort_key).index.to_numpy()
+            self._wafers = self._wafers.iloc[order].reset_index(drop=True)
+            counts = counts[order]
+        
+        # Keep only the bins that actually occur
+        self._bins = np.flatnonzero(counts.sum(axis=0))
+        self._counts = counts[:, self._bins]
+        
+        return True
+        
+    def get_wafer_bin_matrix(self):
+        """
+        Get the die count of each bin for each wafer.
+        
+        Returns:
+            pandas.DataFrame: Wafer × bin count matrix.
+        """
+        if not self._count_bins():
+            return pd.DataFrame()
+            
+        matrix = pd.DataFrame(self._counts, columns=[f'Bin {b}' for b in self._bins])
+        
+        return pd.concat([self._wafers, matrix], axis=1)
+        
+    def get_bin_counts(self, group_by=None):
+        """
+        Get bin counts, optionally per group of wafers.
+        
+        Args:
+            group_by (str, optional): Wafer key column to group by, e.g. 'lot_number'.
+                Defaults to None for the totals.
+                
+        Returns:
+            pandas.DataFrame: DataFrame containing bin counts.
+        """
+        if not self._count_bins():
+            return pd.DataFrame()
+            
+        columns = [f'Bin {b}' for b in self._bins]
+        
+        if group_by is not None and group_by in self._wafers.columns:
+            counts = pd.DataFrame(self._counts, columns=columns)
+            return counts.groupby(self._wafers[group_by].to_numpy()).sum().rename_axis(group_by).reset_index()
+            
+        return pd.DataFrame([self._counts.sum(axis=0)], columns=columns)
+        
+    def get_bin_pareto(self, include_good=False):
+        """
+        Get the bin Pareto, most frequent bins first.
+        
+        Args:
+            include_good (bool, optional): Include the good bins. Defaults to False.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing bin, count, percentage and cumulative percentage.
+        """
+        if not self._count_bins():
+            return pd.DataFrame()
+            
+        totals = self._counts.sum(axis=0)
+        gross = totals.sum()
+        
+        pareto = pd.DataFrame({
+            'bin': self._bins,
+            'count': totals,
+            'good': np.isin(self._bins, self.good_bins)
+        })
+        
+        if not include_good:
+            pareto = pareto[~pareto['good']]
+            
+        pareto = pareto.sort_values(['count', 'bin'], ascending=[False, True]).reset_index(drop=True)
+        pareto['pct'] = pareto['count'] / gross * 100 if gross else 0.0
+        pareto['cum_pct'] = pareto['pct'].cumsum()
+        
+        return pareto
+        
+    def get_wafer_yield(self):
+        """
+        Get good die, gross die and yield for each wafer from the soft bins.
+        
+        Returns:
+            pandas.DataFrame: DataFrame containing wafer yield.
+        """
+        if not self._count_bins():
+            return pd.DataFrame()
+            
+        good = self._counts[:, np.isin(self._bins, self.good_bins)].sum(axis=1)
+        gross = self._counts.sum(axis=1)
+        
+        yield_data = self._wafers.copy()
+        yield_data['good_die'] = good
+        yield_data['gross_die'] = gross
+        yield_data['yield_pct'] = np.where(gross > 0, good / np.maximum(gross, 1) * 100, 0.0)
+        
+        return yield_data
+
+
+if __name__ == "__main__":
+    # Example usage
+    from log_parser import CPLogParser
+    
+    parser = CPLogParser("./data/data2/rawdata")
+    df = parser.parse_all_logs()
+    
+    analyzer = CPBinAnalyzer(df, wafer_keys=['lot_number', 'wafer_number'])
+    
+    print(analyzer.get_bin_pareto())
+    print(analyzer.get_wafer_yield())
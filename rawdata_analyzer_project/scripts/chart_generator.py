@@ -13,24 +13,41 @@ from plotly.subplots import make_subplots
 import pandas as pd
 import numpy as np
 
+import downsampling
+from downsampling import sample_indices
+from figure_cache import source_fingerprint
+from run_timer import timed
+from run_trace import get_tracer, traced, span
+
 
 class CPChartGenerator:
     """Generator for CP test charts."""
     
-    def __init__(self, analyzer=None):
+    def __init__(self, analyzer=None, webgl_threshold=200000, points_per_group=5000, cache=None):
         """
         Initialize the chart generator with a data analyzer.
         
         Args:
             analyzer (CPDataAnalyzer, optional): Data analyzer.
+            webgl_threshold (int, optional): Row count above which scatter plots are
+                downsampled and drawn with WebGL. Defaults to 200000.
+            points_per_group (int, optional): Scatter points drawn per group in
+                large-data mode. Defaults to 5000.
+            cache (FigureCache, optional): On-disk cache for serialized figures.
         """
         self.analyzer = analyzer
+        self.cache = cache
+        self.timer = None  # Optional StageTimer for chart build and serialization times
+        self.tracer = get_tracer()
+        self.webgl_threshold = webgl_threshold
+        self.points_per_group = points_per_group
         self.colors = {
             'box': 'blue',
             'scatter': 'red',
             'limit_line': 'green',
             'mean_line': 'orange'
         }
+        self._grouped = {}
         
     def set_analyzer(self, analyzer):
         """
@@ -40,6 +57,118 @@ class CPChartGenerator:
             analyzer (CPDataAnalyzer): Data analyzer.
         """
         self.analyzer = analyzer
+        self._grouped = {}
+        
+    def _get_grouped_values(self, data, parameter, group_by):
+        """
+        Split the values of a parameter by group in a single pass.
+        
+        The result is kept per (parameter, group_by), so the box and scatter
+        traces of all charts share it.
+        
+        Args:
+            data (pandas.DataFrame): CP test data.
+            parameter (str): Parameter name.
+            group_by (str): Column to group by.
+            
+        Returns:
+            tuple: (group names, list of value arrays), groups in order of first appearance.
+        """
+        # Drop the grouped views when the analyzer's data was replaced, or when
+        # add_zone_index() rewrote the zone columns in place
+        zones = getattr(self.analyzer, '_zone_settings', None)
+        
+        if self._grouped.get('data') is not data or self._grouped.get('zones') != zones:
+            self._grouped = {'data': data, 'zones': zones}
+            
+        key = (parameter, group_by)
+        
+        if key not in self._grouped:
+            codes, names = pd.factorize(data[group_by], sort=False)
+            valid = codes >= 0
+            order = np.argsort(codes[valid], kind='stable')
+            values = data[parameter].to_numpy()[valid][order]
+            counts = np.bincount(codes[valid], minlength=len(names))
+            
+            self._grouped[key] = (list(names), np.split(values, np.cumsum(counts)[:-1]))
+            
+        return self._grouped[key]
+        
+    def _scatter_trace(self, x, y, name, hovertemplate, limits, large):
+        """
+        Build a scatter trace, downsampled and drawn with WebGL in large-data mode.
+        
+        Args:
+            x (numpy.ndarray): X positions.
+            y (numpy.ndarray): Parameter values.
+            name (str): Trace name.
+            hovertemplate (str): Hover template.
+            limits (dict): Dictionary containing upper and lower limits.
+            large (bool): Whether large-data mode is on.
+            
+        Returns:
+            plotly.graph_objects.Scatter or plotly.graph_objects.Scattergl: Scatter trace.
+        """
+        trace_type = go.Scatter
+        
+        if large:
+            limits = limits or {}
+            keep = sample_indices(y, self.points_per_group, limits.get('lower'), limits.get('upper'))
+            x, y = x[keep], y[keep]
+            trace_type = go.Scattergl
+            
+        return trace_type(
+            x=x,
+            y=y,
+            mode='markers',
+            name=name,
+            marker=dict(
+                color=self.colors['scatter'],
+                size=8,
+                opacity=0.7
+            ),
+            hovertemplate=hovertemplate
+        )
+        
+    def _group_hovertemplate(self, parameter, group_by, group, count, large):
+        """
+        Build the hover template of a group's scatter trace.
+        
+        Args:
+            parameter (str): Parameter name.
+            group_by (str): Column to group by.
+            group: Group name.
+            count (int): Number of dies in the group.
+            large (bool): Whether large-data mode is on.
+            
+        Returns:
+            str: Hover template.
+        """
+        if large:
+            return f'{parameter}: %{{y}}<br>{group_by}: {group} (n={count:,})<extra></extra>'
+            
+        return f'{parameter}: %{{y}}<br>{group_by}: {group}<extra></extra>'
+        
+    def _add_sampling_note(self, fig, shown, total):
+        """
+        Note on the figure how many of the dies the scatter plot shows.
+        
+        Args:
+            fig (plotly.graph_objects.Figure): Figure.
+            shown (int): Number of points drawn.
+            total (int): Number of dies.
+        """
+        fig.add_annotation(
+            x=1,
+            y=1.02,
+            xref='paper',
+            yref='paper',
+            xanchor='right',
+            yanchor='bottom',
+            text=f'Scatter shows {shown:,} of {total:,} dies (out-of-limit and outlier dies kept)',
+            showarrow=False,
+            font=dict(size=10, color='gray')
+        )
         
     def generate_box_plot(self, parameter, limits=None, group_by='lot_number'):
         """
@@ -68,12 +197,12 @@ class CPChartGenerator:
         fig = go.Figure()
         
         if group_by:
+            group_names, group_values = self._get_grouped_values(data, parameter, group_by)
+            
             # Add box plot for each group
-            for group in data[group_by].unique():
-                group_data = data[data[group_by] == group]
-                
+            for group, values in zip(group_names, group_values):
                 fig.add_trace(go.Box(
-                    y=group_data[parameter],
+                    y=values,
                     name=str(group),
                     boxmean=True,
                     marker_color=self.colors['box'],
@@ -97,7 +226,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else 0.5,
+                    x1=len(group_names) - 0.5 if group_by else 0.5,
                     y0=limits['lower'],
                     y1=limits['lower'],
                     line=dict(
@@ -111,7 +240,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else 0.5,
+                    x1=len(group_names) - 0.5 if group_by else 0.5,
                     y0=limits['upper'],
                     y1=limits['upper'],
                     line=dict(
@@ -133,7 +262,7 @@ class CPChartGenerator:
         )
         
         return fig
-    
+        
     def generate_scatter_plot(self, parameter, limits=None, group_by='lot_number'):
         """
         Generate a scatter plot for a parameter.
@@ -157,48 +286,43 @@ class CPChartGenerator:
         if group_by not in data.columns:
             group_by = None
             
+        # Downsample to WebGL scatter traces for large data
+        large = len(data) > self.webgl_threshold
+        
         # Create figure
         fig = go.Figure()
         
         if group_by:
+            group_names, group_values = self._get_grouped_values(data, parameter, group_by)
+            
             # Add scatter plot for each group
-            for i, group in enumerate(data[group_by].unique()):
-                group_data = data[data[group_by] == group]
-                
-                fig.add_trace(go.Scatter(
-                    x=[i] * len(group_data),
-                    y=group_data[parameter],
-                    mode='markers',
-                    name=str(group),
-                    marker=dict(
-                        color=self.colors['scatter'],
-                        size=8,
-                        opacity=0.7
-                    ),
-                    hovertemplate=f'{parameter}: %{{y}}<br>{group_by}: {group}<extra></extra>'
+            for i, (group, values) in enumerate(zip(group_names, group_values)):
+                fig.add_trace(self._scatter_trace(
+                    np.full(len(values), i),
+                    values,
+                    str(group),
+                    self._group_hovertemplate(parameter, group_by, group, len(values), large),
+                    limits,
+                    large
                 ))
                 
             # Set x-axis labels
             fig.update_layout(
                 xaxis=dict(
                     tickmode='array',
-                    tickvals=list(range(len(data[group_by].unique()))),
-                    ticktext=data[group_by].unique()
+                    tickvals=list(range(len(group_names))),
+                    ticktext=group_names
                 )
             )
         else:
             # Add overall scatter plot
-            fig.add_trace(go.Scatter(
-                x=list(range(len(data))),
-                y=data[parameter],
-                mode='markers',
-                name=parameter,
-                marker=dict(
-                    color=self.colors['scatter'],
-                    size=8,
-                    opacity=0.7
-                ),
-                hovertemplate=f'{parameter}: %{{y}}<extra></extra>'
+            fig.add_trace(self._scatter_trace(
+                np.arange(len(data)),
+                data[parameter].to_numpy(),
+                parameter,
+                f'{parameter}: %{{y}}<extra></extra>',
+                limits,
+                large
             ))
             
         # Add limit lines if provided
@@ -207,7 +331,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else len(data) - 0.5,
+                    x1=len(group_names) - 0.5 if group_by else len(data) - 0.5,
                     y0=limits['lower'],
                     y1=limits['lower'],
                     line=dict(
@@ -221,7 +345,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else len(data) - 0.5,
+                    x1=len(group_names) - 0.5 if group_by else len(data) - 0.5,
                     y0=limits['upper'],
                     y1=limits['upper'],
                     line=dict(
@@ -231,6 +355,10 @@ class CPChartGenerator:
                     )
                 )
                 
+        if large:
+            shown = sum(len(trace.y) for trace in fig.data if isinstance(trace, go.Scattergl))
+            self._add_sampling_note(fig, shown, len(data))
+            
         # Update layout
         fig.update_layout(
             title=f'Scatter Plot - {parameter}',
@@ -243,7 +371,8 @@ class CPChartGenerator:
         )
         
         return fig
-    
+        
+    @traced('chart.build', 'parameter', 'group_by')
     def generate_combined_chart(self, parameter, limits=None, group_by='lot_number'):
         """
         Generate a combined chart with box plot and scatter plot.
@@ -267,6 +396,9 @@ class CPChartGenerator:
         if group_by not in data.columns:
             group_by = None
             
+        # Downsample to WebGL scatter traces for large data
+        large = len(data) > self.webgl_threshold
+        
         # Create figure with subplots
         fig = make_subplots(
             rows=2,
@@ -277,13 +409,13 @@ class CPChartGenerator:
         )
         
         if group_by:
+            group_names, group_values = self._get_grouped_values(data, parameter, group_by)
+            
             # Add box plot for each group
-            for i, group in enumerate(data[group_by].unique()):
-                group_data = data[data[group_by] == group]
-                
+            for i, (group, values) in enumerate(zip(group_names, group_values)):
                 fig.add_trace(
                     go.Box(
-                        y=group_data[parameter],
+                        y=values,
                         name=str(group),
                         boxmean=True,
                         marker_color=self.colors['box'],
@@ -295,17 +427,13 @@ class CPChartGenerator:
                 )
                 
                 fig.add_trace(
-                    go.Scatter(
-                        x=[i] * len(group_data),
-                        y=group_data[parameter],
-                        mode='markers',
-                        name=str(group),
-                        marker=dict(
-                            color=self.colors['scatter'],
-                            size=8,
-                            opacity=0.7
-                        ),
-                        hovertemplate=f'{parameter}: %{{y}}<br>{group_by}: {group}<extra></extra>'
+                    self._scatter_trace(
+                        np.full(len(values), i),
+                        values,
+                        str(group),
+                        self._group_hovertemplate(parameter, group_by, group, len(values), large),
+                        limits,
+                        large
                     ),
                     row=2,
                     col=1
@@ -314,8 +442,8 @@ class CPChartGenerator:
             # Set x-axis labels
             fig.update_xaxes(
                 tickmode='array',
-                tickvals=list(range(len(data[group_by].unique()))),
-                ticktext=data[group_by].unique(),
+                tickvals=list(range(len(group_names))),
+                ticktext=group_names,
                 row=2,
                 col=1
             )
@@ -336,17 +464,13 @@ class CPChartGenerator:
             
             # Add overall scatter plot
             fig.add_trace(
-                go.Scatter(
-                    x=list(range(len(data))),
-                    y=data[parameter],
-                    mode='markers',
-                    name=parameter,
-                    marker=dict(
-                        color=self.colors['scatter'],
-                        size=8,
-                        opacity=0.7
-                    ),
-                    hovertemplate=f'{parameter}: %{{y}}<extra></extra>'
+                self._scatter_trace(
+                    np.arange(len(data)),
+                    data[parameter].to_numpy(),
+                    parameter,
+                    f'{parameter}: %{{y}}<extra></extra>',
+                    limits,
+                    large
                 ),
                 row=2,
                 col=1
@@ -358,7 +482,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else 0.5,
+                    x1=len(group_names) - 0.5 if group_by else 0.5,
                     y0=limits['lower'],
                     y1=limits['lower'],
                     line=dict(
@@ -373,7 +497,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else len(data) - 0.5,
+                    x1=len(group_names) - 0.5 if group_by else len(data) - 0.5,
                     y0=limits['lower'],
                     y1=limits['lower'],
                     line=dict(
@@ -389,7 +513,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else 0.5,
+                    x1=len(group_names) - 0.5 if group_by else 0.5,
                     y0=limits['upper'],
                     y1=limits['upper'],
                     line=dict(
@@ -404,7 +528,7 @@ class CPChartGenerator:
                 fig.add_shape(
                     type='line',
                     x0=-0.5,
-                    x1=len(data[group_by].unique()) - 0.5 if group_by else len(data) - 0.5,
+                    x1=len(group_names) - 0.5 if group_by else len(data) - 0.5,
                     y0=limits['upper'],
                     y1=limits['upper'],
                     line=dict(
@@ -416,53 +540,9 @@ class CPChartGenerator:
                     col=1
                 )
                 
-        # Add statistics table
-        stats = self.analyzer.get_parameter_stats(parameter, group_by)
-        
-        if not stats.empty:
-            # Create table trace
-            table_data = [stats.columns.tolist()]
-            table_data.extend(stats.values.tolist())
-            
-            table = go.Table(
-                header=dict(
-                    values=stats.columns.tolist(),
-                    fill_color='paleturquoise',
-                    align='center'
-                ),
-                cells=dict(
-                    values=[stats[col] for col in stats.columns],
-                    fill_color='lavender',
-                    align='center'
-                )
-            )
-            
-            # Add table as annotation
-            table_html = f"""
-            <table style="width:100%; border-collapse: collapse; margin-top: 20px;">
-                <tr style="background-color: #f2f2f2;">
-                    <th style="padding: 8px; text-align: center; border: 1px solid #ddd;">{group_by if group_by else ''}</th>
-                    <th style="padding: 8px; text-align: center; border: 1px solid #ddd;">Count</th>
-                    <th style="padding: 8px; text-align: center; border: 1px solid #ddd;">Mean</th>
-                    <th style="padding: 8px; text-align: center; border: 1px solid #ddd;">Std</th>
-                    <th style="padding: 8px; text-align: center; border: 1px solid #ddd;">Min</th>
-                    <th style="padding: 8px; text-align: center; border: 1px solid #ddd;">Max</th>
-                </tr>
-            """
-            
-            for _, row in stats.iterrows():
-                table_html += f"""
-                <tr>
-                    <td style="padding: 8px; text-align: center; border: 1px solid #ddd;">{row[group_by] if group_by else 'All'}</td>
-                    <td style="padding: 8px; text-align: center; border: 1px solid #ddd;">{int(row['count'])}</td>
-                    <td style="padding: 8px; text-align: center; border: 1px solid #ddd;">{row['mean']:.4f}</td>
-                    <td style="padding: 8px; text-align: center; border: 1px solid #ddd;">{row['std']:.4f}</td>
-                    <td style="padding: 8px; text-align: center; border: 1px solid #ddd;">{row['min']:.4f}</td>
-                    <td style="padding: 8px; text-align: center; border: 1px solid #ddd;">{row['max']:.4f}</td>
-                </tr>
-                """
-            
-            table_html += "</table>"
+        if large:
+            shown = sum(len(trace.y) for trace in fig.data if isinstance(trace, go.Scattergl))
+            self._add_sampling_note(fig, shown, len(data))
             
         # Update layout
         fig.update_layout(
@@ -476,6 +556,59 @@ class CPChartGenerator:
         )
         
         return fig
+        
+    @traced('chart.figure', 'parameter', 'group_by', result=lambda fig_json: {'bytes': len(fig_json)})
+    def get_combined_chart_json(self, parameter, limits=None, group_by='lot_number'):
+        """
+        Get the combined chart as figure JSON, served from the figure cache when possible.
+        
+        Args:
+            parameter (str): Parameter name.
+            limits (dict, optional): Dictionary containing upper and lower limits.
+            group_by (str, optional): Column to group by. Defaults to 'lot_number'.
+            
+        Returns:
+            str: Figure JSON.
+        """
+        key = None
+        
+        if self.cache is not None and self.analyzer is not None and self.analyzer.data is not None:
+            data = self.analyzer.data
+            columns = [col for col in [parameter, group_by] if col in data.columns]
+            
+            with timed(self.timer, 'figure_cache', parameter):
+                key = self.cache.make_key(
+                    data[columns],
+                    chart='combined',
+                    parameter=parameter,
+                    limits=limits,
+                    group_by=group_by,
+                    colors=self.colors,
+                    webgl_threshold=self.webgl_threshold,
+                    points_per_group=self.points_per_group,
+                    code=_CODE_VERSION
+                )
+                
+                fig_json = self.cache.get(key)
+                
+            if fig_json is not None:
+                return fig_json
+                
+        with timed(self.timer, 'chart_build', parameter):
+            fig = self.generate_combined_chart(parameter, limits, group_by)
+            
+        with timed(self.timer, 'serialize', parameter), span(self.tracer, 'chart.serialize', parameter=parameter):
+            fig_json = fig.to_json()
+            
+        if key is not None:
+            with timed(self.timer, 'figure_cache', parameter):
+                self.cache.put(key, fig_json)
+                
+        return fig_json
+
+
+# Cached figures are rebuilt when the chart code changes
+_CODE_VERSION = source_fingerprint(__file__, downsampling.__file__)
 
 
 if __name__ == "__main__":
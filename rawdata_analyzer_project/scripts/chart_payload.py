@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Chart Payload
+-------------------
+This module packs figure JSON into a compressed binary payload for the
+chart data files of a report.
+
+A compressed payload is written as {"encoding": "deflate", "data": <base64>}.
+The base64 data inflates to a 4-byte little-endian header length, a UTF-8
+JSON header {"figure": ..., "arrays": [...]} and the array bytes. In the
+figure, each typed array and each long repeated string array is replaced by
+{"$array": index}. The array at that index is stored at its offset as
+little-endian values, with the bytes shuffled so the first byte of every
+value comes first, then the second, and so on. Arrays of repeated strings
+are stored as integer codes into their "categories" list. script.js
+inflates the payload with the browser's DecompressionStream.
+
+numpy is imported where it is used, so main.py can read PAYLOAD_FORMATS
+for its command line without loading it.
+"""
+
+import json
+import zlib
+import base64
+import struct
+
+# Chart data formats a report can be written with
+PAYLOAD_FORMATS = ('typed', 'compressed')
+
+# String arrays at least this long are stored as category codes
+CATEGORY_MIN_LENGTH = 64
+
+
+def _shuffle_bytes(array):
+    """
+    Group the bytes of an array by their position within each value.
+    
+    Args:
+        array (numpy.ndarray): Little-endian array.
+        
+    Returns:
+        bytes: Shuffled array bytes.
+    """
+    import numpy as np
+    
+    return array.view(np.uint8).reshape(-1, array.itemsize).T.tobytes()
+
+
+class _ArrayPacker:
+    """Collects the arrays of a figure into one binary block."""
+    
+    def __init__(self, float32=True):
+        """
+        Initialize the array packer.
+        
+        Args:
+            float32 (bool, optional): Store float arrays as float32. Defaults to True.
+        """
+        self.float32 = float32
+        self.arrays = []
+        self.chunks = []
+        self.offset = 0
+        
+    def add(self, array, **details):
+        """
+        Add an array to the block.
+        
+        Args:
+            array (numpy.ndarray): Array values.
+            **details: Extra fields of the array description, e.g. categories.
+            
+        Returns:
+            dict: Reference that replaces the array in the figure.
+        """
+        import numpy as np
+        
+        if self.float32 and array.dtype.kind == 'f':
+            array = array.astype('<f4')
+            
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder('<'))
+        data = _shuffle_bytes(array)
+        
+        self.arrays.append(dict(dtype=array.dtype.str[1:], offset=self.offset, length=len(array), **details))
+        self.chunks.append(data)
+        self.offset += len(data)
+        
+        return {'$array': len(self.arrays) - 1}
+        
+    def pack(self, value):
+        """
+        Replace the typed and repeated string arrays of a figure with references.
+        
+        Args:
+            value: Figure or part of a figure.
+            
+        Returns:
+            Figure with array references.
+        """
+        import numpy as np
+        
+        if isinstance(value, dict):
+            if 'bdata' in value and 'dtype' in value and 'shape' not in value:
+                return self.add(np.frombuffer(base64.b64decode(value['bdata']), dtype='<' + value['dtype']))
+                
+            return {key: self.pack(item) for key, item in value.items()}
+            
+        if isinstance(value, list):
+            if len(value) >= CATEGORY_MIN_LENGTH and all(isinstance(item, str) for item in value):
+                categories, codes = np.unique(value, return_inverse=True)
+                
+                if len(categories) <= len(value) // 4:
+                    dtype = '<u1' if len(categories) <= 256 else '<u2' if len(categories) <= 65536 else '<u4'
+                    return self.add(codes.astype(dtype), categories=categories.tolist())
+                    
+            return [self.pack(item) for item in value]
+            
+        return value
+
+
+def compress_figure_json(fig_json, float32=True, level=9):
+    """
+    Pack figure JSON into a compressed binary payload.
+    
+    Float32 keeps about seven significant digits, more than the tester logs
+    record, so it is the default for the die values.
+    
+    Args:
+        fig_json (str): Figure JSON.
+        float32 (bool, optional): Store float arrays as float32. Defaults to True.
+        level (int, optional): Deflate compression level. Defaults to 9.
+        
+    Returns:
+        str: Payload JSON.
+    """
+    packer = _ArrayPacker(float32)
+    figure = packer.pack(json.loads(fig_json))
+    
+    header = json.dumps({'figure': figure, 'arrays': packer.arrays}, separators=(',', ':')).encode('utf-8')
+    data = zlib.compress(b''.join([struct.pack('<I', len(header)), header] + packer.chunks), level)
+    
+    return json.dumps({'encoding': 'deflate', 'data': base64.b64encode(data).decode('ascii')})
+
+
+def encode_payload(fig_json, payload='typed'):
+    """
+    Encode figure JSON in a chart data format.
+    
+    Args:
+        fig_json (str): Figure JSON.
+        payload (str, optional): 'typed' keeps the figure JSON with Plotly typed
+            arrays, 'compressed' packs it with compress_figure_json(). Defaults to 'typed'.
+            
+    Returns:
+        str: Chart data JSON.
+    """
+    if payload == 'compressed':
+        return compress_figure_json(fig_json)
+        
+    return fig_json
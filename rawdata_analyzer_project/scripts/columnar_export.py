@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Columnar Export
+-------------------
+This module writes the raw die table and the statistics and yield tables
+as Parquet, Feather or Arrow IPC files for loading in notebooks.
+
+The raw die table is sorted by lot and wafer and written with one row group
+(Parquet) or record batch (Feather/Arrow) per wafer, so a reader can load a
+single wafer or lot without scanning the whole file. Integer columns are
+stored in the smallest integer type that holds them and repeated strings
+are dictionary encoded. Test values stay float64 so pass/fail against the
+limits is the same as in the analysis.
+
+Requires pyarrow. pandas and numpy are imported where they are used, so
+main.py can read COLUMNAR_FORMATS for its command line without loading them.
+"""
+
+import os
+
+from wafer_keys import WAFER_COLUMNS, wafer_sort_key
+
+# Columnar output formats: file extension and default compression
+COLUMNAR_FORMATS = {
+    'parquet': ('parquet', 'zstd'),
+    'feather': ('feather', 'lz4'),
+    'arrow': ('arrow', 'zstd')
+}
+
+
+def compact_dtypes(df):
+    """
+    Convert a table to compact column types.
+    
+    Integer columns are downcast to the smallest type that holds their values,
+    and string columns with repeated values become categoricals.
+    
+    Args:
+        df (pandas.DataFrame): Table to convert.
+        
+    Returns:
+        pandas.DataFrame: Table with compact column types.
+    """
+    import pandas as pd
+    
+    columns = {}
+    
+    for col in df.columns:
+        series = df[col]
+        
+        if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            columns[col] = pd.to_numeric(series, downcast='integer' if series.min() < 0 else 'unsigned')
+        elif pd.api.types.is_string_dtype(series) or series.dtype == object:
+            if series.nunique(dropna=False) <= len(series) // 2:
+                columns[col] = series.astype('category')
+            else:
+                columns[col] = series
+        else:
+            columns[col] = series
+            
+    return pd.DataFrame(columns, index=df.index)
+
+
+def _wafer_tables(table, df):
+    """
+    Split an Arrow table into one slice per wafer.
+    
+    Args:
+        table (pyarrow.Table): Table built from df.
+        df (pandas.DataFrame): Table sorted by the wafer columns.
+        
+    Returns:
+        list: Table slices, one per wafer.
+    """
+    import numpy as np
+    
+    keys = [col for col in WAFER_COLUMNS if col in df.columns]
+    
+    if not keys or df.empty:
+        return [table]
+        
+    # Rows are sorted, so each wafer is a contiguous run
+    codes = df.groupby(keys, sort=False, observed=True, dropna=False).ngroup().to_numpy()
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1, [len(codes)]])
+    
+    return [table.slice(start, end - start) for start, end in zip(starts[:-1], starts[1:])]
+
+
+def write_columnar(df, file_path, output_format='parquet', compression=None, by_wafer=False):
+    """
+    Write a table in a columnar format.
+    
+    Args:
+        df (pandas.DataFrame): Table to write.
+        file_path (str): Output file path.
+        output_format (str, optional): 'parquet', 'feather' or 'arrow'. Defaults to 'parquet'.
+        compression (str, optional): Compression codec. Defaults to the format's default.
+        by_wafer (bool, optional): Sort by lot and wafer and write one row group
+            or record batch per wafer. Defaults to False.
+            
+    Returns:
+        str or None: Path of the written file, or None on failure.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError:
+        print(f"Cannot write {file_path}: the {output_format} format requires pyarrow (pip install pyarrow)")
+        return None
+        
+    compression = compression or COLUMNAR_FORMATS[output_format][1]
+    
+    if by_wafer:
+        keys = [col for col in WAFER_COLUMNS if col in df.columns]
+        
+        if keys:
+            df = df.sort_values(keys, kind='stable', key=wafer_sort_key)
+            
+    df = compact_dtypes(df).reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    slices = _wafer_tables(table, df) if by_wafer else [table]
+    
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    tmp_path = f'{file_path}.{os.getpid()}.tmp'
+    
+    try:
+        if output_format == 'parquet':
+            with pq.ParquetWriter(tmp_path, table.schema, compression=compression) as writer:
+                for part in slices:
+                    writer.write_table(part, row_group_size=max(part.num_rows, 1))
+        else:
+            options = ipc.IpcWriteOptions(compression=compression)
+            
+            with ipc.new_file(tmp_path, table.schema, options=options) as writer:
+                for part in slices:
+                    writer.write_table(part, max_chunksize=max(part.num_rows, 1))
+                    
+        os.replace(tmp_path, file_path)
+        
+    except Exception as e:
+        print(f"Error writing {file_path}: {str(e)}")
+        
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+            
+        return None
+        
+    return file_path
+
+
+def _stack(tables):
+    """
+    Stack per-parameter tables into one table with a 'parameter' column.
+    
+    Args:
+        tables (dict): Table of each parameter.
+        
+    Returns:
+        pandas.DataFrame: Stacked table.
+    """
+    import pandas as pd
+    
+    frames = [table.assign(parameter=param) for param, table in tables.items() if not table.empty]
+    
+    if not frames:
+        return pd.DataFrame({'parameter': []})
+        
+    stacked = pd.concat(frames, ignore_index=True)
+    
+    return stacked[['parameter'] + [col for col in stacked.columns if col != 'parameter']]
+
+
+def export_columnar(output_dir, output_format, data, stats, yields):
+    """
+    Write the raw die table and the statistics and yield tables of a run.
+    
+    Writes cp_test_data, parameter_stats and parameter_yield files. The
+    statistics and yield of all parameters share one table each, with a
+    leading 'parameter' column.
+    
+    Args:
+        output_dir (str): Output directory.
+        output_format (str): 'parquet', 'feather' or 'arrow'.
+        data (pandas.DataFrame): Raw die table.
+        stats (dict): Statistics table of each parameter.
+        yields (dict): Yield table of each parameter.
+        
+    Returns:
+        list or None: Paths of the written files, or None if any table could
+            not be written.
+    """
+    extension = COLUMNAR_FORMATS[output_format][0]
+    
+    tables = {
+        'cp_test_data': (data, True),
+        'parameter_stats': (_stack(stats), False),
+        'parameter_yield': (_stack(yields), False)
+    }
+    
+    written = []
+    
+    for name, (table, by_wafer) in tables.items():
+        file_path = write_columnar(
+            table, os.path.join(output_dir, f"{name}.{extension}"), output_format, by_wafer=by_wafer
+        )
+        
+        if not file_path:
+            return None
+            
+        written.append(file_path)
+        
+    return written
+
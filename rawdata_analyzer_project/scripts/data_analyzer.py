@@ -10,6 +10,11 @@ This module analyzes CP test data.
 import pandas as pd
 import numpy as np
 
+from bin_analyzer import CPBinAnalyzer
+from summary_loader import reconcile_wafer_yield
+from run_trace import get_tracer, traced
+from wafer_keys import WAFER_COLUMNS
+
 
 class CPDataAnalyzer:
     """Analyzer for CP test data."""
@@ -22,6 +27,10 @@ class CPDataAnalyzer:
             data (pandas.DataFrame, optional): CP test data.
         """
         self.data = data
+        self._zone_settings = None
+        self._bin_analyzer = None
+        self.summary = None
+        self.tracer = get_tracer()
         
     def set_data(self, data):
         """
@@ -31,7 +40,246 @@ class CPDataAnalyzer:
             data (pandas.DataFrame): CP test data.
         """
         self.data = data
+        self._zone_settings = None
+        self._bin_analyzer = None
+        
+    def _wafer_keys(self):
+        """
+        Get the columns that identify a single wafer.
+        
+        Returns:
+            list: Column names identifying a wafer.
+        """
+        keys = [col for col in WAFER_COLUMNS if col in self.data.columns]
+        
+        if not keys and 'file_name' in self.data.columns:
+            keys = ['file_name']
+            
+        return keys
+        
+    @traced('analyzer.zones', 'n_rings', 'n_sectors')
+    def add_zone_index(self, n_rings=3, n_sectors=1):
+        """
+        Add radius and zone columns for each die.
+        
+        The wafer center and radius are derived from the X/Y extent of each
+        wafer. The columns are stored on the data, so they are only computed
+        again when the ring/sector settings change.
+        
+        Args:
+            n_rings (int, optional): Number of concentric rings. Defaults to 3.
+            n_sectors (int, optional): Number of angular sectors. Defaults to 1.
+            
+        Returns:
+            pandas.DataFrame: Data with 'radius', 'ring', 'sector' and 'zone' columns.
+            
+        Raises:
+            ValueError: If n_rings or n_sectors is less than 1.
+        """
+        if n_rings < 1 or n_sectors < 1:
+            raise ValueError(f"Zone rings and sectors must be at least 1, got {n_rings} rings and {n_sectors} sectors")
+            
+        if self.data is None or 'X' not in self.data.columns or 'Y' not in self.data.columns:
+            return self.data
+            
+        if self._zone_settings == (n_rings, n_sectors):
+            return self.data
+            
+        data = self.data
+        keys = self._wafer_keys()
+        
+        x = data['X'].to_numpy(dtype=float)
+        y = data['Y'].to_numpy(dtype=float)
+        
+        if keys:
+            groups = data.groupby(keys, sort=False)
+            x_min = groups['X'].transform('min').to_numpy(dtype=float)
+            x_max = groups['X'].transform('max').to_numpy(dtype=float)
+            y_min = groups['Y'].transform('min').to_numpy(dtype=float)
+            y_max = groups['Y'].transform('max').to_numpy(dtype=float)
+        else:
+            x_min, x_max = np.nanmin(x), np.nanmax(x)
+            y_min, y_max = np.nanmin(y), np.nanmax(y)
+            
+        # Normalize each axis separately, X and Y die pitches usually differ
+        half_x = np.broadcast_to((x_max - x_min) / 2, x.shape)
+        half_y = np.broadcast_to((y_max - y_min) / 2, y.shape)
+        dx = np.divide(x - (x_min + x_max) / 2, half_x, out=np.zeros_like(x), where=half_x > 0)
+        dy = np.divide(y - (y_min + y_max) / 2, half_y, out=np.zeros_like(y), where=half_y > 0)
+            
+        radius = np.clip(np.hypot(dx, dy), 0.0, 1.0)
+        ring = np.minimum((radius * n_rings).astype(int), n_rings - 1)
+        
+        angle = np.mod(np.arctan2(dy, dx), 2 * np.pi)
+        sector = np.minimum((angle / (2 * np.pi) * n_sectors).astype(int), n_sectors - 1)
+        
+        if n_rings == 3:
+            ring_labels = ['center', 'middle', 'edge']
+        else:
+            ring_labels = [f'ring{i + 1}' for i in range(n_rings)]
+            
+        if n_sectors > 1:
+            zone_labels = [f'{label}-s{j + 1}' for label in ring_labels for j in range(n_sectors)]
+        else:
+            zone_labels = ring_labels
+            
+        data['radius'] = radius
+        data['ring'] = ring
+        data['sector'] = sector
+        data['zone'] = pd.Categorical.from_codes(ring * n_sectors + sector, categories=zone_labels, ordered=True)
+        
+        self._zone_settings = (n_rings, n_sectors)
+        
+        return data
+        
+    def get_zone_stats(self, parameter, group_by=None, n_rings=3, n_sectors=1):
+        """
+        Get statistics for a parameter per wafer zone.
+        
+        Args:
+            parameter (str): Parameter name.
+            group_by (str, optional): Additional column to group by. Defaults to None.
+            n_rings (int, optional): Number of concentric rings. Defaults to 3.
+            n_sectors (int, optional): Number of angular sectors. Defaults to 1.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing statistics per zone.
+        """
+        if self.data is None or parameter not in self.data.columns:
+            return pd.DataFrame()
+            
+        data = self.add_zone_index(n_rings, n_sectors)
+        
+        if 'zone' not in data.columns:
+            return pd.DataFrame()
+            
+        keys = [group_by, 'zone'] if group_by is not None and group_by in data.columns else ['zone']
+        
+        stats = data.groupby(keys, observed=True)[parameter].agg(['count', 'mean', 'std', 'min', 'max']).reset_index()
+        stats['std'] = stats['std'].fillna(0)
+        
+        return stats
+        
+    def calculate_zone_yield(self, parameter, lower=None, upper=None, group_by=None, n_rings=3, n_sectors=1):
+        """
+        Calculate yield statistics for a parameter per wafer zone.
+        
+        Args:
+            parameter (str): Parameter name.
+            lower (float, optional): Lower limit. Defaults to None.
+            upper (float, optional): Upper limit. Defaults to None.
+            group_by (str, optional): Additional column to group by. Defaults to None.
+            n_rings (int, optional): Number of concentric rings. Defaults to 3.
+            n_sectors (int, optional): Number of angular sectors. Defaults to 1.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing yield statistics per zone.
+        """
+        if self.data is None or parameter not in self.data.columns:
+            return pd.DataFrame()
+            
+        data = self.add_zone_index(n_rings, n_sectors)
+        
+        if 'zone' not in data.columns:
+            return pd.DataFrame()
+            
+        values = data[parameter]
+        passed = pd.Series(True, index=data.index)
+        
+        if lower is not None:
+            passed &= values >= lower
+        if upper is not None:
+            passed &= values <= upper
+            
+        keys = [group_by, 'zone'] if group_by is not None and group_by in data.columns else ['zone']
+        
+        yield_data = passed.groupby([data[key] for key in keys], observed=True).agg(['count', 'sum']).reset_index()
+        yield_data.columns = keys + ['total', 'passed']
+        yield_data['failed'] = yield_data['total'] - yield_data['passed']
+        yield_data['yield_pct'] = yield_data['passed'] / yield_data['total'] * 100
+        
+        return yield_data
+    
+    def get_bin_analyzer(self):
+        """
+        Get the bin analyzer for the current data.
+        
+        Returns:
+            CPBinAnalyzer: Bin analyzer sharing this analyzer's data.
+        """
+        if self._bin_analyzer is None:
+            self._bin_analyzer = CPBinAnalyzer(self.data, self._wafer_keys() if self.data is not None else [])
+            
+        return self._bin_analyzer
+        
+    def get_bin_pareto(self, include_good=False):
+        """
+        Get the bin Pareto, most frequent bins first.
+        
+        Args:
+            include_good (bool, optional): Include the good bins. Defaults to False.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing the bin Pareto.
+        """
+        return self.get_bin_analyzer().get_bin_pareto(include_good)
+        
+    def get_bin_counts(self, group_by=None):
+        """
+        Get bin counts, optionally per lot or wafer.
+        
+        Args:
+            group_by (str, optional): Wafer key column to group by. Defaults to None.
+            
+        Returns:
+            pandas.DataFrame: DataFrame containing bin counts.
+        """
+        return self.get_bin_analyzer().get_bin_counts(group_by)
+        
+    def get_wafer_bin_matrix(self):
+        """
+        Get the die count of each bin for each wafer.
+        
+        Returns:
+            pandas.DataFrame: Wafer × bin count matrix.
+        """
+        return self.get_bin_analyzer().get_wafer_bin_matrix()
+        
+    def get_wafer_yield(self):
+        """
+        Get good die, gross die and yield for each wafer from the soft bins.
+        
+        Returns:
+            pandas.DataFrame: DataFrame containing wafer yield.
+        """
+        return self.get_bin_analyzer().get_wafer_yield()
+    
+    def set_summary(self, summary):
+        """
+        Set the fab summary table to reconcile against.
+        
+        Args:
+            summary (pandas.DataFrame): Summary table from CPSummaryLoader.
+        """
+        self.summary = summary
+        
+    @traced('analyzer.reconcile_summary')
+    def reconcile_summary(self, tolerance=0.01):
+        """
+        Join the wafer yield from the raw data with the fab summary.
+        
+        Args:
+            tolerance (float, optional): Allowed yield difference in percent. Defaults to 0.01.
+            
+        Returns:
+            pandas.DataFrame: Joined table with a status column per wafer.
+        """
+        if self.summary is None or self.summary.empty:
+            return pd.DataFrame()
+            
+        return reconcile_wafer_yield(self.get_wafer_yield(), self.summary, tolerance)
     
+    @traced('analyzer.stats', 'parameter', 'group_by')
     def get_parameter_stats(self, parameter, group_by=None):
         """
         Get statistics for a parameter.
@@ -70,6 +318,7 @@ class CPDataAnalyzer:
                 
         return stats
     
+    @traced('analyzer.yield', 'parameter', 'group_by')
     def calculate_yield(self, parameter, lower=None, upper=None, group_by=None):
         """
         Calculate yield statistics for a parameter.
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Downsampling
+-------------------
+This module picks the points to draw for large scatter plots.
+"""
+
+import numpy as np
+
+
+def find_keep_mask(values, lower=None, upper=None):
+    """
+    Find the points that must always be drawn.
+    
+    These are the out-of-limit values and the values outside the 1.5 × IQR
+    box plot fences.
+    
+    Args:
+        values (numpy.ndarray): Parameter values.
+        lower (float, optional): Lower limit. Defaults to None.
+        upper (float, optional): Upper limit. Defaults to None.
+        
+    Returns:
+        numpy.ndarray: Boolean mask of the points to keep.
+    """
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    keep = np.zeros(len(values), dtype=bool)
+    
+    if not finite.any():
+        return keep
+        
+    q1, q3 = np.percentile(values[finite], [25, 75])
+    fence = 1.5 * (q3 - q1)
+    
+    with np.errstate(invalid='ignore'):
+        keep |= (values < q1 - fence) | (values > q3 + fence)
+        
+        if lower is not None:
+            keep |= values < lower
+            
+        if upper is not None:
+            keep |= values > upper
+            
+    return keep
+
+
+def sample_indices(values, budget, lower=None, upper=None, seed=0):
+    """
+    Pick at most about `budget` points of a group to draw.
+    
+    Out-of-limit and fence outlier points are always kept; the remaining
+    budget is filled with a uniform random sample of the other points.
+    The seed is fixed so the same data gives the same chart.
+    
+    Args:
+        values (numpy.ndarray): Parameter values of one group.
+        budget (int): Number of points to draw.
+        lower (float, optional): Lower limit. Defaults to None.
+        upper (float, optional): Upper limit. Defaults to None.
+        seed (int, optional): Random seed. Defaults to 0.
+        
+    Returns:
+        numpy.ndarray: Sorted indices of the points to draw.
+    """
+    values = np.asarray(values, dtype=float)
+    
+    if len(values) <= budget:
+        return np.arange(len(values))
+        
+    keep = find_keep_mask(values, lower, upper)
+    rest = np.flatnonzero(~keep & np.isfinite(values))
+    n_rest = min(max(budget - int(keep.sum()), 0), len(rest))
+    
+    rng = np.random.default_rng(seed)
+    sampled = rng.choice(rest, size=n_rest, replace=False)
+    
+    return np.sort(np.concatenate([np.flatnonzero(keep), sampled]))
+
+
+def sample_group_indices(groups, values, budget, lower=None, upper=None, seed=0):
+    """
+    Pick the points to draw with a separate budget for every group.
+    
+    Args:
+        groups (numpy.ndarray): Group label of each point.
+        values (numpy.ndarray): Parameter values.
+        budget (int): Number of points to draw per group.
+        lower (float, optional): Lower limit. Defaults to None.
+        upper (float, optional): Upper limit. Defaults to None.
+        seed (int, optional): Random seed. Defaults to 0.
+        
+    Returns:
+        numpy.ndarray: Sorted indices of the points to draw.
+    """
+    values = np.asarray(values, dtype=float)
+    _, codes = np.unique(np.asarray(groups), return_inverse=True)
+    
+    order = np.argsort(codes, kind='stable')
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    
+    selected = [
+        members[sample_indices(values[members], budget, lower, upper, seed)]
+        for members in np.split(order, bounds)
+    ]
+    
+    return np.sort(np.concatenate(selected)) if selected else np.arange(0)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Excel Export
+-------------------
+This module streams analysis tables and the raw die table into an Excel
+workbook.
+
+The workbook is written with xlsxwriter in constant memory mode, which
+flushes each row to disk once the next row is started, so memory use does
+not grow with the size of the lot. Rows are converted to cell values in
+chunks. A raw die table longer than the Excel row limit is split over
+several 'Raw Data' sheets, keeping each wafer on one sheet where it fits.
+
+Requires xlsxwriter.
+"""
+
+import os
+import numpy as np
+
+from wafer_keys import WAFER_COLUMNS
+
+# Rows per Excel worksheet, including the header row
+EXCEL_MAX_ROWS = 1048576
+
+# Longest allowed Excel sheet name
+SHEET_NAME_LENGTH = 31
+
+
+def split_data_sheets(data, sheet_name='Raw Data', max_rows=EXCEL_MAX_ROWS - 1):
+    """
+    Split the raw die table into sheets that fit the Excel row limit.
+    
+    Whole wafers are packed onto each sheet in order. A wafer with more dies
+    than fit on one sheet is split into blocks of max_rows rows.
+    
+    Args:
+        data (pandas.DataFrame): Raw die table.
+        sheet_name (str, optional): Base sheet name. Defaults to 'Raw Data'.
+        max_rows (int, optional): Data rows per sheet. Defaults to the Excel limit.
+        
+    Returns:
+        list: (sheet name, table) pairs.
+    """
+    if len(data) <= max_rows:
+        return [(sheet_name, data)]
+        
+    keys = [col for col in WAFER_COLUMNS if col in data.columns]
+    
+    if keys:
+        # Start of each run of rows from the same wafer
+        codes = data.groupby(keys, sort=False, dropna=False).ngroup().to_numpy()
+        bounds = np.concatenate([[0], np.flatnonzero(np.diff(codes)) + 1, [len(data)]])
+    else:
+        bounds = np.array([0, len(data)])
+        
+    blocks = []
+    sheet_start = 0
+    
+    for wafer_start, wafer_end in zip(bounds[:-1], bounds[1:]):
+        if wafer_end - sheet_start <= max_rows:
+            continue
+            
+        # The wafer does not fit on the current sheet, start a new one
+        if wafer_start > sheet_start:
+            blocks.append((sheet_start, wafer_start))
+            sheet_start = wafer_start
+            
+        while wafer_end - sheet_start > max_rows:
+            blocks.append((sheet_start, sheet_start + max_rows))
+            sheet_start += max_rows
+            
+    blocks.append((sheet_start, len(data)))
+    
+    return [(f'{sheet_name} {i}', data.iloc[start:end]) for i, (start, end) in enumerate(blocks, 1)]
+
+
+def _cell_rows(frame, start, end):
+    """
+    Convert a block of table rows to Excel cell values.
+    
+    Args:
+        frame (pandas.DataFrame): Table.
+        start (int): First row of the block.
+        end (int): End of the block.
+        
+    Returns:
+        list: Rows of cell values, None for missing values.
+    """
+    block = frame.iloc[start:end]
+    columns = []
+    
+    for col in block.columns:
+        values = block[col]
+        
+        if values.isna().any():
+            values = values.astype(object).where(values.notna(), None)
+            
+        columns.append(values.tolist())
+        
+    return list(zip(*columns))
+
+
+def write_excel(file_path, sheets, chunk_rows=10000):
+    """
+    Stream tables into an Excel workbook, one sheet per table.
+    
+    Args:
+        file_path (str): Output file path.
+        sheets (list): (sheet name, table) pairs in sheet order. Use
+            split_data_sheets() for tables that may exceed the row limit.
+        chunk_rows (int, optional): Rows converted to cell values at a time. Defaults to 10000.
+        
+    Returns:
+        str or None: Path of the written file, or None on failure.
+    """
+    try:
+        import xlsxwriter
+    except ImportError:
+        print(f"Cannot write {file_path}: Excel output requires xlsxwriter (pip install xlsxwriter)")
+        return None
+        
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    tmp_path = f'{file_path}.{os.getpid()}.tmp'
+    
+    try:
+        # Infinite die values, e.g. 1.0E+999 in a log, are written as #DIV/0! errors
+        with xlsxwriter.Workbook(tmp_path, {'constant_memory': True, 'nan_inf_to_errors': True}) as workbook:
+            header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center'})
+            
+            for sheet_name, frame in sheets:
+                worksheet = workbook.add_worksheet(str(sheet_name)[:SHEET_NAME_LENGTH])
+                worksheet.write_row(0, 0, [str(col) for col in frame.columns], header_format)
+                
+                for start in range(0, len(frame), chunk_rows):
+                    for row, values in enumerate(_cell_rows(frame, start, start + chunk_rows), start + 1):
+                        worksheet.write_row(row, 0, values)
+                        
+        os.replace(tmp_path, file_path)
+        
+    except Exception as e:
+        print(f"Error writing {file_path}: {str(e)}")
+        
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+            
+        return None
+        
+    return file_path
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Figure Cache
+-------------------
+This module caches serialized chart figures on disk, keyed on a
+fingerprint of the chart's input data and options.
+"""
+
+import os
+import json
+import hashlib
+import pandas as pd
+import plotly
+
+
+def source_fingerprint(*paths):
+    """
+    Fingerprint the source files of the modules that build a figure.
+    
+    Args:
+        *paths: Paths of the source files that affect the figure.
+        
+    Returns:
+        str: Hex digest of the source files.
+    """
+    digest = hashlib.sha256()
+    
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+            
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Size-bounded on-disk cache of figure JSON."""
+    
+    def __init__(self, cache_dir, max_bytes=256 * 1024 * 1024):
+        """
+        Initialize the figure cache.
+        
+        Args:
+            cache_dir (str): Directory to store cached figures in.
+            max_bytes (int, optional): Maximum total size of the cache. Defaults to 256 MB.
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        
+        os.makedirs(self.cache_dir, exist_ok=True)
+        
+    def make_key(self, frame, **options):
+        """
+        Build a cache key from the input data and chart options.
+        
+        Args:
+            frame (pandas.DataFrame): Columns the figure is built from.
+            **options: Limits, grouping and other chart options.
+            
+        Returns:
+            str: Cache key.
+        """
+        digest = hashlib.sha256()
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        digest.update('|'.join(map(str, frame.columns)).encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(plotly.__version__.encode('utf-8'))
+        
+        return digest.hexdigest()
+        
+    def _path(self, key):
+        """
+        Get the file path of a cache entry.
+        
+        Args:
+            key (str): Cache key.
+            
+        Returns:
+            str: Path of the cached figure JSON.
+        """
+        return os.path.join(self.cache_dir, f'{key}.json')
+        
+    def get(self, key):
+        """
+        Get a cached figure.
+        
+        Args:
+            key (str): Cache key.
+            
+        Returns:
+            str or None: Figure JSON, or None on a miss.
+        """
+        path = self._path(key)
+        
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                fig_json = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+            
+        # Touch the entry so eviction drops the least recently used figures
+        os.utime(path)
+        self.hits += 1
+        
+        return fig_json
+        
+    def put(self, key, fig_json):
+        """
+        Store a figure in the cache.
+        
+        Args:
+            key (str): Cache key.
+            fig_json (str): Figure JSON.
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(fig_json)
+            
+        os.replace(tmp_path, path)
+        
+        self._evict()
+        
+    def _evict(self):
+        """
+        Remove the least recently used entries until the cache fits its size limit.
+        """
+        entries = []
+        
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    
+        total = sum(size for _, size, _ in entries)
+        
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+                
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+                
+            total -= size
+            
+    def summary(self):
+        """
+        Get the hit and miss counts for the run log.
+        
+        Returns:
+            str: Hit and miss counts.
+        """
+        return f"Figure cache: {self.hits} hits, {self.misses} misses ({self.cache_dir})"
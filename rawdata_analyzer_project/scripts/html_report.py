@@ -8,27 +8,230 @@ This module generates HTML reports for CP test data.
 """
 
 import os
+import re
+import json
+import hashlib
 import datetime
+import itertools
 import pandas as pd
 import numpy as np
-from jinja2 import Environment, FileSystemLoader
-import plotly.io as pio
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from asset_sync import sync_assets, PLOTLYJS_ASSET
+from chart_payload import encode_payload
+from analysis_plan import CPAnalysisPlan
+from run_timer import timed
+from run_trace import get_tracer, traced
+
+# Write buffer for streamed reports
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+# Jinja environments by template directory, so each template compiles once per process
+_template_envs = {}
+
+
+def get_template_env(template_dir):
+    """
+    Get the Jinja environment for a template directory.
+    
+    Compiled templates are also kept in an on-disk bytecode cache, so
+    repeated runs skip compilation.
+    
+    Args:
+        template_dir (str): Directory containing templates.
+        
+    Returns:
+        jinja2.Environment: Jinja environment.
+    """
+    template_dir = os.path.abspath(template_dir)
+    
+    if template_dir not in _template_envs:
+        _template_envs[template_dir] = Environment(
+            loader=FileSystemLoader(template_dir),
+            bytecode_cache=FileSystemBytecodeCache()
+        )
+        
+    return _template_envs[template_dir]
+
+
+def _json(value):
+    """
+    Encode a value as JSON that is safe inside a script element.
+    
+    Args:
+        value: Value to encode.
+        
+    Returns:
+        str: JSON text.
+    """
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).replace('</', '<\\/')
+
+
+def _cell_encoder(column, float_format=None):
+    """
+    Get the function that encodes the cells of a table column as JSON.
+    
+    Args:
+        column (pandas.Series): Table column.
+        float_format (str, optional): Format of float cells, e.g. '%.4f'.
+        
+    Returns:
+        tuple: Cell encoder and column description for the table widget.
+    """
+    description = {'title': str(column.name)}
+    
+    if pd.api.types.is_bool_dtype(column.dtype):
+        return (lambda value: 'true' if value else 'false'), description
+        
+    if pd.api.types.is_integer_dtype(column.dtype):
+        return (lambda value: 'null' if pd.isna(value) else str(int(value))), description
+        
+    if pd.api.types.is_float_dtype(column.dtype):
+        if not float_format:
+            return (lambda value: repr(float(value)) if np.isfinite(value) else 'null'), description
+            
+        match = re.fullmatch(r'%\.(\d+)f', float_format)
+        if match:
+            description['decimals'] = int(match.group(1))
+            
+        return (lambda value: float_format % value if np.isfinite(value) else 'null'), description
+        
+    return (lambda value: _json(str(value))), description
+
+
+def data_table(df, float_format=None, classes='table table-striped', chunk_rows=1000):
+    """
+    Generate a table as compact JSON for the virtualized table widget.
+    
+    The rows are written as JSON arrays inside a script element and drawn by
+    script.js, which only creates the rows that are visible, so page load time
+    does not grow with the number of groups. The JSON is produced in chunks
+    so it can be streamed into a report.
+    
+    Args:
+        df (pandas.DataFrame): Table data.
+        float_format (str, optional): Format of float cells, e.g. '%.4f'.
+        classes (str, optional): CSS classes of the table.
+        chunk_rows (int, optional): Number of rows per fragment. Defaults to 1000.
+        
+    Yields:
+        str: HTML fragments of the table.
+    """
+    encoders, columns = zip(*(_cell_encoder(df[column], float_format) for column in df.columns))
+    
+    # Rows are appended to the header object as they are encoded
+    header = _json({'classes': classes, 'columns': list(columns)})
+    yield f'<script type="application/json" class="table-data">{header[:-1]},"rows":['
+    
+    rows = df.itertuples(index=False, name=None)
+    separator = ''
+    
+    while True:
+        chunk = [
+            '[' + ','.join(encoder(value) for encoder, value in zip(encoders, row)) + ']'
+            for row in itertools.islice(rows, chunk_rows)
+        ]
+        
+        if not chunk:
+            break
+            
+        yield separator + ','.join(chunk)
+        separator = ','
+        
+    yield ']}</script>'
+
+
+def chart_div(fig_json, div_id):
+    """
+    Build the HTML div that draws a figure from its JSON.
+    
+    The page must load plotly.js itself.
+    
+    Args:
+        fig_json (str): Figure JSON.
+        div_id (str): ID of the chart div.
+        
+    Returns:
+        str: HTML div with the plotting script.
+    """
+    return (
+        f'<div><div id="{div_id}" class="plotly-graph-div"></div>\n'
+        f'<script type="text/javascript">\n'
+        f'    (function() {{\n'
+        f'        var figure = {fig_json};\n'
+        f'        Plotly.newPlot("{div_id}", figure.data, figure.layout, {{"responsive": true}});\n'
+        f'    }})();\n'
+        f'</script></div>'
+    )
+
+
+
+def write_chart_data(fig_json, div_id, output_dir, report_name):
+    """
+    Write a figure's JSON to a sidecar data file next to the report.
+    
+    The data file is a script rather than plain JSON so that it also loads
+    when the report is opened from file://. Its URL carries a digest of the
+    content, so a browser never pairs a rebuilt report with cached chart data.
+    
+    Args:
+        fig_json (str): Figure JSON.
+        div_id (str): ID of the chart div.
+        output_dir (str): Directory the report is written to.
+        report_name (str): Report file name without extension.
+        
+    Returns:
+        str: URL of the data file relative to the report, e.g.
+            charts/BVDSS1_report/chart-BVDSS1.js?v=1a2b3c4d5e6f.
+    """
+    charts_dir = os.path.join(output_dir, 'charts', report_name)
+    os.makedirs(charts_dir, exist_ok=True)
+    
+    content = f'cpChartLoaded("{div_id}", {fig_json});\n'
+    
+    with open(os.path.join(charts_dir, f'{div_id}.js'), 'w', encoding='utf-8') as f:
+        f.write(content)
+        
+    digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]
+    
+    return f'charts/{report_name}/{div_id}.js?v={digest}'
+
+
+def lazy_chart_div(div_id, data_src):
+    """
+    Build a placeholder div that script.js draws once it scrolls into view.
+    
+    Args:
+        div_id (str): ID of the chart div.
+        data_src (str): Path of the chart data file.
+        
+    Returns:
+        str: Placeholder chart div.
+    """
+    return f'<div id="{div_id}" class="plotly-graph-div lazy-chart" data-src="{data_src}"></div>'
 
 
 class CPHTMLReporter:
     """Generator for CP test HTML reports."""
     
-    def __init__(self, chart_generator=None, template_dir=None):
+    def __init__(self, chart_generator=None, template_dir=None, static_dir=None, payload='typed'):
         """
         Initialize the HTML report generator.
         
         Args:
             chart_generator (CPChartGenerator, optional): Chart generator.
             template_dir (str, optional): Directory containing templates.
+            static_dir (str, optional): Directory containing the CSS and JS files.
+            payload (str, optional): Format of the chart data files, 'typed' or
+                'compressed' (see chart_payload). Defaults to 'typed'.
         """
         self.chart_generator = chart_generator
+        self.payload = payload
+        self.timer = None  # Optional StageTimer for payload and render times
+        self.tracer = get_tracer()
+        self.asset_root = None  # Optional directory whose static folder the reports share
         self.template_dir = template_dir if template_dir else os.path.join(os.path.dirname(__file__), '../templates')
-        self.env = Environment(loader=FileSystemLoader(self.template_dir))
+        self.static_dir = static_dir if static_dir else os.path.join(os.path.dirname(__file__), '../static')
+        self.env = get_template_env(self.template_dir)
         
     def set_chart_generator(self, chart_generator):
         """
@@ -47,8 +250,123 @@ class CPHTMLReporter:
             template_dir (str): Directory containing templates.
         """
         self.template_dir = template_dir
-        self.env = Environment(loader=FileSystemLoader(template_dir))
+        self.env = get_template_env(template_dir)
+        
+    def _assets(self, output_file):
+        """
+        Get the asset URLs for a report, syncing the assets next to it.
+        
+        With an asset root the assets are synced into its static folder
+        instead, and the URLs point there relative to the report.
         
+        Args:
+            output_file (str): Output file path, or None.
+            
+        Returns:
+            dict: Asset name to page URL.
+        """
+        if not output_file:
+            # Nothing is written to disk, so reference the plain asset names
+            return {name: f'static/{name}' for name in ('css/style.css', 'js/script.js', PLOTLYJS_ASSET)}
+            
+        report_dir = os.path.dirname(os.path.abspath(output_file))
+        
+        if not self.asset_root:
+            return sync_assets(self.static_dir, report_dir)
+            
+        asset_root = os.path.abspath(self.asset_root)
+        
+        return {
+            name: os.path.relpath(os.path.join(asset_root, url), report_dir).replace(os.sep, '/')
+            for name, url in sync_assets(self.static_dir, asset_root).items()
+        }
+        
+    @traced('report.chart_data', 'div_id')
+    def _chart_html(self, chart_json, div_id, output_file):
+        """
+        Build the chart HTML, with the figure data in a sidecar file when the
+        report is written to disk. Only sidecar files use the compressed payload.
+        
+        Args:
+            chart_json (str): Figure JSON.
+            div_id (str): ID of the chart div.
+            output_file (str): Output file path, or None.
+            
+        Returns:
+            str: Chart HTML.
+        """
+        if not output_file:
+            return chart_div(chart_json, div_id)
+            
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+        report_name = os.path.splitext(os.path.basename(output_file))[0]
+        
+        chart_data = encode_payload(chart_json, self.payload)
+        
+        return lazy_chart_div(div_id, write_chart_data(chart_data, div_id, output_dir, report_name))
+        
+    def _bin_tables(self, analyzer):
+        """
+        Generate the bin summary tables.
+        
+        Args:
+            analyzer (CPDataAnalyzer): Data analyzer.
+            
+        Returns:
+            dict: HTML table fragments for the bin Pareto, wafer yield, wafer × bin
+                matrix and the summary reconciliation, None for empty tables.
+        """
+        pareto = analyzer.get_bin_pareto()
+        wafer_yield = analyzer.get_wafer_yield()
+        bin_matrix = analyzer.get_wafer_bin_matrix()
+        reconciliation = analyzer.reconcile_summary()
+        
+        return {
+            'bin_pareto_table': data_table(pareto, '%.2f') if not pareto.empty else None,
+            'wafer_yield_table': data_table(wafer_yield, '%.2f') if not wafer_yield.empty else None,
+            'bin_matrix_table': data_table(bin_matrix) if not bin_matrix.empty else None,
+            'reconciliation_table': data_table(reconciliation, '%.2f') if not reconciliation.empty else None
+        }
+        
+    @traced('report.render', 'output_file')
+    def _render(self, template, output_file, **context):
+        """
+        Render a template, streaming it into the output file when one is given.
+        
+        The page is streamed into a temporary file that replaces the output
+        file once complete, so a failed or interrupted render never leaves a
+        truncated report behind.
+        
+        Args:
+            template (jinja2.Template): Report template.
+            output_file (str): Output file path, or None.
+            **context: Template variables.
+            
+        Returns:
+            str: HTML report content, or the output file path when written to a file.
+        """
+        with timed(self.timer, 'render', os.path.basename(output_file) if output_file else None):
+            if not output_file:
+                return template.render(**context)
+                
+            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+            tmp_file = f'{output_file}.{os.getpid()}.tmp'
+            
+            try:
+                with open(tmp_file, 'w', encoding='utf-8', buffering=STREAM_BUFFER_SIZE) as f:
+                    template.stream(**context).dump(f)
+                    
+                os.replace(tmp_file, output_file)
+                
+            except BaseException:
+                if os.path.exists(tmp_file):
+                    os.remove(tmp_file)
+                    
+                raise
+                
+        return output_file
+        
+    @traced('report.parameter_report', 'parameter', 'group_by')
     def generate_parameter_report(self, parameter, limits=None, group_by='lot_number', output_file=None):
         """
         Generate an HTML report for a parameter.
@@ -60,7 +378,7 @@ class CPHTMLReporter:
             output_file (str, optional): Output file path.
             
         Returns:
-            str: HTML report content.
+            str: HTML report content, or the output file path when written to a file.
         """
         if not self.chart_generator or not self.chart_generator.analyzer:
             return ""
@@ -75,20 +393,16 @@ class CPHTMLReporter:
         template = self.env.get_template('report_template.html')
         
         # Generate chart
-        chart = self.chart_generator.generate_combined_chart(parameter, limits, group_by)
+        chart_json = self.chart_generator.get_combined_chart_json(parameter, limits, group_by)
         
         # Convert chart to HTML div
-        plot_div = pio.to_html(chart, full_html=False)
-        
+        with timed(self.timer, 'payload', parameter):
+            plot_div = self._chart_html(chart_json, f'chart-{parameter}', output_file)
+            
         # Generate statistics table
         stats = analyzer.get_parameter_stats(parameter, group_by)
         
-        stats_table = stats.to_html(
-            index=False,
-            float_format='%.4f',
-            classes='table table-striped',
-            border=0
-        )
+        stats_table = data_table(stats, '%.4f')
         
         # Generate yield data
         if limits:
@@ -99,34 +413,25 @@ class CPHTMLReporter:
                 group_by=group_by
             )
             
-            yield_table = yield_data.to_html(
-                index=False,
-                float_format='%.2f',
-                classes='table table-striped',
-                border=0
-            )
+            yield_table = data_table(yield_data, '%.2f')
         else:
-            yield_table = ""
-        
-        # Render template
-        html = template.render(
+            yield_table = None
+            
+        # Render template, streamed into the output file when one is given
+        return self._render(
+            template,
+            output_file,
             parameter=parameter,
             plot_div=plot_div,
             stats_table=stats_table,
             yield_table=yield_table,
-            timestamp=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            assets=self._assets(output_file),
+            timestamp=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **self._bin_tables(analyzer)
         )
         
-        # Save to file if output_file is provided
-        if output_file:
-            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html)
-            
-        return html
-    
-    def generate_multi_parameter_report(self, parameters, limits=None, group_by='lot_number', output_file=None):
+    @traced('report.multi_parameter_report', 'parameters', 'group_by')
+    def generate_multi_parameter_report(self, parameters, limits=None, group_by='lot_number', output_file=None, plan=None):
         """
         Generate an HTML report for multiple parameters.
         
@@ -135,9 +440,11 @@ class CPHTMLReporter:
             limits (dict, optional): Dictionary containing upper and lower limits.
             group_by (str, optional): Column to group by. Defaults to 'lot_number'.
             output_file (str, optional): Output file path.
-            
+            plan (CPAnalysisPlan, optional): Analysis plan with the statistics and
+                yield of the parameters, shared with the other writers of the run.
+                
         Returns:
-            str: HTML report content.
+            str: HTML report content, or the output file path when written to a file.
         """
         if not self.chart_generator or not self.chart_generator.analyzer:
             return ""
@@ -154,6 +461,10 @@ class CPHTMLReporter:
         # Get template
         template = self.env.get_template('multi_parameter_template.html')
         
+        # Compute the statistics and yield of all parameters in one pass
+        if plan is None:
+            plan = CPAnalysisPlan(analyzer, parameters, limits, group_by)
+            
         # Generate charts and statistics
         charts = {}
         stats_tables = {}
@@ -161,56 +472,37 @@ class CPHTMLReporter:
         
         for param in parameters:
             # Generate chart
-            chart = self.chart_generator.generate_combined_chart(param, limits.get(param) if limits else None, group_by)
+            chart_json = self.chart_generator.get_combined_chart_json(param, limits.get(param) if limits else None, group_by)
             
             # Convert chart to HTML div
-            charts[param] = pio.to_html(chart, full_html=False)
-            
+            with timed(self.timer, 'payload', param):
+                charts[param] = self._chart_html(chart_json, f'chart-{param}', output_file)
+                
             # Generate statistics table
-            stats = analyzer.get_parameter_stats(param, group_by)
+            stats = plan.get_parameter_stats(param)
             
-            stats_tables[param] = stats.to_html(
-                index=False,
-                float_format='%.4f',
-                classes='table table-striped',
-                border=0
-            )
+            stats_tables[param] = data_table(stats, '%.4f')
             
             # Generate yield data
             if limits and param in limits:
-                yield_data = analyzer.calculate_yield(
-                    param,
-                    lower=limits[param].get('lower'),
-                    upper=limits[param].get('upper'),
-                    group_by=group_by
-                )
+                yield_data = plan.calculate_yield(param)
                 
-                yield_tables[param] = yield_data.to_html(
-                    index=False,
-                    float_format='%.2f',
-                    classes='table table-striped',
-                    border=0
-                )
+                yield_tables[param] = data_table(yield_data, '%.2f')
             else:
-                yield_tables[param] = ""
-        
-        # Render template
-        html = template.render(
+                yield_tables[param] = None
+                
+        # Render template, streamed into the output file when one is given
+        return self._render(
+            template,
+            output_file,
             parameters=parameters,
             charts=charts,
             stats_tables=stats_tables,
             yield_tables=yield_tables,
-            timestamp=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            assets=self._assets(output_file),
+            timestamp=datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            **self._bin_tables(analyzer)
         )
-        
-        # Save to file if output_file is provided
-        if output_file:
-            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(html)
-            
-        return html
 
 
 if __name__ == "__main__":
@@ -13,6 +13,31 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 
+from run_timer import timed
+from run_trace import get_tracer, traced
+
+# Die index and bin columns that precede the test parameters in a log
+DIE_COLUMNS = ['No.U', 'X', 'Y', 'Bin']
+
+
+def _frame_attributes(data_df):
+    """
+    Get the span attributes of parsed log data.
+    
+    Args:
+        data_df (pandas.DataFrame): Parsed data.
+        
+    Returns:
+        dict: Row count, and the lot and wafer of a single log.
+    """
+    attributes = {'rows': len(data_df)}
+    
+    for key in ['lot_number', 'wafer_number']:
+        if key in data_df.columns and data_df[key].nunique() == 1:
+            attributes[key] = data_df[key].iloc[0]
+            
+    return attributes
+
 
 class CPLogParser:
     """Parser for CP test log files."""
@@ -26,6 +51,8 @@ class CPLogParser:
         """
         self.log_dir = log_dir if log_dir else './data/data2/rawdata'
         self.parameter_limits = {}  # Dictionary to store parameter limits
+        self.timer = None  # Optional StageTimer for per-file parse times
+        self.tracer = get_tracer()
         
     def set_log_dir(self, log_dir):
         """
@@ -56,6 +83,7 @@ class CPLogParser:
                 
         return log_files
         
+    @traced('parser.parse_file', 'file_path', result=_frame_attributes)
     def parse_log_file(self, file_path):
         """
         Parse a CP test log file.
@@ -89,6 +117,7 @@ class CPLogParser:
             print(f"Error parsing {file_path}: {str(e)}")
             return pd.DataFrame()
             
+    @traced('parser.parse_logs', result=_frame_attributes)
     def parse_all_logs(self):
         """
         Parse all CP test log files in the specified directory.
@@ -96,8 +125,9 @@ class CPLogParser:
         Returns:
             pandas.DataFrame: Combined data from all log files.
         """
-        log_files = self.get_log_files()
-        
+        with timed(self.timer, 'discover'):
+            log_files = self.get_log_files()
+            
         if not log_files:
             print(f"No log files found in {self.log_dir}")
             return pd.DataFrame()
@@ -105,8 +135,9 @@ class CPLogParser:
         all_data = []
         
         for file_path in log_files:
-            data_df = self.parse_log_file(file_path)
-            
+            with timed(self.timer, 'parse_file', os.path.basename(file_path)):
+                data_df = self.parse_log_file(file_path)
+                
             if not data_df.empty:
                 all_data.append(data_df)
                 
@@ -145,7 +176,7 @@ class CPLogParser:
                 
                 if match:
                     header_info[key] = match.group(1).strip()
-        
+                    
         return header_info
         
     def _extract_parameter_data(self, lines):
@@ -206,18 +237,22 @@ class CPLogParser:
                 
             parts = line.split('\t')
             
-            if len(parts) >= len(param_names) and parts[0].isdigit():
-                data_lines.append(parts)
-            else:
+            if not parts[0].isdigit():
                 # Stop when we reach a non-data line
                 break
                 
+            # Failing dies stop testing early and leave trailing fields empty
+            if len(parts) < len(param_names):
+                parts.extend([''] * (len(param_names) - len(parts)))
+                
+            data_lines.append(parts[:len(param_names)])
+            
         # Create DataFrame
         df = pd.DataFrame(data_lines, columns=param_names)
         
         # Convert numeric columns to appropriate types
         for col in df.columns:
-            if col in ['No.U', 'X', 'Y', 'Bin']:
+            if col in DIE_COLUMNS:
                 df[col] = pd.to_numeric(df[col], errors='coerce')
             else:
                 # Handle scientific notation (e.g., 1.20E-08)
@@ -286,7 +321,7 @@ class CPLogParser:
                 
             # Check if there's a secondary unit (e.g., "mOHM" would have "m" as group 2 and "OHM" as group 3)
             # We just apply the first unit multiplier
-                
+            
             return value
             
         # Handle special notations like "-" (meaning zero or infinity)
@@ -295,6 +330,15 @@ class CPLogParser:
             
         return None
         
+    def get_parameters(self):
+        """
+        Get the names of the test parameters found in the parsed logs.
+        
+        Returns:
+            list: Parameter names in log column order.
+        """
+        return [param for param in self.parameter_limits if param not in DIE_COLUMNS]
+        
     def get_limits(self, parameter):
         """
         Get the upper and lower limits for a parameter.
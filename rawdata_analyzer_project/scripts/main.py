@@ -5,18 +5,57 @@
 CP Test Analyzer - Main Application
 --------------------------
 Main entry point for the CP Test Analyzer application.
+
+Only the standard library and the light option modules are imported at
+startup. pandas is imported with the analysis modules when a run starts,
+and plotly, jinja2, xlsxwriter and pyarrow only by the formats that use
+them, so --help and CSV runs do not load the plotting stack.
+startup_benchmark.py checks this.
+
+"main.py serve -i DIR [DIR ...]" runs the report server instead, see
+report_server.py, and "main.py batch -r ROOT" analyzes every lot under a
+root, see batch_runner.py.
 """
 
 import os
 import sys
 import argparse
-import pandas as pd
-from pathlib import Path
 
-from log_parser import CPLogParser
-from data_analyzer import CPDataAnalyzer
-from chart_generator import CPChartGenerator
-from html_report import CPHTMLReporter
+from run_manifest import RunManifest, code_fingerprint, make_signature
+from chart_payload import PAYLOAD_FORMATS
+from columnar_export import COLUMNAR_FORMATS, export_columnar
+from run_timer import StageTimer, timed
+from run_trace import start_trace, get_tracer, span
+
+# cProfile statistics written to the output directory by --profile
+PROFILE_FILE = 'profile.pstats'
+
+# Default trace file in the output directory for --trace
+TRACE_FILE = 'trace.json'
+
+
+def _positive_int(value):
+    """
+    Parse a command-line count that must be at least 1.
+    
+    Args:
+        value (str): Argument value.
+        
+    Returns:
+        int: Parsed count.
+        
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive integer.
+    """
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+        
+    if count < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {count}")
+        
+    return count
 
 
 def parse_arguments():
@@ -33,66 +72,191 @@ def parse_arguments():
                         help='Input directory containing CP test log files')
     parser.add_argument('-o', '--output', dest='output_dir', default='./output',
                         help='Output directory for generated reports')
-    
+                        
     # Parameter selection
     parser.add_argument('-p', '--param', dest='parameter', default='BVDSS1',
                         help='Parameter to analyze (default: BVDSS1)')
     parser.add_argument('--params', dest='parameters', nargs='+',
-                        help='Multiple parameters to analyze')
-    
+                        help='Multiple parameters to analyze, or "all" for every parameter in the logs')
+                        
     # Grouping option
     parser.add_argument('-g', '--group', dest='group_by', default='lot_number',
-                        help='Column to group by (default: lot_number)')
-    
+                        help='Column to group by (default: lot_number). Use zone, ring or sector for radial wafer zones')
+    parser.add_argument('--rings', dest='n_rings', type=_positive_int, default=3,
+                        help='Number of concentric wafer zones (default: 3, center/middle/edge)')
+    parser.add_argument('--sectors', dest='n_sectors', type=_positive_int, default=1,
+                        help='Number of angular wafer sectors per ring (default: 1)')
+                        
     # Limits
     parser.add_argument('--lower', dest='lower_limit', type=float,
                         help='Lower limit for parameter')
     parser.add_argument('--upper', dest='upper_limit', type=float,
                         help='Upper limit for parameter')
-    
+                        
+    # Fab summary
+    parser.add_argument('--summary', dest='summary_dir',
+                        help='Directory with fab summary CSV files (default: sibling summary directory of the input)')
+                        
     # Output format
-    parser.add_argument('-f', '--format', dest='output_format', default='html',
-                        choices=['html', 'csv', 'excel'],
-                        help='Output format (default: html)')
-    
+    parser.add_argument('-f', '--format', dest='output_formats', nargs='+', default=['html'],
+                        choices=['html', 'csv', 'excel'] + list(COLUMNAR_FORMATS),
+                        help='Output formats, several may be given (default: html). parquet, feather '
+                             'and arrow write the raw die, statistics and yield tables for notebooks')
+    parser.add_argument('--payload', default='typed', choices=PAYLOAD_FORMATS,
+                        help='Format of the HTML chart data files: typed arrays, or float32 arrays '
+                             'packed and deflate-compressed (default: typed)')
+    parser.add_argument('--webgl-threshold', dest='webgl_threshold', type=int, default=200000,
+                        help='Die count above which scatter plots are downsampled and drawn with WebGL (default: 200000)')
+    parser.add_argument('--points-per-group', dest='points_per_group', type=int, default=5000,
+                        help='Scatter points drawn per group above the WebGL threshold; out-of-limit and '
+                             'outlier dies are always kept (default: 5000)')
+    parser.add_argument('--static-root', dest='static_root',
+                        help='Directory whose static folder holds the CSS/JS assets of the HTML reports, '
+                             'shared by several output directories (default: the output directory)')
+                             
+    # Figure cache
+    parser.add_argument('--cache-dir', dest='cache_dir',
+                        help='Directory for cached chart figures (default: <output>/.figure_cache)')
+    parser.add_argument('--cache-size', dest='cache_size', type=int, default=256,
+                        help='Maximum figure cache size in MB (default: 256)')
+    parser.add_argument('--no-cache', dest='no_cache', action='store_true',
+                        help='Do not use the figure cache')
+                        
+    # Incremental rebuild
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild outputs even if their inputs, options and code are unchanged')
+                        
+    # Diagnostics
+    parser.add_argument('--timings', action='store_true',
+                        help='Write wall time, CPU time and peak memory of each stage, with the slowest '
+                             'files and parameters, to timings.json and timings.csv in the output directory')
+    parser.add_argument('--profile', action='store_true',
+                        help=f'Write cProfile statistics of the whole run to {PROFILE_FILE} in the output directory')
+    parser.add_argument('--trace', nargs='?', const='', metavar='FILE',
+                        help=f'Write a Chrome trace of the run, viewable in chrome://tracing or Perfetto, '
+                             f'to FILE (default: {TRACE_FILE} in the output directory)')
+                             
     # Other options
     parser.add_argument('--no-charts', dest='no_charts', action='store_true',
                         help='Do not generate charts')
     parser.add_argument('--debug', action='store_true',
                         help='Enable debug output')
-    
+                        
     return parser.parse_args()
 
 
-def main():
+def run(args, timer=None):
     """
-    Main entry point for the application.
+    Analyze the logs and write the requested outputs.
+    
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+        timer (StageTimer, optional): Timer for the stages of the run.
+        
+    Returns:
+        int: Exit code.
     """
-    args = parse_arguments()
+    from log_parser import CPLogParser
+    from data_analyzer import CPDataAnalyzer
+    from summary_loader import CPSummaryLoader
+    from analysis_plan import CPAnalysisPlan
     
     # Create output directory if it doesn't exist
     os.makedirs(args.output_dir, exist_ok=True)
     
     # Initialize parser
     parser = CPLogParser(args.input_dir)
+    parser.timer = timer
     
     # Set limits if provided
     if args.lower_limit is not None or args.upper_limit is not None:
         parser.set_limits(args.parameter, args.lower_limit, args.upper_limit)
+        
+    summary_dir = args.summary_dir or os.path.join(os.path.dirname(os.path.abspath(args.input_dir)), 'summary')
+    
+    # Skip the run when its outputs were built from the same inputs, options and code
+    parameters = args.parameters or [args.parameter]
+    output_name = f"{'+'.join(args.output_formats)}:{','.join(parameters)}"
     
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    manifest = RunManifest(args.output_dir)
+    
+    signature = make_signature(
+        inputs=manifest.fingerprint_inputs(parser.get_log_files() + CPSummaryLoader(summary_dir).get_summary_files()),
+        parameters=parameters,
+        multi=bool(args.parameters),
+        group_by=args.group_by,
+        n_rings=args.n_rings,
+        n_sectors=args.n_sectors,
+        lower_limit=args.lower_limit,
+        upper_limit=args.upper_limit,
+        no_charts=args.no_charts,
+        payload=args.payload,
+        webgl_threshold=args.webgl_threshold,
+        points_per_group=args.points_per_group,
+        static_root=os.path.abspath(args.static_root) if args.static_root else None,
+        code=code_fingerprint(
+            scripts_dir,
+            os.path.join(scripts_dir, '../templates'),
+            os.path.join(scripts_dir, '../static/css'),
+            os.path.join(scripts_dir, '../static/js')
+        )
+    )
+    
+    if not args.force and manifest.is_current(output_name, signature):
+        print(f"Outputs for {output_name} are up to date in {args.output_dir} (use --force to rebuild)")
+        return 0
+        
     # Parse log files
     print(f"Parsing log files from {args.input_dir}...")
-    df = parser.parse_all_logs()
-    
+    with timed(timer, 'parse'):
+        df = parser.parse_all_logs()
+        
     if df.empty:
         print(f"No data found in {args.input_dir}")
         return 1
-    
+        
     print(f"Found data for {len(df)} test runs.")
     
-    # Initialize analyzer and chart generator
+    # Initialize analyzer
     analyzer = CPDataAnalyzer(df)
-    chart_gen = CPChartGenerator(analyzer)
+    
+    # Only HTML reports need the chart generator and its plotting imports
+    chart_gen = None
+    
+    if 'html' in args.output_formats:
+        from chart_generator import CPChartGenerator
+        from html_report import CPHTMLReporter
+        from figure_cache import FigureCache
+        
+        chart_gen = CPChartGenerator(analyzer, args.webgl_threshold, args.points_per_group)
+        chart_gen.timer = timer
+        
+        if not args.no_cache:
+            cache_dir = args.cache_dir or os.path.join(args.output_dir, '.figure_cache')
+            chart_gen.cache = FigureCache(cache_dir, args.cache_size * 1024 * 1024)
+            
+    # Load the fab summary once and reconcile it with the raw data yield
+    if os.path.isdir(summary_dir):
+        summary = CPSummaryLoader(summary_dir).load_all()
+        analyzer.set_summary(summary)
+        
+        reconciliation = analyzer.reconcile_summary()
+        
+        if not reconciliation.empty:
+            reconciliation_file = os.path.join(args.output_dir, "yield_reconciliation.csv")
+            reconciliation.to_csv(reconciliation_file, index=False)
+            
+            mismatches = (reconciliation['status'] != 'ok').sum()
+            print(f"Reconciled {len(reconciliation)} wafers with {summary_dir}: {mismatches} mismatches")
+            
+    # Zone grouping needs the per-die zone index
+    if args.group_by in ('zone', 'ring', 'sector'):
+        analyzer.add_zone_index(args.n_rings, args.n_sectors)
+        
+    # Files written for the run manifest, and outputs that could not be written
+    outputs = []
+    failed = []
     
     # Process single parameter
     if not args.parameters:
@@ -101,14 +265,15 @@ def main():
         
         print(f"Analyzing parameter: {parameter}")
         
-        # Generate statistics
-        stats = analyzer.get_parameter_stats(parameter, args.group_by)
-        
-        # Calculate yield
-        yield_data = analyzer.calculate_yield(parameter, limits['lower'], limits['upper'], args.group_by)
-        
-        # Output results based on format
-        if args.output_format == 'csv':
+        with timed(timer, 'analysis', parameter):
+            # Generate statistics
+            stats = analyzer.get_parameter_stats(parameter, args.group_by)
+            
+            # Calculate yield
+            yield_data = analyzer.calculate_yield(parameter, limits['lower'], limits['upper'], args.group_by)
+            
+        # Output results in each requested format
+        if 'csv' in args.output_formats:
             # Save statistics to CSV
             stats_file = os.path.join(args.output_dir, f"{parameter}_stats.csv")
             stats.to_csv(stats_file, index=False)
@@ -117,101 +282,205 @@ def main():
             yield_file = os.path.join(args.output_dir, f"{parameter}_yield.csv")
             yield_data.to_csv(yield_file, index=False)
             
+            outputs += [stats_file, yield_file]
             print(f"Results saved to {stats_file} and {yield_file}")
             
-        elif args.output_format == 'excel':
+        if 'excel' in args.output_formats:
+            from excel_export import write_excel, split_data_sheets
+            
             # Save to Excel
             excel_file = os.path.join(args.output_dir, f"{parameter}_analysis.xlsx")
             
-            with pd.ExcelWriter(excel_file) as writer:
-                stats.to_excel(writer, sheet_name='Statistics', index=False)
-                yield_data.to_excel(writer, sheet_name='Yield', index=False)
-                df.to_excel(writer, sheet_name='Raw Data', index=False)
-            
-            print(f"Results saved to {excel_file}")
+            sheets = [('Statistics', stats), ('Yield', yield_data)] + split_data_sheets(df)
             
-        elif args.output_format == 'html':
+            if write_excel(excel_file, sheets):
+                outputs.append(excel_file)
+                print(f"Results saved to {excel_file}")
+            else:
+                failed.append('excel')
+                
+        for output_format in COLUMNAR_FORMATS:
+            if output_format in args.output_formats:
+                # Save the raw, statistics and yield tables in a columnar format
+                files = export_columnar(args.output_dir, output_format, df, {parameter: stats}, {parameter: yield_data})
+                
+                if files:
+                    outputs += files
+                    print(f"Results saved to {', '.join(files)}")
+                else:
+                    failed.append(output_format)
+                    
+        if 'html' in args.output_formats:
             # Generate HTML report
-            reporter = CPHTMLReporter(chart_gen)
+            reporter = CPHTMLReporter(chart_gen, payload=args.payload)
+            reporter.timer = timer
+            reporter.asset_root = args.static_root
             
             report_file = os.path.join(args.output_dir, f"{parameter}_report.html")
             html = reporter.generate_parameter_report(parameter, limits, args.group_by, report_file)
             
+            outputs += [report_file, os.path.join(args.output_dir, 'charts', f"{parameter}_report", f"chart-{parameter}.js")]
             print(f"Report generated at {report_file}")
             
+        limits = {parameter: limits}
+        
     # Process multiple parameters
     else:
-        parameters = args.parameters
-        
+        # Expand "all" to every parameter found in the logs
+        if [p.lower() for p in args.parameters] == ['all']:
+            parameters = [param for param in parser.get_parameters() if param in df.columns]
+        else:
+            parameters = args.parameters
+            
         # Get limits for each parameter
         limits = {}
         for param in parameters:
             limits[param] = parser.get_limits(param)
-        
+            
         print(f"Analyzing parameters: {', '.join(parameters)}")
         
-        # Output results based on format
-        if args.output_format == 'csv':
-            for param in parameters:
-                # Generate statistics
-                stats = analyzer.get_parameter_stats(param, args.group_by)
-                
-                # Calculate yield
-                yield_data = analyzer.calculate_yield(
-                    param,
-                    limits[param]['lower'],
-                    limits[param]['upper'],
-                    args.group_by
-                )
-                
+        # Compute the statistics and yield of every parameter once for all formats
+        with timed(timer, 'analysis'):
+            plan = CPAnalysisPlan(analyzer, parameters, limits, args.group_by).compute()
+            
+        # Output results in each requested format
+        if 'csv' in args.output_formats:
+            for param in plan.parameters:
                 # Save statistics to CSV
                 stats_file = os.path.join(args.output_dir, f"{param}_stats.csv")
-                stats.to_csv(stats_file, index=False)
+                plan.get_parameter_stats(param).to_csv(stats_file, index=False)
                 
                 # Save yield data to CSV
                 yield_file = os.path.join(args.output_dir, f"{param}_yield.csv")
-                yield_data.to_csv(yield_file, index=False)
-            
+                plan.calculate_yield(param).to_csv(yield_file, index=False)
+                
+                outputs += [stats_file, yield_file]
+                
             print(f"Results saved to {args.output_dir}")
             
-        elif args.output_format == 'excel':
+        if 'excel' in args.output_formats:
+            from excel_export import write_excel, split_data_sheets
+            
             # Save to Excel
             excel_file = os.path.join(args.output_dir, "cp_test_analysis.xlsx")
             
-            with pd.ExcelWriter(excel_file) as writer:
-                # Add raw data sheet
-                df.to_excel(writer, sheet_name='Raw Data', index=False)
+            # Raw data sheets, then the statistics and yield sheets of each parameter
+            sheets = split_data_sheets(df)
+            
+            for param in plan.parameters:
+                sheets.append((f'{param} Stats', plan.get_parameter_stats(param)))
+                sheets.append((f'{param} Yield', plan.calculate_yield(param)))
                 
-                # Add sheets for each parameter
-                for param in parameters:
-                    # Generate statistics
-                    stats = analyzer.get_parameter_stats(param, args.group_by)
-                    
-                    # Calculate yield
-                    yield_data = analyzer.calculate_yield(
-                        param,
-                        limits[param]['lower'],
-                        limits[param]['upper'],
-                        args.group_by
-                    )
+            if write_excel(excel_file, sheets):
+                outputs.append(excel_file)
+                print(f"Results saved to {excel_file}")
+            else:
+                failed.append('excel')
+                
+        for output_format in COLUMNAR_FORMATS:
+            if output_format in args.output_formats:
+                # Save the raw, statistics and yield tables in a columnar format
+                files = export_columnar(
+                    args.output_dir,
+                    output_format,
+                    df,
+                    {param: plan.get_parameter_stats(param) for param in plan.parameters},
+                    {param: plan.calculate_yield(param) for param in plan.parameters}
+                )
+                
+                if files:
+                    outputs += files
+                    print(f"Results saved to {', '.join(files)}")
+                else:
+                    failed.append(output_format)
                     
-                    # Save to sheets
-                    stats.to_excel(writer, sheet_name=f'{param} Stats', index=False)
-                    yield_data.to_excel(writer, sheet_name=f'{param} Yield', index=False)
-            
-            print(f"Results saved to {excel_file}")
-            
-        elif args.output_format == 'html':
+        if 'html' in args.output_formats:
             # Generate HTML report
-            reporter = CPHTMLReporter(chart_gen)
+            reporter = CPHTMLReporter(chart_gen, payload=args.payload)
+            reporter.timer = timer
+            reporter.asset_root = args.static_root
             
             report_file = os.path.join(args.output_dir, "multi_parameter_report.html")
-            html = reporter.generate_multi_parameter_report(parameters, limits, args.group_by, report_file)
+            html = reporter.generate_multi_parameter_report(parameters, limits, args.group_by, report_file, plan)
             
+            outputs.append(report_file)
+            outputs += [
+                os.path.join(args.output_dir, 'charts', 'multi_parameter_report', f"chart-{param}.js")
+                for param in plan.parameters
+            ]
             print(f"Report generated at {report_file}")
+            
+    # Leave the run unrecorded, so the next run writes the missing outputs again
+    if failed:
+        print(f"Could not write the {', '.join(failed)} output")
+        return 1
+        
+    manifest.record(
+        output_name,
+        signature,
+        [os.path.relpath(path, args.output_dir) for path in outputs],
+        parameters=parameters,
+        limits=limits
+    )
+    manifest.save()
     
+    if chart_gen is not None and chart_gen.cache is not None:
+        print(chart_gen.cache.summary())
+        
     return 0
 
 
+def main():
+    """
+    Main entry point for the application.
+    """
+    # Serve mode keeps the lots in memory and renders reports over HTTP
+    if sys.argv[1:2] == ['serve']:
+        from report_server import main as serve
+        return serve(sys.argv[2:])
+        
+    # Batch mode runs this entry point once per lot under a root directory
+    if sys.argv[1:2] == ['batch']:
+        from batch_runner import main as batch
+        return batch(sys.argv[2:])
+        
+    args = parse_arguments()
+    
+    timer = StageTimer() if args.timings else None
+    
+    if args.trace is not None:
+        start_trace(args.trace or os.path.join(args.output_dir, TRACE_FILE))
+        
+    profiler = None
+    
+    if args.profile:
+        import cProfile
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        
+    try:
+        with timed(timer, 'total'), span(get_tracer(), 'main.run', input_dir=args.input_dir):
+            return run(args, timer)
+    finally:
+        if profiler is not None:
+            import pstats
+            
+            profiler.disable()
+            
+            profile_file = os.path.join(args.output_dir, PROFILE_FILE)
+            profiler.dump_stats(profile_file)
+            
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(20)
+            print(f"Profile saved to {profile_file} (inspect with python -m pstats)")
+            
+        if timer is not None:
+            print(f"Stage timings:\n{timer.summary()}")
+            print(f"Timings saved to {timer.save(args.output_dir)}")
+            
+        if get_tracer() is not None:
+            print(f"Trace saved to {get_tracer().save()}")
+
+
 if __name__ == "__main__":
     sys.exit(main())
@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Report Server
+-------------------
+This module serves CP test reports for one or more lot directories over a
+local HTTP port, started with "main.py serve -i DIR [DIR ...]".
+
+Each lot directory is parsed once and its die table, analyzer and chart
+generator stay in memory. Reports are rendered on demand for the requested
+parameter, grouping and limits, and the rendered pages are kept in a
+bounded cache per lot, so changing a limit costs one analysis and one
+chart instead of a full CLI run. Before each request the log and summary
+files of the lot are checked by size and modification time; when they
+changed the lot is parsed again and its cached pages are dropped.
+
+URLs:
+    /                   Lots and their parameters, with a report form.
+    /<lot>/report       Report, with the query arguments parameter and the
+                        optional group_by, lower, upper, rings and sectors.
+    /<lot>/static/...   CSS and JS assets referenced by the reports.
+"""
+
+import os
+import sys
+import html
+import time
+import argparse
+import threading
+import mimetypes
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, quote, unquote
+
+from plotly.offline import get_plotlyjs
+
+from log_parser import CPLogParser
+from data_analyzer import CPDataAnalyzer
+from summary_loader import CPSummaryLoader
+from chart_generator import CPChartGenerator
+from html_report import CPHTMLReporter
+from asset_sync import PLOTLYJS_ASSET
+
+# Groupings offered by the index page form
+GROUP_BY_CHOICES = ('lot_number', 'wafer_number', 'zone', 'ring', 'sector')
+
+
+def _file_state(paths):
+    """
+    Get the size and modification time of files.
+    
+    Args:
+        paths (list): File paths.
+        
+    Returns:
+        tuple: (path, size, mtime_ns) of each file that exists, sorted by path.
+    """
+    state = []
+    
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+            
+        state.append((path, stat.st_size, stat.st_mtime_ns))
+        
+    return tuple(state)
+
+
+def _float_argument(query, name):
+    """
+    Get an optional number from the query arguments of a request.
+    
+    Args:
+        query (dict): Parsed query arguments.
+        name (str): Argument name.
+        
+    Returns:
+        float or None: Argument value, None when missing or empty.
+        
+    Raises:
+        ValueError: If the argument is not a number.
+    """
+    value = query.get(name, [''])[0].strip()
+    
+    return float(value) if value else None
+
+
+class LotSession:
+    """Parsed data and rendered reports of one lot directory."""
+    
+    def __init__(self, name, lot_dir, max_pages=64):
+        """
+        Initialize the lot session.
+        
+        Args:
+            name (str): Lot name used in URLs.
+            lot_dir (str): Directory containing the CP test log files.
+            max_pages (int, optional): Rendered pages kept in the cache. Defaults to 64.
+        """
+        self.name = name
+        self.lot_dir = os.path.abspath(lot_dir)
+        self.summary_dir = os.path.join(os.path.dirname(self.lot_dir), 'summary')
+        self.max_pages = max_pages
+        self.lock = threading.Lock()
+        self.state = None
+        self.parser = None
+        self.analyzer = None
+        self.reporter = None
+        self.parameters = []
+        self.pages = OrderedDict()
+        
+    def _current_state(self):
+        """
+        Get the state of the log and summary files of the lot.
+        
+        Returns:
+            tuple: File sizes and modification times.
+        """
+        parser = self.parser or CPLogParser(self.lot_dir)
+        
+        return _file_state(parser.get_log_files() + CPSummaryLoader(self.summary_dir).get_summary_files())
+        
+    def refresh(self):
+        """
+        Parse the lot again when its files changed since it was loaded.
+        
+        Must be called with the lock held.
+        
+        Returns:
+            bool: Whether the lot was parsed.
+        """
+        state = self._current_state()
+        
+        if state == self.state:
+            return False
+            
+        start = time.perf_counter()
+        
+        parser = CPLogParser(self.lot_dir)
+        df = parser.parse_all_logs()
+        
+        analyzer = CPDataAnalyzer(df)
+        
+        if os.path.isdir(self.summary_dir):
+            analyzer.set_summary(CPSummaryLoader(self.summary_dir).load_all())
+            
+        # Pages are cached in memory, so the chart generator needs no figure cache
+        self.parser = parser
+        self.analyzer = analyzer
+        self.reporter = CPHTMLReporter(CPChartGenerator(analyzer))
+        self.parameters = [param for param in parser.get_parameters() if param in df.columns]
+        self.pages.clear()
+        self.state = state
+        
+        print(f"Loaded {self.name}: {len(df)} dies from {self.lot_dir} in {time.perf_counter() - start:.2f} s")
+        
+        return True
+        
+    def get_report(self, parameter, group_by='lot_number', lower=None, upper=None, n_rings=3, n_sectors=1):
+        """
+        Get the report of a parameter, rendering it when it is not cached.
+        
+        Args:
+            parameter (str): Parameter name.
+            group_by (str, optional): Column to group by. Defaults to 'lot_number'.
+            lower (float, optional): Lower limit, overriding the limit in the logs.
+            upper (float, optional): Upper limit, overriding the limit in the logs.
+            n_rings (int, optional): Number of wafer zone rings. Defaults to 3.
+            n_sectors (int, optional): Number of wafer zone sectors. Defaults to 1.
+            
+        Returns:
+            str or None: HTML report, or None if the parameter or grouping is unknown.
+        """
+        with self.lock:
+            self.refresh()
+            
+            if parameter not in self.parameters:
+                return None
+                
+            key = (parameter, group_by, lower, upper, n_rings, n_sectors)
+            
+            if key in self.pages:
+                self.pages.move_to_end(key)
+                return self.pages[key]
+                
+            start = time.perf_counter()
+            
+            # Zone grouping needs the per-die zone index
+            if group_by in ('zone', 'ring', 'sector'):
+                self.analyzer.add_zone_index(n_rings, n_sectors)
+                
+            if group_by not in self.analyzer.data.columns:
+                return None
+                
+            limits = dict(self.parser.get_limits(parameter))
+            
+            if lower is not None:
+                limits['lower'] = lower
+                
+            if upper is not None:
+                limits['upper'] = upper
+                
+            page = self.reporter.generate_parameter_report(parameter, limits, group_by)
+            
+            self.pages[key] = page
+            
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+                
+            print(f"Rendered {self.name} {parameter} by {group_by} in {(time.perf_counter() - start) * 1000:.0f} ms")
+            
+            return page
+
+
+class CPReportServer(ThreadingHTTPServer):
+    """HTTP server for the reports of resident lot directories."""
+    
+    daemon_threads = True
+    
+    def __init__(self, lot_dirs, host='127.0.0.1', port=8050, max_pages=64, static_dir=None):
+        """
+        Initialize the report server and parse the lot directories.
+        
+        Args:
+            lot_dirs (list): Directories containing CP test log files.
+            host (str, optional): Address to listen on. Defaults to '127.0.0.1'.
+            port (int, optional): Port to listen on. Defaults to 8050.
+            max_pages (int, optional): Rendered pages cached per lot. Defaults to 64.
+            static_dir (str, optional): Directory containing the CSS and JS files.
+        """
+        super().__init__((host, port), ReportRequestHandler)
+        
+        self.static_dir = static_dir if static_dir else os.path.join(os.path.dirname(__file__), '../static')
+        self.plotlyjs = None
+        self.lots = OrderedDict()
+        
+        for lot_dir in lot_dirs:
+            lot_dir = os.path.abspath(lot_dir)
+            name = os.path.basename(lot_dir)
+            
+            # Lot directories are often all named rawdata, so name them by their parent
+            if name in self.lots or name == 'rawdata':
+                name = f"{os.path.basename(os.path.dirname(lot_dir))}-{name}"
+                
+            session = LotSession(name, lot_dir, max_pages)
+            
+            with session.lock:
+                session.refresh()
+                
+            self.lots[name] = session
+            
+    def get_asset(self, name):
+        """
+        Get a report asset.
+        
+        Args:
+            name (str): Asset name, e.g. 'css/style.css'.
+            
+        Returns:
+            bytes or None: Asset content, or None if there is no such asset.
+        """
+        if name == PLOTLYJS_ASSET:
+            if self.plotlyjs is None:
+                self.plotlyjs = get_plotlyjs().encode('utf-8')
+                
+            return self.plotlyjs
+            
+        static_dir = os.path.abspath(self.static_dir)
+        path = os.path.abspath(os.path.join(static_dir, name))
+        
+        if not path.startswith(static_dir + os.sep) or not os.path.isfile(path):
+            return None
+            
+        with open(path, 'rb') as f:
+            return f.read()
+            
+    def index_page(self):
+        """
+        Build the index page listing the lots and their parameters.
+        
+        Returns:
+            str: HTML page.
+        """
+        sections = []
+        group_options = ''.join(f'<option>{group_by}</option>' for group_by in GROUP_BY_CHOICES)
+        
+        for name, session in self.lots.items():
+            with session.lock:
+                session.refresh()
+                parameters = list(session.parameters)
+                
+            lot = html.escape(quote(name))
+            links = ' '.join(
+                f'<a href="{lot}/report?parameter={html.escape(quote(param))}">{html.escape(param)}</a>'
+                for param in parameters
+            )
+            param_options = ''.join(f'<option>{html.escape(param)}</option>' for param in parameters)
+            
+            sections.append(
+                f'<h2>{html.escape(name)}</h2>\n'
+                f'<p>{html.escape(session.lot_dir)}</p>\n'
+                f'<p>{links}</p>\n'
+                f'<form action="{lot}/report">\n'
+                f'    <select name="parameter">{param_options}</select>\n'
+                f'    <select name="group_by">{group_options}</select>\n'
+                f'    <input name="lower" placeholder="lower limit" size="10">\n'
+                f'    <input name="upper" placeholder="upper limit" size="10">\n'
+                f'    <button class="btn">Report</button>\n'
+                f'</form>'
+            )
+            
+        return (
+            '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="UTF-8">\n'
+            '<title>CP Test Reports</title>\n'
+            '<link rel="stylesheet" href="static/css/style.css">\n</head>\n'
+            '<body>\n<div class="container">\n<h1>CP Test Reports</h1>\n'
+            + '\n'.join(sections) +
+            '\n</div>\n</body>\n</html>\n'
+        )
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """Request handler of the report server."""
+    
+    def _send(self, status, body, content_type='text/html; charset=utf-8'):
+        """
+        Send a response.
+        
+        Args:
+            status (int): HTTP status code.
+            body (str or bytes): Response body.
+            content_type (str, optional): Content type. Defaults to HTML.
+        """
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+            
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+        
+    def do_GET(self):
+        """
+        Serve the index page, a report or an asset.
+        """
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.split('/') if part]
+        
+        if not parts:
+            self._send(200, self.server.index_page())
+            return
+            
+        if 'static' in parts:
+            name = '/'.join(parts[parts.index('static') + 1:])
+            asset = self.server.get_asset(name)
+            
+            if asset is None:
+                self._send(404, f'Unknown asset {html.escape(name)}', 'text/plain; charset=utf-8')
+            else:
+                self._send(200, asset, mimetypes.guess_type(name)[0] or 'application/octet-stream')
+                
+            return
+            
+        session = self.server.lots.get(parts[0])
+        
+        if session is None or parts[1:] != ['report']:
+            self._send(404, f'Unknown page {html.escape(url.path)}', 'text/plain; charset=utf-8')
+            return
+            
+        query = parse_qs(url.query)
+        parameter = query.get('parameter', [''])[0]
+        
+        try:
+            page = session.get_report(
+                parameter,
+                group_by=query.get('group_by', ['lot_number'])[0] or 'lot_number',
+                lower=_float_argument(query, 'lower'),
+                upper=_float_argument(query, 'upper'),
+                n_rings=int(query.get('rings', ['3'])[0]),
+                n_sectors=int(query.get('sectors', ['1'])[0])
+            )
+        except ValueError as e:
+            self._send(400, f'Invalid argument: {str(e)}', 'text/plain; charset=utf-8')
+            return
+        except Exception as e:
+            print(f"Error rendering {session.name} {parameter}: {str(e)}")
+            self._send(500, f'Error rendering report: {str(e)}', 'text/plain; charset=utf-8')
+            return
+            
+        if page is None:
+            self._send(404, f'Unknown parameter or grouping for {html.escape(session.name)}', 'text/plain; charset=utf-8')
+        else:
+            self._send(200, page)
+
+
+def parse_arguments(argv=None):
+    """
+    Parse the command-line arguments of the report server.
+    
+    Args:
+        argv (list, optional): Arguments, defaults to the command line.
+        
+    Returns:
+        argparse.Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        prog='main.py serve',
+        description='Serve CP test reports for lot directories kept in memory.'
+    )
+    
+    parser.add_argument('-i', '--input', dest='input_dirs', nargs='+', required=True,
+                        help='Lot directories containing CP test log files')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8050,
+                        help='Port to listen on (default: 8050)')
+    parser.add_argument('--max-pages', dest='max_pages', type=int, default=64,
+                        help='Rendered reports cached per lot (default: 64)')
+                        
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """
+    Run the report server until interrupted.
+    
+    Args:
+        argv (list, optional): Arguments, defaults to the command line.
+        
+    Returns:
+        int: Exit code.
+    """
+    args = parse_arguments(argv)
+    
+    missing = [lot_dir for lot_dir in args.input_dirs if not os.path.isdir(lot_dir)]
+    
+    if missing:
+        print(f"Lot directories not found: {', '.join(missing)}")
+        return 1
+        
+    server = CPReportServer(args.input_dirs, args.host, args.port, args.max_pages)
+    
+    print(f"Serving {len(server.lots)} lot directories at http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
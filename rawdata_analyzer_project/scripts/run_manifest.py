@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Run Manifest
+-------------------
+This module records what each run read and wrote, so that outputs whose
+inputs, options and code are unchanged can be skipped on the next run.
+"""
+
+import os
+import json
+import hashlib
+
+
+# Manifest file kept in the output directory
+MANIFEST_FILE = 'run_manifest.json'
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Fingerprint an input file.
+    
+    The content hash of the previous fingerprint is reused when the
+    file's size and modification time are unchanged.
+    
+    Args:
+        path (str): File path.
+        previous (dict, optional): Previous fingerprint of the file.
+        
+    Returns:
+        dict: Size, modification time and SHA-256 of the file.
+    """
+    stat = os.stat(path)
+    
+    if previous and previous.get('size') == stat.st_size and previous.get('mtime_ns') == stat.st_mtime_ns:
+        return previous
+        
+    digest = hashlib.sha256()
+    
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+            
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+
+def code_fingerprint(*dirs):
+    """
+    Fingerprint the code, templates and static files that shape the outputs.
+    
+    Args:
+        *dirs: Directories to fingerprint, without their subdirectories.
+        
+    Returns:
+        str: Hex digest of the files in the directories.
+    """
+    digest = hashlib.sha256()
+    
+    for directory in dirs:
+        for file_name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, file_name)
+            
+            if file_name.startswith('.') or not os.path.isfile(path):
+                continue
+                
+            digest.update(file_name.encode('utf-8'))
+            
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+                
+    return digest.hexdigest()
+
+
+def make_signature(**parts):
+    """
+    Build the signature of an output from everything it depends on.
+    
+    Args:
+        **parts: Input digest, parameters, limits, options and code version.
+        
+    Returns:
+        str: Signature.
+    """
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class RunManifest:
+    """Manifest of the inputs and outputs of previous runs."""
+    
+    def __init__(self, output_dir):
+        """
+        Load the run manifest of an output directory.
+        
+        Args:
+            output_dir (str): Output directory.
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_FILE)
+        
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+            
+        self.data.setdefault('inputs', {})
+        self.data.setdefault('outputs', {})
+        
+    def fingerprint_inputs(self, paths):
+        """
+        Fingerprint a set of input files.
+        
+        Args:
+            paths (list): Input file paths.
+            
+        Returns:
+            str: Combined digest of the input files.
+        """
+        digest = hashlib.sha256()
+        
+        for path in sorted(os.path.abspath(p) for p in paths):
+            fingerprint = file_fingerprint(path, self.data['inputs'].get(path))
+            self.data['inputs'][path] = fingerprint
+            
+            digest.update(path.encode('utf-8'))
+            digest.update(fingerprint['sha256'].encode('utf-8'))
+            
+        return digest.hexdigest()
+        
+    def is_current(self, name, signature):
+        """
+        Check whether an output is up to date.
+        
+        Args:
+            name (str): Output name.
+            signature (str): Signature of the output's current dependencies.
+            
+        Returns:
+            bool: True if the recorded signature matches and all its files exist.
+        """
+        record = self.data['outputs'].get(name)
+        
+        if record is None or record.get('signature') != signature:
+            return False
+            
+        return all(os.path.exists(os.path.join(self.output_dir, path)) for path in record.get('files', []))
+        
+    def record(self, name, signature, files, **details):
+        """
+        Record an output produced by this run.
+        
+        Args:
+            name (str): Output name.
+            signature (str): Signature of the output's dependencies.
+            files (list): Files of the output, relative to the output directory.
+            **details: Parameters, limits and other details to keep with the record.
+        """
+        self.data['outputs'][name] = dict(details, signature=signature, files=list(files))
+        
+    def save(self):
+        """
+        Write the manifest through a temporary file.
+        """
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True, default=str)
+            
+        os.replace(tmp_path, self.path)
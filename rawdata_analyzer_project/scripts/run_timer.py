@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Run Timer
+-------------------
+This module records the wall time, CPU time and peak memory of each stage
+of a run, and writes them as a timing report next to the outputs.
+
+Components take an optional timer attribute and wrap their stages in
+timed(self.timer, stage, item), which does nothing when no timer is set.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak memory is left out there
+    resource = None
+
+# Timing report files written to the output directory
+TIMINGS_FILE = 'timings.json'
+TIMINGS_CSV_FILE = 'timings.csv'
+
+# Stages timed once per parameter, summed for the slowest parameters
+PARAMETER_STAGES = ('analysis', 'figure_cache', 'chart_build', 'serialize', 'payload')
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident memory of the process so far.
+    
+    Returns:
+        float or None: Peak RSS in MB, or None where it cannot be measured.
+    """
+    if resource is None:
+        return None
+        
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def timed(timer, stage, item=None):
+    """
+    Time a stage when a timer is set.
+    
+    Args:
+        timer (StageTimer): Run timer, or None to not time the stage.
+        stage (str): Stage name.
+        item (str, optional): File or parameter the stage works on.
+        
+    Returns:
+        Context manager timing the stage.
+    """
+    if timer is None:
+        return nullcontext()
+        
+    return timer.stage(stage, item)
+
+
+class StageTimer:
+    """Collects the wall time, CPU time and peak memory of run stages."""
+    
+    def __init__(self):
+        """
+        Initialize the stage timer.
+        """
+        self.records = []
+        
+    @contextmanager
+    def stage(self, stage, item=None):
+        """
+        Time a stage.
+        
+        Args:
+            stage (str): Stage name.
+            item (str, optional): File or parameter the stage works on.
+        """
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        
+        try:
+            yield
+        finally:
+            self.records.append({
+                'stage': stage,
+                'item': item,
+                'wall_s': time.perf_counter() - wall,
+                'cpu_s': time.process_time() - cpu,
+                'peak_rss_mb': peak_rss_mb()
+            })
+            
+    def get_stage_summary(self):
+        """
+        Get the totals of each stage, in the order the stages first ran.
+        
+        Returns:
+            list: Stage, count, wall time, CPU time and peak RSS of each stage.
+        """
+        stages = {}
+        
+        for record in self.records:
+            summary = stages.setdefault(record['stage'], {
+                'stage': record['stage'], 'count': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None
+            })
+            
+            summary['count'] += 1
+            summary['wall_s'] += record['wall_s']
+            summary['cpu_s'] += record['cpu_s']
+            
+            if record['peak_rss_mb'] is not None:
+                summary['peak_rss_mb'] = max(summary['peak_rss_mb'] or 0.0, record['peak_rss_mb'])
+                
+        return list(stages.values())
+        
+    def get_slowest(self, stages, top=10):
+        """
+        Get the items with the most wall time in the given stages.
+        
+        Args:
+            stages (tuple): Stage names to sum per item.
+            top (int, optional): Number of items to return. Defaults to 10.
+            
+        Returns:
+            list: Item, wall time and CPU time, slowest first.
+        """
+        items = {}
+        
+        for record in self.records:
+            if record['stage'] not in stages or record['item'] is None:
+                continue
+                
+            totals = items.setdefault(record['item'], {'item': record['item'], 'wall_s': 0.0, 'cpu_s': 0.0})
+            totals['wall_s'] += record['wall_s']
+            totals['cpu_s'] += record['cpu_s']
+            
+        return sorted(items.values(), key=lambda totals: totals['wall_s'], reverse=True)[:top]
+        
+    def save(self, output_dir):
+        """
+        Write the timing report as JSON and the individual records as CSV.
+        
+        Args:
+            output_dir (str): Output directory.
+            
+        Returns:
+            str: Path of the JSON timing report.
+        """
+        json_file = os.path.join(output_dir, TIMINGS_FILE)
+        csv_file = os.path.join(output_dir, TIMINGS_CSV_FILE)
+        
+        report = {
+            'stages': self.get_stage_summary(),
+            'slowest_files': self.get_slowest(('parse_file',)),
+            'slowest_parameters': self.get_slowest(PARAMETER_STAGES),
+            'records': self.records
+        }
+        
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            
+        with open(csv_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['stage', 'item', 'wall_s', 'cpu_s', 'peak_rss_mb'])
+            writer.writeheader()
+            writer.writerows(self.records)
+            
+        return json_file
+        
+    def summary(self):
+        """
+        Get the stage totals for the run log.
+        
+        Returns:
+            str: One line per stage with its wall and CPU time.
+        """
+        return '\n'.join(
+            f"  {stage['stage']:<14} {stage['count']:>5}x  wall {stage['wall_s']:8.3f} s  cpu {stage['cpu_s']:8.3f} s"
+            for stage in self.get_stage_summary()
+        )
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Run Trace
+-------------------
+This module records spans of a run, with attributes such as the file, lot,
+wafer, parameter and row count, and writes them as a Chrome trace event
+file. The file opens in chrome://tracing, Perfetto and other trace viewers.
+
+Tracing is off unless the CP_TRACE_FILE environment variable names a trace
+file; main.py sets it for --trace. Components get the process tracer from
+get_tracer() and wrap their work in span(self.tracer, name, **attributes),
+which does nothing when tracing is off. Whole methods are traced with the
+traced() decorator.
+
+Worker processes inherit the environment variable, so they trace as well.
+Each process appends its spans to its own part file with flush(), and
+save() in the main process merges the part files into the trace file.
+Worker functions should call flush() when they finish a task.
+"""
+
+import os
+import glob
+import json
+import time
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+
+# Environment variable naming the trace file, tracing is off when unset
+TRACE_ENV = 'CP_TRACE_FILE'
+
+# Tracer of this process
+_tracer = None
+
+
+def _json_value(value):
+    """
+    Convert a span attribute that json cannot encode.
+    
+    Args:
+        value: Attribute value, e.g. a numpy scalar.
+        
+    Returns:
+        JSON-compatible value.
+    """
+    return value.item() if hasattr(value, 'item') else str(value)
+
+
+class Tracer:
+    """Collects the spans of a process for a Chrome trace event file."""
+    
+    def __init__(self, path):
+        """
+        Initialize the tracer.
+        
+        Args:
+            path (str): Trace file path.
+        """
+        self.path = path
+        self.pid = os.getpid()
+        self.events = []
+        
+    def _check_process(self):
+        """
+        Drop the spans inherited from the parent in a forked worker process.
+        """
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            self.events = []
+            
+    @contextmanager
+    def span(self, name, **attributes):
+        """
+        Record a span.
+        
+        Args:
+            name (str): Span name as 'component.operation', e.g. 'parser.parse_file'.
+            **attributes: Span attributes. More can be added to the yielded dict
+                while the span is open.
+                
+        Yields:
+            dict: Span attributes.
+        """
+        self._check_process()
+        start = time.perf_counter_ns()
+        
+        try:
+            yield attributes
+        finally:
+            self.events.append({
+                'name': name,
+                'cat': name.split('.')[0],
+                'ph': 'X',
+                'ts': start / 1000,
+                'dur': (time.perf_counter_ns() - start) / 1000,
+                'pid': self.pid,
+                'tid': threading.get_ident(),
+                'args': attributes
+            })
+            
+    def flush(self):
+        """
+        Append the recorded spans of this process to its part file.
+        """
+        self._check_process()
+        
+        if not self.events:
+            return
+            
+        with open(f'{self.path}.{self.pid}.part', 'a', encoding='utf-8') as f:
+            for event in self.events:
+                f.write(json.dumps(event, default=_json_value) + '\n')
+                
+        self.events = []
+        
+    def save(self):
+        """
+        Merge the part files of all processes into the trace file.
+        
+        Returns:
+            str: Trace file path.
+        """
+        self.flush()
+        
+        events = []
+        
+        for part_file in glob.glob(glob.escape(self.path) + '.*.part'):
+            pid = int(part_file.rsplit('.', 2)[1])
+            name = 'main' if pid == self.pid else f'worker {pid}'
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': name}})
+            
+            with open(part_file, 'r', encoding='utf-8') as f:
+                events.extend(json.loads(line) for line in f if line.strip())
+                
+            os.remove(part_file)
+            
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+            
+        return self.path
+
+
+def start_trace(path):
+    """
+    Turn tracing on for this process and the worker processes it starts.
+    
+    Part files left over from an earlier run with the same trace file are removed.
+    
+    Args:
+        path (str): Trace file path.
+        
+    Returns:
+        Tracer: Tracer of this process.
+    """
+    global _tracer
+    
+    path = os.path.abspath(path)
+    
+    for part_file in glob.glob(glob.escape(path) + '.*.part'):
+        os.remove(part_file)
+        
+    os.environ[TRACE_ENV] = path
+    _tracer = Tracer(path)
+    
+    return _tracer
+
+
+def get_tracer():
+    """
+    Get the tracer of this process.
+    
+    Returns:
+        Tracer or None: Tracer, or None when tracing is off.
+    """
+    global _tracer
+    
+    if _tracer is None and os.environ.get(TRACE_ENV):
+        _tracer = Tracer(os.environ[TRACE_ENV])
+        
+    return _tracer
+
+
+def span(tracer, name, **attributes):
+    """
+    Record a span when tracing is on.
+    
+    Args:
+        tracer (Tracer): Process tracer, or None when tracing is off.
+        name (str): Span name as 'component.operation'.
+        **attributes: Span attributes.
+        
+    Returns:
+        Context manager yielding the span attribute dict.
+    """
+    if tracer is None:
+        return nullcontext(attributes)
+        
+    return tracer.span(name, **attributes)
+
+
+def traced(name, *argument_names, result=None):
+    """
+    Decorate a method to record a span for each call when its object has a tracer.
+    
+    Args:
+        name (str): Span name as 'component.operation'.
+        *argument_names: Method arguments recorded as span attributes.
+        result (callable, optional): Function that gets span attributes from the
+            return value, e.g. its row count.
+            
+    Returns:
+        Method decorator.
+    """
+    def decorator(method):
+        import inspect
+        
+        signature = inspect.signature(method)
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.tracer is None:
+                return method(self, *args, **kwargs)
+                
+            arguments = signature.bind(self, *args, **kwargs).arguments
+            attributes = {arg: arguments.get(arg) for arg in argument_names}
+            
+            with self.tracer.span(name, **attributes) as attributes:
+                value = method(self, *args, **kwargs)
+                
+                if result is not None:
+                    attributes.update(result(value))
+                    
+                return value
+                
+        return wrapper
+        
+    return decorator
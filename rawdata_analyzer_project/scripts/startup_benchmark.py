@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Startup Benchmark
+-------------------
+This script measures the cold start of main.py with python -X importtime
+and exits with status 1 when it regresses, so it can run before a release
+or in CI.
+
+Each case runs main.py several times in a fresh interpreter. A case fails
+when main.py imports a module on the case's blocked list, or when the
+median total import time exceeds the case's budget. The blocked lists are
+the reliable check; the budgets are generous enough for a loaded machine.
+
+Cases:
+    help: main.py --help, without pandas, numpy or the plotting stack.
+    csv:  a forced CSV run of the input directory given with -i, without
+          plotly, jinja2 or xlsxwriter. pyarrow is not checked, pandas
+          imports it itself when it is installed.
+"""
+
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+import tempfile
+
+# Modules that main.py must not import in each case
+BLOCKED_MODULES = {
+    'help': ('pandas', 'numpy', 'plotly', 'jinja2', 'xlsxwriter', 'pyarrow'),
+    'csv': ('plotly', 'jinja2', 'xlsxwriter')
+}
+
+# Default budgets for the median total import time in milliseconds
+IMPORT_BUDGETS_MS = {
+    'help': 150,
+    'csv': 1500
+}
+
+
+def parse_importtime(stderr):
+    """
+    Parse the output of python -X importtime.
+    
+    Args:
+        stderr (str): Standard error of the interpreter.
+        
+    Returns:
+        tuple: Total import time in milliseconds, and the set of top-level
+            package names that were imported.
+    """
+    total_us = 0
+    packages = set()
+    
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+            
+        fields = line.split('|')
+        
+        # Skip the column header
+        if not fields[1].strip().isdigit():
+            continue
+            
+        name = fields[2].rstrip()
+        packages.add(name.strip().split('.')[0])
+        
+        # Modules imported directly by the script are indented by one space
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(fields[1])
+            
+    return total_us / 1000, packages
+
+
+def run_case(main_args, runs):
+    """
+    Run main.py repeatedly in fresh interpreters under -X importtime.
+    
+    Args:
+        main_args (list): Arguments for main.py.
+        runs (int): Number of runs.
+        
+    Returns:
+        tuple: Median total import time in milliseconds, and the packages
+            imported by any run. None when main.py fails.
+    """
+    main_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'main.py')
+    times = []
+    packages = set()
+    
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', main_file] + main_args,
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        
+        if result.returncode != 0:
+            print(result.stderr[-2000:])
+            return None
+            
+        import_ms, run_packages = parse_importtime(result.stderr)
+        times.append(import_ms)
+        packages |= run_packages
+        
+    return statistics.median(times), packages
+
+
+def check_case(case, main_args, runs, budget_ms):
+    """
+    Run a benchmark case and report the result.
+    
+    Args:
+        case (str): Case name.
+        main_args (list): Arguments for main.py.
+        runs (int): Number of runs.
+        budget_ms (float): Budget for the median total import time.
+        
+    Returns:
+        bool: Whether the case passed.
+    """
+    result = run_case(main_args, runs)
+    
+    if result is None:
+        print(f"{case}: FAIL, main.py exited with an error")
+        return False
+        
+    import_ms, packages = result
+    blocked = sorted(set(BLOCKED_MODULES[case]) & packages)
+    passed = not blocked and import_ms <= budget_ms
+    
+    print(f"{case}: {'ok' if passed else 'FAIL'}, median import time {import_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    
+    if blocked:
+        print(f"  imports {', '.join(blocked)}")
+        
+    return passed
+
+
+def main():
+    """
+    Run the startup benchmark.
+    
+    Returns:
+        int: Exit code, 1 if any case failed.
+    """
+    parser = argparse.ArgumentParser(description='Check that the cold start of main.py has not regressed.')
+    parser.add_argument('-i', '--input', dest='input_dir',
+                        help='Log directory for the csv case (the csv case is skipped without it)')
+    parser.add_argument('-n', '--runs', type=int, default=5,
+                        help='Runs per case (default: 5)')
+    parser.add_argument('--help-budget', type=float, default=IMPORT_BUDGETS_MS['help'],
+                        help=f"Import time budget of the help case in ms (default: {IMPORT_BUDGETS_MS['help']})")
+    parser.add_argument('--csv-budget', type=float, default=IMPORT_BUDGETS_MS['csv'],
+                        help=f"Import time budget of the csv case in ms (default: {IMPORT_BUDGETS_MS['csv']})")
+    args = parser.parse_args()
+    
+    passed = check_case('help', ['--help'], args.runs, args.help_budget)
+    
+    if args.input_dir:
+        with tempfile.TemporaryDirectory() as output_dir:
+            csv_args = ['-i', args.input_dir, '-o', output_dir, '-f', 'csv', '--force']
+            passed = check_case('csv', csv_args, args.runs, args.csv_budget) and passed
+    else:
+        print("csv: skipped, no input directory given")
+        
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
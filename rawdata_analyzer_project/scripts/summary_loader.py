@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Summary Loader
+-------------------
+This module loads the fab's per-wafer summary CSV files and reconciles
+them with the yield computed from the raw die data.
+"""
+
+import os
+import re
+import glob
+import pandas as pd
+import numpy as np
+
+
+class CPSummaryLoader:
+    """Loader for CP test summary CSV files."""
+    
+    def __init__(self, summary_dir=None):
+        """
+        Initialize the summary loader.
+        
+        Args:
+            summary_dir (str, optional): Directory containing summary CSV files.
+        """
+        self.summary_dir = summary_dir if summary_dir else './data/data2/summary'
+        
+    def get_summary_files(self):
+        """
+        Get a list of summary CSV files in the specified directory.
+        
+        Returns:
+            list: List of summary CSV file paths.
+        """
+        if not os.path.isdir(self.summary_dir):
+            return []
+            
+        return sorted(
+            path for path in glob.glob(os.path.join(self.summary_dir, '*'))
+            if os.path.isfile(path) and path.lower().endswith('.csv')
+        )
+        
+    def load_summary_file(self, file_path):
+        """
+        Load a summary CSV file into the keyed summary layout.
+        
+        Args:
+            file_path (str): Path to the summary CSV file.
+            
+        Returns:
+            pandas.DataFrame: DataFrame with lot_id, wafer_id, good_die, gross_die and yield_pct.
+        """
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                f.readline()
+                second_line = f.readline()
+                
+            # Some exports have a '-----' separator row under the header
+            skiprows = [1] if second_line.strip() and not re.search(r'\d', second_line) else None
+            
+            # Rows may carry a trailing delimiter, so never use the first column as index
+            df = pd.read_csv(file_path, skiprows=skiprows, index_col=False, skipinitialspace=True, dtype=str)
+            df.columns = df.columns.str.strip()
+            
+        except Exception as e:
+            print(f"Error loading {file_path}: {str(e)}")
+            return pd.DataFrame()
+            
+        lot_col = next((col for col in df.columns if col.upper().endswith('LOTID')), None)
+        
+        if lot_col is None or 'WAFER_ID' not in df.columns:
+            print(f"Missing lot or wafer column in {file_path}")
+            return pd.DataFrame()
+            
+        def numeric(column):
+            return pd.to_numeric(df[column], errors='coerce') if column in df.columns else np.nan
+            
+        summary = pd.DataFrame({
+            'lot_id': df[lot_col].str.strip(),
+            'wafer_id': numeric('WAFER_ID'),
+            'good_die': numeric('GOOD_DIE'),
+            'gross_die': numeric('GROSS_DIE'),
+            'yield_pct': numeric('YIELD(%)')
+        })
+        
+        # Derive the gross die count when the export leaves it out
+        missing_gross = summary['gross_die'].isna() & (summary['yield_pct'] > 0)
+        summary.loc[missing_gross, 'gross_die'] = (
+            summary.loc[missing_gross, 'good_die'] * 100 / summary.loc[missing_gross, 'yield_pct']
+        ).round()
+        
+        summary['file_name'] = os.path.basename(file_path)
+        
+        return summary.dropna(subset=['lot_id', 'wafer_id'])
+        
+    def load_all(self):
+        """
+        Load all summary CSV files in the specified directory.
+        
+        Returns:
+            pandas.DataFrame: Combined summary keyed by lot_id and wafer_id.
+        """
+        frames = [self.load_summary_file(path) for path in self.get_summary_files()]
+        frames = [frame for frame in frames if not frame.empty]
+        
+        if not frames:
+            return pd.DataFrame()
+            
+        summary = pd.concat(frames, ignore_index=True)
+        summary['wafer_id'] = summary['wafer_id'].astype(int)
+        
+        return summary.drop_duplicates(['lot_id', 'wafer_id'], keep='last').reset_index(drop=True)
+
+
+def reconcile_wafer_yield(wafer_yield, summary, tolerance=0.01):
+    """
+    Join the rawdata wafer yield with the summary table and flag mismatches.
+    
+    Raw lot numbers are matched to the longest summary lot id they start with.
+    
+    Args:
+        wafer_yield (pandas.DataFrame): Yield per wafer from the raw die data.
+        summary (pandas.DataFrame): Summary table from CPSummaryLoader.
+        tolerance (float, optional): Allowed yield difference in percent. Defaults to 0.01.
+        
+    Returns:
+        pandas.DataFrame: Joined table with a status column.
+    """
+    if wafer_yield.empty or summary.empty:
+        return pd.DataFrame()
+        
+    # Wafers are identified by file name when the logs lack the lot or wafer header
+    if 'lot_number' not in wafer_yield.columns or 'wafer_number' not in wafer_yield.columns:
+        print("Missing lot or wafer number in the raw data, skipping summary reconciliation")
+        return pd.DataFrame()
+        
+    raw = wafer_yield.copy()
+    raw['wafer_id'] = pd.to_numeric(raw['wafer_number'], errors='coerce')
+    
+    # Map each distinct raw lot number to its summary lot id
+    raw_lots = raw['lot_number'].astype(str).unique()
+    lot_ids = np.array(sorted(summary['lot_id'].unique(), key=len, reverse=True), dtype=object)
+    
+    lot_map = {}
+    for lot in raw_lots:
+        matches = lot_ids[[lot.startswith(lot_id) for lot_id in lot_ids]]
+        lot_map[lot] = matches[0] if len(matches) else lot
+        
+    raw['lot_id'] = raw['lot_number'].astype(str).map(lot_map)
+    
+    merged = raw.merge(
+        summary,
+        how='outer',
+        on=['lot_id', 'wafer_id'],
+        suffixes=('_raw', '_summary'),
+        indicator=True
+    )
+    
+    mismatch = (
+        (merged['good_die_raw'] != merged['good_die_summary'])
+        | (merged['gross_die_summary'].notna() & (merged['gross_die_raw'] != merged['gross_die_summary']))
+        | ((merged['yield_pct_raw'] - merged['yield_pct_summary']).abs() > tolerance)
+    )
+    
+    merged['status'] = np.select(
+        [merged['_merge'] == 'left_only', merged['_merge'] == 'right_only', mismatch],
+        ['missing_summary', 'missing_raw', 'mismatch'],
+        default='ok'
+    )
+    
+    merged['yield_diff'] = merged['yield_pct_raw'] - merged['yield_pct_summary']
+    
+    columns = [
+        'lot_id', 'wafer_id', 'lot_number',
+        'good_die_raw', 'good_die_summary',
+        'gross_die_raw', 'gross_die_summary',
+        'yield_pct_raw', 'yield_pct_summary', 'yield_diff', 'status'
+    ]
+    
+    return merged[columns].sort_values(['lot_id', 'wafer_id']).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    # Example usage
+    from log_parser import CPLogParser
+    from data_analyzer import CPDataAnalyzer
+    
+    parser = CPLogParser("./data/data2/rawdata")
+    analyzer = CPDataAnalyzer(parser.parse_all_logs())
+    
+    summary = CPSummaryLoader("./data/data2/summary").load_all()
+    
+    print(reconcile_wafer_yield(analyzer.get_wafer_yield(), summary))
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+CP Test Wafer Keys
+-------------------
+This module defines the columns that identify a wafer and their sort
+order, shared by the analysis and export modules.
+
+pandas is imported on use, so the export modules main.py imports at
+startup stay light.
+"""
+
+# Columns that identify the wafer a die belongs to, in sort order
+WAFER_COLUMNS = ['lot_number', 'wafer_number']
+
+
+def wafer_sort_key(column):
+    """
+    Sort key for the wafer columns, wafer numbers are strings in the logs.
+    
+    Args:
+        column (pandas.Series): Wafer column.
+        
+    Returns:
+        pandas.Series: Values to sort by.
+    """
+    import pandas as pd
+    
+    if column.name == 'wafer_number':
+        return pd.to_numeric(column, errors='coerce')
+        
+    return column
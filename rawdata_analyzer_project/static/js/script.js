@@ -24,6 +24,12 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    // Draw charts once they scroll into view
+    hydrateCharts();
+    
+    // Build the tables from their JSON data
+    renderDataTables();
+    
     // Add hover effects to data points
     const dataPoints = document.querySelectorAll('.scatter .points path');
     if (dataPoints) {
@@ -46,7 +52,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const exportButton = document.getElementById('export-button');
     if (exportButton) {
         exportButton.addEventListener('click', function() {
-            const plotContainer = document.querySelector('.js-plotly-plot');
+            const plotContainer = document.querySelector('.parameter-plot.active .js-plotly-plot') || document.querySelector('.js-plotly-plot');
             if (plotContainer && window.Plotly) {
                 Plotly.downloadImage(plotContainer, {
                     format: 'png',
@@ -97,3 +103,330 @@ function formatNumber(value, precision = 2) {
     }
     return value.toFixed(precision);
 }
+
+// Typed array constructors by chart payload dtype
+const PAYLOAD_ARRAY_TYPES = {
+    f8: Float64Array,
+    f4: Float32Array,
+    i4: Int32Array,
+    i2: Int16Array,
+    i1: Int8Array,
+    u4: Uint32Array,
+    u2: Uint16Array,
+    u1: Uint8Array
+};
+
+/**
+ * Draws a chart once its sidecar data file has loaded
+ * @param {string} divId - The ID of the chart div
+ * @param {Object} figure - The figure data and layout, or a compressed payload
+ */
+function cpChartLoaded(divId, figure) {
+    if (figure.encoding === 'deflate') {
+        decodeChartPayload(figure)
+            .then(decoded => cpChartLoaded(divId, decoded))
+            .catch(error => console.error(`Could not decode chart data for ${divId}:`, error));
+        return;
+    }
+    
+    Plotly.newPlot(divId, figure.data, figure.layout, {responsive: true});
+}
+
+/**
+ * Restores one array of a compressed chart payload
+ * @param {Uint8Array} bytes - The array block of the payload
+ * @param {Object} spec - The array description
+ * @returns {Array|TypedArray} The array values
+ */
+function decodePayloadArray(bytes, spec) {
+    const ArrayType = PAYLOAD_ARRAY_TYPES[spec.dtype];
+    const size = ArrayType.BYTES_PER_ELEMENT;
+    const shuffled = bytes.subarray(spec.offset, spec.offset + spec.length * size);
+    
+    // Undo the byte shuffle
+    const values = new Uint8Array(spec.length * size);
+    for (let b = 0; b < size; b++) {
+        const plane = b * spec.length;
+        for (let i = 0; i < spec.length; i++) {
+            values[i * size + b] = shuffled[plane + i];
+        }
+    }
+    
+    const array = new ArrayType(values.buffer);
+    return spec.categories ? Array.from(array, code => spec.categories[code]) : array;
+}
+
+/**
+ * Inflates a compressed chart payload into figure data and layout
+ * @param {Object} payload - The compressed payload
+ * @returns {Promise<Object>} The figure data and layout
+ */
+async function decodeChartPayload(payload) {
+    const compressed = Uint8Array.from(atob(payload.data), c => c.charCodeAt(0));
+    const stream = new Blob([compressed]).stream().pipeThrough(new DecompressionStream('deflate'));
+    const buffer = await new Response(stream).arrayBuffer();
+    
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const bytes = new Uint8Array(buffer, 4 + headerLength);
+    const arrays = header.arrays.map(spec => decodePayloadArray(bytes, spec));
+    
+    // Put the arrays back in place of their references
+    const restore = value => {
+        if (Array.isArray(value)) {
+            return value.map(restore);
+        }
+        if (value !== null && typeof value === 'object') {
+            if ('$array' in value) {
+                return arrays[value.$array];
+            }
+            Object.keys(value).forEach(key => {
+                value[key] = restore(value[key]);
+            });
+        }
+        return value;
+    };
+    
+    return restore(header.figure);
+}
+
+/**
+ * Loads the sidecar data file of a chart
+ * @param {Element} chart - The chart placeholder div
+ */
+function loadChartData(chart) {
+    const script = document.createElement('script');
+    script.src = chart.dataset.src;
+    document.head.appendChild(script);
+}
+
+/**
+ * Loads chart data as the chart placeholders scroll into view
+ */
+function hydrateCharts() {
+    const charts = document.querySelectorAll('.lazy-chart[data-src]');
+    
+    // Load every chart up front when IntersectionObserver is not available
+    if (!('IntersectionObserver' in window)) {
+        charts.forEach(loadChartData);
+        return;
+    }
+    
+    const observer = new IntersectionObserver(function(entries) {
+        entries.forEach(entry => {
+            if (entry.isIntersecting) {
+                observer.unobserve(entry.target);
+                loadChartData(entry.target);
+            }
+        });
+    }, {rootMargin: '200px'});
+    
+    charts.forEach(chart => observer.observe(chart));
+}
+
+// Fallback row height until a rendered row can be measured
+const TABLE_ROW_HEIGHT = 37;
+
+// Rows shown in the table viewport and extra rows rendered above and below it
+const TABLE_VIEW_ROWS = 20;
+const TABLE_OVERSCAN_ROWS = 10;
+
+/**
+ * Formats a table cell for display
+ * @param {*} value - The cell value
+ * @param {Object} column - The column description
+ * @returns {string} The formatted cell
+ */
+function formatCell(value, column) {
+    if (value === null) {
+        return 'NaN';
+    }
+    if (typeof value === 'boolean') {
+        return value ? 'True' : 'False';
+    }
+    if (typeof value === 'number' && column.decimals !== undefined) {
+        return value.toFixed(column.decimals);
+    }
+    return String(value);
+}
+
+/**
+ * Compares two cell values for sorting, empty cells last
+ * @param {*} a - The first value
+ * @param {*} b - The second value
+ * @returns {number} The sort order
+ */
+function compareCells(a, b) {
+    if (a === b) {
+        return 0;
+    }
+    if (a === null) {
+        return 1;
+    }
+    if (b === null) {
+        return -1;
+    }
+    if (typeof a === 'number' && typeof b === 'number') {
+        return a - b;
+    }
+    return String(a).localeCompare(String(b), undefined, {numeric: true});
+}
+
+/**
+ * Creates a spacer row that stands in for the rows that are not rendered
+ * @param {number} columnCount - The number of table columns
+ * @returns {Element} The spacer row
+ */
+function createSpacerRow(columnCount) {
+    const row = document.createElement('tr');
+    row.className = 'spacer-row';
+    const cell = document.createElement('td');
+    cell.colSpan = columnCount;
+    row.appendChild(cell);
+    return row;
+}
+
+/**
+ * Replaces a table JSON script with a virtualized, sortable and filterable table
+ * @param {Element} source - The script element holding the table JSON
+ */
+function createDataTable(source) {
+    const data = JSON.parse(source.textContent);
+    const columns = data.columns;
+    
+    let rows = data.rows;
+    let searchText = null;
+    let sortColumn = -1;
+    let sortAscending = true;
+    let rowHeight = 0;
+    let pending = false;
+    
+    const container = document.createElement('div');
+    container.className = 'data-table';
+    
+    const toolbar = document.createElement('div');
+    toolbar.className = 'data-table-toolbar';
+    const filter = document.createElement('input');
+    filter.type = 'search';
+    filter.placeholder = 'Filter rows...';
+    const status = document.createElement('span');
+    status.className = 'data-table-status';
+    toolbar.appendChild(filter);
+    toolbar.appendChild(status);
+    
+    const viewport = document.createElement('div');
+    viewport.className = 'data-table-viewport';
+    viewport.style.maxHeight = (TABLE_ROW_HEIGHT * (TABLE_VIEW_ROWS + 1)) + 'px';
+    
+    const table = document.createElement('table');
+    table.className = 'dataframe ' + (data.classes || '');
+    
+    const head = document.createElement('thead');
+    const headRow = document.createElement('tr');
+    const headers = columns.map((column, index) => {
+        const th = document.createElement('th');
+        th.textContent = column.title;
+        th.className = 'sortable';
+        th.addEventListener('click', function() {
+            sortAscending = sortColumn === index ? !sortAscending : true;
+            sortColumn = index;
+            headers.forEach(header => header.classList.remove('sort-asc', 'sort-desc'));
+            th.classList.add(sortAscending ? 'sort-asc' : 'sort-desc');
+            update();
+        });
+        headRow.appendChild(th);
+        return th;
+    });
+    head.appendChild(headRow);
+    
+    const body = document.createElement('tbody');
+    const topSpacer = createSpacerRow(columns.length);
+    const bottomSpacer = createSpacerRow(columns.length);
+    
+    table.appendChild(head);
+    table.appendChild(body);
+    viewport.appendChild(table);
+    container.appendChild(toolbar);
+    container.appendChild(viewport);
+    source.parentNode.insertBefore(container, source);
+    
+    // Draws only the rows inside the viewport plus the overscan
+    function render() {
+        pending = false;
+        
+        const height = rowHeight || TABLE_ROW_HEIGHT;
+        const first = Math.max(0, Math.floor(viewport.scrollTop / height) - TABLE_OVERSCAN_ROWS);
+        const last = Math.min(rows.length, first + TABLE_VIEW_ROWS + 2 * TABLE_OVERSCAN_ROWS);
+        
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(topSpacer);
+        
+        for (let i = first; i < last; i++) {
+            const tr = document.createElement('tr');
+            if (i % 2 === 1) {
+                tr.className = 'striped';
+            }
+            rows[i].forEach((value, index) => {
+                const td = document.createElement('td');
+                td.textContent = formatCell(value, columns[index]);
+                tr.appendChild(td);
+            });
+            fragment.appendChild(tr);
+        }
+        
+        fragment.appendChild(bottomSpacer);
+        
+        topSpacer.firstChild.style.height = (first * height) + 'px';
+        bottomSpacer.firstChild.style.height = ((rows.length - last) * height) + 'px';
+        
+        body.textContent = '';
+        body.appendChild(fragment);
+        
+        // Measure the real row height once the table is visible
+        if (!rowHeight && last > first && topSpacer.nextSibling.offsetHeight) {
+            rowHeight = topSpacer.nextSibling.offsetHeight;
+            render();
+        }
+    }
+    
+    // Applies the filter and sort, then redraws from the top
+    function update() {
+        const query = filter.value.trim().toLowerCase();
+        
+        if (query) {
+            if (searchText === null) {
+                searchText = data.rows.map(row => row.map((value, index) => formatCell(value, columns[index])).join('\u0000').toLowerCase());
+            }
+            rows = data.rows.filter((row, index) => searchText[index].includes(query));
+        } else {
+            rows = data.rows.slice();
+        }
+        
+        if (sortColumn >= 0) {
+            rows.sort((a, b) => compareCells(a[sortColumn], b[sortColumn]) * (sortAscending ? 1 : -1));
+        }
+        
+        status.textContent = rows.length === data.rows.length ?
+            `${rows.length} rows` : `${rows.length} of ${data.rows.length} rows`;
+        
+        viewport.scrollTop = 0;
+        render();
+    }
+    
+    viewport.addEventListener('scroll', function() {
+        if (!pending) {
+            pending = true;
+            window.requestAnimationFrame(render);
+        }
+    });
+    filter.addEventListener('input', update);
+    
+    update();
+}
+
+/**
+ * Builds every table whose rows are delivered as JSON
+ */
+function renderDataTables() {
+    document.querySelectorAll('script.table-data').forEach(createDataTable);
+}
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the shared multi-parameter analysis plan.
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from log_parser import CPLogParser
+from data_analyzer import CPDataAnalyzer
+from analysis_plan import CPAnalysisPlan
+
+# Sample lot shipped with the cp analyzer project
+LOT_DIR = os.path.join(SCRIPTS_DIR, os.pardir, os.pardir, 'cp_analyzer_project', 'data', 'data1', 'rawdata')
+
+# BVDSS2 and VTH are missing for the dies that failed before they were tested
+PARAMETERS = ['BVDSS1', 'BVDSS2', 'VTH']
+
+
+@pytest.fixture(scope='module')
+def lot():
+    """Parsed sample lot and the limits of the tested parameters."""
+    if not os.path.isdir(LOT_DIR):
+        pytest.skip('sample lot not available')
+        
+    parser = CPLogParser(LOT_DIR)
+    df = parser.parse_all_logs()
+    
+    limits = {param: parser.get_limits(param) for param in PARAMETERS}
+    # One parameter with a lower limit only, one without limits
+    limits['BVDSS2'] = {'lower': limits['BVDSS2']['lower'], 'upper': None}
+    limits['VTH'] = None
+    
+    return df, limits
+
+
+def test_sample_lot_has_missing_values(lot):
+    """The NaN case below is only meaningful if the lot has missing values."""
+    df, _ = lot
+    
+    assert df['BVDSS2'].isna().any()
+
+
+@pytest.mark.parametrize('group_by', ['wafer_number', 'lot_number', None, 'no_such_column'])
+def test_plan_matches_analyzer(lot, group_by):
+    """Plan statistics and yield equal the per-parameter analyzer results."""
+    df, limits = lot
+    analyzer = CPDataAnalyzer(df)
+    plan = CPAnalysisPlan(analyzer, PARAMETERS, limits, group_by).compute()
+    
+    assert plan.parameters == PARAMETERS
+    
+    for param in PARAMETERS:
+        param_limits = limits[param] or {}
+        
+        pd.testing.assert_frame_equal(
+            plan.get_parameter_stats(param),
+            analyzer.get_parameter_stats(param, group_by)
+        )
+        pd.testing.assert_frame_equal(
+            plan.calculate_yield(param),
+            analyzer.calculate_yield(param, param_limits.get('lower'), param_limits.get('upper'), group_by)
+        )
+
+
+def test_plan_skips_unknown_parameters(lot):
+    """Parameters missing from the data are left out of the plan."""
+    df, limits = lot
+    plan = CPAnalysisPlan(CPDataAnalyzer(df), ['BVDSS1', 'NO_SUCH_PARAM'], limits, 'wafer_number').compute()
+    
+    assert plan.parameters == ['BVDSS1']
+    assert plan.get_parameter_stats('NO_SUCH_PARAM').empty
+    assert plan.calculate_yield('NO_SUCH_PARAM').empty
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for splitting the raw die table over Excel sheets.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from excel_export import split_data_sheets
+
+
+def _die_table(wafer_sizes, lot='LOT1'):
+    """
+    Build a raw die table with the given number of dies per wafer.
+    
+    Args:
+        wafer_sizes (list): Dies of each wafer, in row order.
+        lot (str, optional): Lot number. Defaults to 'LOT1'.
+        
+    Returns:
+        pandas.DataFrame: Die table with lot_number, wafer_number and a value column.
+    """
+    wafers = np.repeat([str(i + 1) for i in range(len(wafer_sizes))], wafer_sizes)
+    
+    return pd.DataFrame({
+        'lot_number': lot,
+        'wafer_number': wafers,
+        'BVDSS1': np.arange(len(wafers), dtype=float)
+    })
+
+
+def _sheet_wafers(sheets):
+    """
+    Get the wafers on each sheet.
+    
+    Args:
+        sheets (list): (sheet name, table) pairs.
+        
+    Returns:
+        list: Wafer numbers of each sheet, in row order.
+    """
+    return [list(dict.fromkeys(table['wafer_number'])) for _, table in sheets]
+
+
+def test_table_that_fits_is_one_sheet():
+    """A table within the row limit stays on one sheet under the base name."""
+    data = _die_table([3, 4])
+    sheets = split_data_sheets(data, max_rows=7)
+    
+    assert [name for name, _ in sheets] == ['Raw Data']
+    assert sheets[0][1] is data
+
+
+def test_whole_wafers_are_packed_per_sheet():
+    """Wafers that fit on a sheet are never split, and no row is lost."""
+    data = _die_table([3, 4, 2, 5])
+    sheets = split_data_sheets(data, max_rows=6)
+    
+    assert [name for name, _ in sheets] == ['Raw Data 1', 'Raw Data 2', 'Raw Data 3']
+    assert _sheet_wafers(sheets) == [['1'], ['2', '3'], ['4']]
+    assert all(len(table) <= 6 for _, table in sheets)
+    pd.testing.assert_frame_equal(pd.concat([table for _, table in sheets]), data)
+
+
+def test_wafer_larger_than_a_sheet_is_split():
+    """A wafer with more dies than a sheet holds fills whole sheets, the rest packs with the next wafer."""
+    data = _die_table([2, 14, 1])
+    sheets = split_data_sheets(data, sheet_name='Dies', max_rows=5)
+    
+    assert [name for name, _ in sheets] == ['Dies 1', 'Dies 2', 'Dies 3', 'Dies 4']
+    assert [len(table) for _, table in sheets] == [2, 5, 5, 5]
+    assert _sheet_wafers(sheets) == [['1'], ['2'], ['2'], ['2', '3']]
+    pd.testing.assert_frame_equal(pd.concat([table for _, table in sheets]), data)
+
+
+def test_wafers_are_keyed_by_lot_and_wafer():
+    """The same wafer number in two lots counts as two wafers."""
+    data = pd.concat([_die_table([3], lot='LOT1'), _die_table([3], lot='LOT2')], ignore_index=True)
+    sheets = split_data_sheets(data, max_rows=4)
+    
+    assert [list(table['lot_number'].unique()) for _, table in sheets] == [['LOT1'], ['LOT2']]
+    assert sum(len(table) for _, table in sheets) == len(data)
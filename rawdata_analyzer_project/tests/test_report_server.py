@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Tests for the serve mode report sessions.
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'scripts')
+sys.path.insert(0, SCRIPTS_DIR)
+
+from report_server import LotSession
+
+# Sample lot shipped with the cp analyzer project
+LOT_DIR = os.path.join(SCRIPTS_DIR, os.pardir, os.pardir, 'cp_analyzer_project', 'data', 'data1', 'rawdata')
+
+
+def _trace_names(page):
+    """
+    Get the trace names of the chart in a report page.
+    
+    Args:
+        page (str): HTML report.
+        
+    Returns:
+        set: Trace names.
+    """
+    return set(re.findall(r'"name":\s*"([^"]*)"', page))
+
+
+@pytest.mark.skipif(not os.path.isdir(LOT_DIR), reason='sample lot not available')
+@pytest.mark.parametrize('group_by, first, second', [
+    ('ring', dict(n_rings=3), dict(n_rings=5)),
+    ('sector', dict(n_sectors=2), dict(n_sectors=4)),
+    ('zone', dict(n_rings=3, n_sectors=1), dict(n_rings=2, n_sectors=3)),
+])
+def test_zone_change_within_session(group_by, first, second):
+    """A zone setting change in a session charts the new zones, as a fresh session does."""
+    session = LotSession('data1', LOT_DIR)
+    session.get_report('BVDSS1', group_by, **first)
+    page = session.get_report('BVDSS1', group_by, **second)
+    
+    fresh = LotSession('data1', LOT_DIR).get_report('BVDSS1', group_by, **second)
+    
+    assert _trace_names(page) == _trace_names(fresh)